@@ -0,0 +1,119 @@
+"""Compare the response_model path with the orjson fast path on large lists
+
+Usage:
+    python bench_json.py [--items N] [--rounds N]
+
+No database access: documents are generated in memory with the same shape
+db.job_posts / db.messages / db.notifications return.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from server import app, fast_json_list, JobPost, Message, Notification
+
+
+def job_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [{
+        "job_id": f"job_{uuid.uuid4().hex[:12]}",
+        "brand_user_id": "user_brand",
+        "brand_name": "Marka",
+        "title": f"Kampanya {i}",
+        "description": "Ürün tanıtımı için içerik üreticisi arıyoruz. " * 4,
+        "category": "moda",
+        "budget": 5000.0 + i,
+        "platforms": ["instagram", "tiktok"],
+        "duration_days": 15,
+        "expires_at": now + timedelta(days=15),
+        "content_requirements": {"reels": 2, "stories": 3},
+        "target_audience": {"age": "18-34", "gender": "all"},
+        "application_count": i % 7,
+        "view_count": i * 3,
+        "approval_status": "approved",
+        "status": "open",
+        "created_at": now - timedelta(minutes=i)
+    } for i in range(count)]
+
+
+def message_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [{
+        "message_id": f"msg_{uuid.uuid4().hex[:12]}",
+        "match_id": "match_bench",
+        "sender_user_id": "user_brand" if i % 2 else "user_inf",
+        "sender_name": "Marka" if i % 2 else "Influencer",
+        "message": f"Merhaba, {i}. mesaj",
+        "timestamp": now - timedelta(seconds=count - i),
+        "is_read": True,
+        "read_at": now
+    } for i in range(count)]
+
+
+def notification_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [{
+        "notification_id": f"notif_{uuid.uuid4().hex[:12]}",
+        "user_id": "user_inf",
+        "type": "application",
+        "title": "Yeni başvuru",
+        "message": f"İlanınıza {i}. başvuru geldi",
+        "link": "/dashboard",
+        "is_read": bool(i % 3),
+        "created_at": now - timedelta(minutes=i)
+    } for i in range(count)]
+
+
+def response_field(path: str):
+    return next(
+        route.response_field for route in app.routes
+        if getattr(route, "path", None) == path and "GET" in route.methods
+    )
+
+
+async def model_path(docs: List[dict], model: type, field) -> bytes:
+    """What the endpoints did before: a model per document, then response_model"""
+    content = await serialize_response(field=field, response_content=[model(**d) for d in docs], is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_path(docs: List[dict], model: type, field) -> bytes:
+    return fast_json_list(docs, model).body
+
+
+async def timed(fn, docs, model, field, rounds: int) -> float:
+    await fn(docs, model, field)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await fn(docs, model, field)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def main(items: int, rounds: int):
+    cases = [
+        ("GET /api/jobs", JobPost, job_docs(items), "/api/jobs"),
+        ("GET /api/matches/{id}/messages", Message, message_docs(items), "/api/matches/{match_id}/messages"),
+        ("GET /api/notifications", Notification, notification_docs(items), "/api/notifications"),
+    ]
+
+    print(f"{items} öğe, {rounds} tekrar (ms / istek)")
+    print(f"{'endpoint':34} {'response_model':>15} {'orjson':>10} {'hız':>7}")
+    for label, model, docs, path in cases:
+        field = response_field(path)
+        before = await timed(model_path, docs, model, field, rounds)
+        after = await timed(fast_path, docs, model, field, rounds)
+        print(f"{label:34} {before:15.2f} {after:10.2f} {before / after:6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON serialization benchmark")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.rounds))
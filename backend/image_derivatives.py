@@ -0,0 +1,47 @@
+"""Image derivative rendering for uploaded pictures.
+
+Runs inside worker processes, so this module only depends on Pillow and must
+not import server (which would open a MongoDB client in every worker).
+"""
+import os
+from pathlib import Path
+from typing import List
+
+from PIL import Image, ImageOps
+
+
+def derivative_filename(stem: str, width: int) -> str:
+    return f"{stem}_w{width}.webp"
+
+
+def render_image_derivatives(source: str, out_dir: str, stem: str, widths: List[int], quality: int = 80) -> List[dict]:
+    """Write downscaled WebP copies of an image next to the original.
+
+    EXIF orientation is applied to the pixels and the metadata is not copied, so
+    derivatives are upright and carry no EXIF (GPS, camera serials, ...).
+    Images are never upscaled: widths at or above the original are replaced by
+    a single copy at the original width. Returns one dict per file written,
+    smallest first.
+    """
+    out = Path(out_dir)
+    written = []
+
+    with Image.open(source) as img:
+        # Let the JPEG decoder skip detail we are going to throw away anyway
+        img.draft("RGB", (max(widths), max(widths)))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+        targets = sorted({w for w in widths if w < img.width}) or [img.width]
+        for width in targets:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+
+            filename = derivative_filename(stem, width)
+            tmp_path = out / f".{filename}.part"
+            resized.save(tmp_path, "WEBP", quality=quality, method=4)
+            os.replace(tmp_path, out / filename)
+
+            written.append({"width": width, "height": height, "filename": filename})
+
+    return written
@@ -0,0 +1,172 @@
+"""FLULANCE maintenance commands
+
+Usage:
+    python manage.py migrate-message-buckets [--bucket-size N] [--delete-source]
+    python manage.py gc-blobs [--grace-seconds N] [--dry-run]
+    python manage.py migrate-uploads [--to local|s3] [--delete-source]
+    python manage.py recount-storage
+    python manage.py backfill-metrics
+    python manage.py backfill-ratings
+"""
+import argparse
+import asyncio
+
+from server import (
+    db, client, new_message_bucket, run_upload_gc, recount_storage_usage, rebuild_daily_metrics, rebuild_rating_stats,
+    remove_duplicate_reviews, create_review_unique_index,
+    create_upload_storage, LocalUploadStorage,
+    MESSAGE_BUCKET_SIZE, UPLOAD_BLOB_GRACE_SECONDS, UPLOAD_DIR, UPLOAD_STORAGE
+)
+
+
+async def migrate_message_buckets(bucket_size: int, delete_source: bool):
+    """Convert one-document-per-message history into per-match buckets"""
+    print("📦 Mesajlar bucket yapısına taşınıyor...")
+
+    match_ids = await db.messages.distinct("match_id")
+    migrated_matches = 0
+    created_buckets = 0
+
+    for match_id in match_ids:
+        # Skip matches that already have buckets so the command can be re-run safely
+        if await db.message_buckets.find_one({"match_id": match_id}, {"_id": 1}):
+            print(f"ℹ️  {match_id} zaten taşınmış, atlanıyor")
+            continue
+
+        batch = []
+        cursor = db.messages.find({"match_id": match_id}, {"_id": 0}).sort("timestamp", 1)
+        async for message in cursor:
+            batch.append(message)
+            if len(batch) == bucket_size:
+                await db.message_buckets.insert_one(new_message_bucket(match_id, batch))
+                created_buckets += 1
+                batch = []
+
+        if batch:
+            await db.message_buckets.insert_one(new_message_bucket(match_id, batch))
+            created_buckets += 1
+
+        if delete_source:
+            await db.messages.delete_many({"match_id": match_id})
+
+        migrated_matches += 1
+
+    print(f"✅ {migrated_matches} eşleşme için {created_buckets} bucket oluşturuldu")
+
+
+async def gc_blobs(grace_seconds: int, dry_run: bool):
+    """Delete uploads that nothing references any more"""
+    report = await run_upload_gc(grace_seconds, dry_run=dry_run)
+    blobs = report["unreferenced_blobs"]
+    orphans = report["orphaned_files"]
+    references = orphans["references"]
+
+    if dry_run:
+        print(f"ℹ️  {references['leaked']} sızmış referans bırakılabilir, {references['restored']} eksik referans geri yüklenebilir")
+        print(f"ℹ️  {blobs['reclaimable']} blob silinebilir ({blobs['bytes']} byte)")
+        print(f"ℹ️  {orphans['scanned']} dosyadan {orphans['orphaned']} tanesi sahipsiz ({orphans['bytes']} byte)")
+    else:
+        print(f"🔧 {references['leaked']} sızmış referans bırakıldı, {references['restored']} eksik referans geri yüklendi")
+        print(f"🧹 {report['expired_uploads']} süresi dolmuş yükleme silindi")
+        print(f"🧹 {blobs['deleted']} blob silindi ({blobs['bytes']} byte)")
+        print(f"🧹 {orphans['deleted']} sahipsiz dosya silindi ({orphans['bytes']} byte)")
+
+
+async def migrate_uploads(target: str, delete_source: bool):
+    """Copy files from the local uploads directory into the target storage layout"""
+    print(f"📦 Dosyalar '{target}' depolamasına taşınıyor...")
+
+    source = LocalUploadStorage(UPLOAD_DIR)
+    destination = create_upload_storage(target)
+    files = await asyncio.to_thread(source.list_files)
+    moved = 0
+
+    for name, path in files:
+        if target == "local":
+            # Already in its shard directory
+            if path == source.path_for(name):
+                continue
+            await destination.put_file(name, path)
+        else:
+            if not await destination.stat(name):
+                await destination.put_file(name, path, keep_source=True)
+            if delete_source:
+                await source.delete(name)
+
+        moved += 1
+        if moved % 1000 == 0:
+            print(f"ℹ️  {moved} dosya taşındı")
+
+    print(f"✅ {moved} dosya taşındı")
+
+
+async def recount_storage():
+    """Rebuild per-user storage usage counters"""
+    print("📊 Kullanıcı depolama kullanımı yeniden hesaplanıyor...")
+    users = await recount_storage_usage()
+    print(f"✅ {users} kullanıcının depolama kullanımı güncellendi")
+
+
+async def backfill_metrics():
+    """Rebuild the metrics_daily rollups from existing data"""
+    print("📊 Günlük metrikler yeniden hesaplanıyor...")
+    days = await rebuild_daily_metrics()
+    print(f"✅ {days} günlük metrik kaydı yazıldı")
+
+
+async def backfill_ratings():
+    """Drop duplicate reviews, then rebuild rating counters on influencer_stats and brand_stats.
+
+    The counters are overwritten, so run this while the API is stopped.
+    """
+    duplicates = await remove_duplicate_reviews()
+    if duplicates:
+        print(f"🧹 {duplicates} tekrarlanan değerlendirme silindi")
+    await create_review_unique_index()
+    
+    print("⭐ Puan istatistikleri yeniden hesaplanıyor...")
+    users = await rebuild_rating_stats()
+    print(f"✅ {users} kullanıcının puan istatistikleri güncellendi")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FLULANCE maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    buckets = subparsers.add_parser("migrate-message-buckets", help="Convert messages to bucketed storage")
+    buckets.add_argument("--bucket-size", type=int, default=MESSAGE_BUCKET_SIZE)
+    buckets.add_argument("--delete-source", action="store_true", help="Remove migrated documents from messages")
+
+    gc = subparsers.add_parser("gc-blobs", help="Delete unreferenced and orphaned uploads")
+    gc.add_argument("--grace-seconds", type=int, default=UPLOAD_BLOB_GRACE_SECONDS)
+    gc.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    uploads = subparsers.add_parser("migrate-uploads", help="Move upload files into the sharded layout or S3")
+    uploads.add_argument("--to", choices=["local", "s3"], default=UPLOAD_STORAGE)
+    uploads.add_argument("--delete-source", action="store_true", help="Remove local files after copying to S3")
+
+    subparsers.add_parser("recount-storage", help="Rebuild users.storage_used from stored files")
+    subparsers.add_parser("backfill-metrics", help="Rebuild metrics_daily from existing data")
+    subparsers.add_parser("backfill-ratings", help="Remove duplicate reviews and rebuild rating counters")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "migrate-message-buckets":
+            asyncio.run(migrate_message_buckets(args.bucket_size, args.delete_source))
+        elif args.command == "gc-blobs":
+            asyncio.run(gc_blobs(args.grace_seconds, args.dry_run))
+        elif args.command == "migrate-uploads":
+            asyncio.run(migrate_uploads(args.to, args.delete_source))
+        elif args.command == "recount-storage":
+            asyncio.run(recount_storage())
+        elif args.command == "backfill-metrics":
+            asyncio.run(backfill_metrics())
+        elif args.command == "backfill-ratings":
+            asyncio.run(backfill_ratings())
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,55 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Header, Response, Request, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import ClientDisconnect
 from motor.motor_asyncio import AsyncIOMotorClient
+from cachetools import LRUCache, TTLCache
+from pymongo import UpdateOne, ReplaceOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import re
+import io
+import csv
+import json
+import base64
 import logging
 import asyncio
+import functools
+import itertools
+import inspect
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import bcrypt
 import httpx
+import orjson
 import shutil
 import mimetypes
+import tempfile
+import hashlib
+import secrets
+import gzip
+import multiprocessing
+from email.utils import formatdate, parsedate_to_datetime
+from concurrent.futures import ProcessPoolExecutor
 import resend
+from image_derivatives import render_image_derivatives
+
+# Optional response encodings; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -25,6 +58,7 @@ load_dotenv(ROOT_DIR / '.env')
 resend.api_key = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'noreply@flulance.com')
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://influencer-hub-110.preview.emergentagent.com')
+DEBUG = os.environ.get('DEBUG', '').lower() in ('1', 'true', 'yes')
 
 # Create uploads directory
 UPLOAD_DIR = ROOT_DIR / "uploads"
@@ -35,11 +69,18 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Chat message layout: 'documents' (one document per message) or 'buckets'
+# (one document per match per MESSAGE_BUCKET_SIZE messages). Run
+# `python manage.py migrate-message-buckets` before switching to 'buckets'.
+MESSAGE_STORAGE = os.environ.get('MESSAGE_STORAGE', 'documents')
+MESSAGE_BUCKET_SIZE = int(os.environ.get('MESSAGE_BUCKET_SIZE', '200'))
+# Messages returned by GET /matches/{match_id}/messages (the most recent ones)
+MESSAGE_HISTORY_LIMIT = 1000
+
 # Create the main app
 app = FastAPI()
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+# Uploaded files are served by serve_upload (FAZ 3: UPLOAD SERVING)
 
 # Create API router
 api_router = APIRouter(prefix="/api")
@@ -345,6 +386,10 @@ class InfluencerStats(BaseModel):
     completed_jobs: int = 0
     average_rating: float = 0.0
     total_reviews: int = 0
+    rating_sum: int = 0
+    rating_count: int = 0
+    rating_histogram: dict = Field(default_factory=dict)  # {"1": n, ..., "5": n}
+    rating_score: float = 0.0  # Bayesian-adjusted average used for ranking
     updated_at: datetime
 
 # Badge/Verification Models (FAZ 2)
@@ -425,6 +470,7 @@ class MediaItem(BaseModel):
     file_size: int
     url: str
     thumbnail_url: Optional[str] = None
+    derivatives: List[dict] = []  # [{width, height, url}], smallest first
     tags: List[str] = []
     description: Optional[str] = None
     created_at: datetime
@@ -774,6 +820,8 @@ async def require_auth(request: Request) -> User:
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    # Lets the audit log attribute the request without another lookup
+    request.state.user = user
     return user
 
 async def require_role(request: Request, allowed_roles: List[str]) -> User:
@@ -782,12 +830,9 @@ async def require_role(request: Request, allowed_roles: List[str]) -> User:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     return user
 
-async def create_notification(user_id: str, type: str, title: str, message: str, link: Optional[str] = None):
-    """Helper function to create notifications"""
-    notification_id = f"notif_{uuid.uuid4().hex[:12]}"
-    
-    notification_doc = {
-        "notification_id": notification_id,
+def new_notification(user_id: str, type: str, title: str, message: str, link: Optional[str] = None) -> dict:
+    return {
+        "notification_id": f"notif_{uuid.uuid4().hex[:12]}",
         "user_id": user_id,
         "type": type,
         "title": title,
@@ -796,8 +841,767 @@ async def create_notification(user_id: str, type: str, title: str, message: str,
         "is_read": False,
         "created_at": datetime.now(timezone.utc)
     }
+
+async def create_notification(user_id: str, type: str, title: str, message: str, link: Optional[str] = None):
+    """Helper function to create notifications"""
+    await db.notifications.insert_one(new_notification(user_id, type, title, message, link))
+
+async def create_notifications(notifications: List[dict]):
+    """Insert many notifications built with new_notification in one round trip"""
+    if notifications:
+        await db.notifications.insert_many(notifications, ordered=False)
+
+# Bulk moderation endpoints accept at most this many ids per call
+BULK_MODERATION_LIMIT = 500
+
+def unique_bulk_ids(ids: List[str]) -> List[str]:
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(ids) > BULK_MODERATION_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MODERATION_LIMIT} items per request")
+    return ids
+
+async def apply_bulk_updates(collection, operations: List[tuple]) -> dict:
+    """Run (item_id, operation) pairs as one unordered bulk_write.
+    
+    Returns {item_id: error} for the operations that failed; the rest were applied.
+    """
+    if not operations:
+        return {}
+    try:
+        await collection.bulk_write([op for _, op in operations], ordered=False)
+    except BulkWriteError as e:
+        return {operations[err["index"]][0]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+    return {}
+
+def bulk_results(ids: List[str], missing: set, failed: dict) -> dict:
+    """Per-item outcome of a bulk moderation call, in request order"""
+    results = []
+    for item_id in ids:
+        if item_id in missing:
+            results.append({"id": item_id, "status": "not_found"})
+        elif item_id in failed:
+            results.append({"id": item_id, "status": "failed", "detail": failed[item_id]})
+        else:
+            results.append({"id": item_id, "status": "updated"})
+    
+    return {
+        "results": results,
+        "updated": len(ids) - len(missing) - len(failed),
+        "not_found": len(missing),
+        "failed": len(failed)
+    }
+
+async def record_metric(metric: str, amount: int = 1):
+    """Bump today's counter in the metrics_daily rollup, e.g. "jobs.created" """
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    try:
+        await db.metrics_daily.update_one({"_id": today}, {"$inc": {metric: amount}}, upsert=True)
+    except Exception as e:
+        # Metrics must never break the request that produced them
+        logger.warning(f"Could not record metric {metric}: {e}")
+
+# Multi-document transactions need a replica set; flipped off the first time a
+# standalone server rejects one so later calls skip straight to plain writes.
+mongo_transactions_supported = True
+
+async def run_in_transaction(operation: Callable[[Optional[object]], Awaitable]):
+    """Run operation(session) in a transaction, or with session=None on a standalone server"""
+    global mongo_transactions_supported
+    if mongo_transactions_supported:
+        try:
+            async with await client.start_session() as session:
+                # with_transaction retries the whole operation on transient errors such as write conflicts
+                return await session.with_transaction(operation)
+        except OperationFailure as e:
+            # IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+            if e.code != 20:
+                raise
+            mongo_transactions_supported = False
+            logger.warning("MongoDB transactions are not available, writing without them")
+    return await operation(None)
+
+ADMIN_PAGE_SIZE = 100
+ADMIN_MAX_PAGE_SIZE = 500
+ADMIN_EXPORT_BATCH_SIZE = 500
+
+# Admin list and export settings per resource: query parameters in "filters"
+# match fields exactly ("all" disables the filter), "q" searches the "search"
+# fields, "sort" lists what ?sort=field / ?sort=-field accepts and "columns"
+# is the CSV export layout.
+ADMIN_LISTS = {
+    "users": {
+        "collection": "users",
+        "projection": {"_id": 0, "password_hash": 0},
+        "filters": ["user_type", "badge"],
+        "search": ["name", "email"],
+        "sort": ["created_at", "name", "email", "last_active"],
+        "default_sort": "-created_at",
+        "columns": ["user_id", "email", "name", "user_type", "badge", "storage_used", "created_at", "last_active"]
+    },
+    "jobs": {
+        "collection": "job_posts",
+        "projection": {"_id": 0},
+        "filters": ["approval_status", "status", "category", "brand_user_id"],
+        "search": ["title", "brand_name"],
+        "sort": ["created_at", "expires_at", "budget", "title"],
+        "default_sort": "-created_at",
+        "columns": [
+            "job_id", "brand_user_id", "brand_name", "title", "category", "budget", "platforms",
+            "status", "approval_status", "created_at", "expires_at"
+        ]
+    },
+    "matches": {
+        "collection": "matches",
+        "projection": {"_id": 0, "unread_counts": 0},
+        "filters": ["status", "job_id", "brand_user_id", "influencer_user_id"],
+        "search": ["job_title", "brand_name", "influencer_name"],
+        "sort": ["created_at", "last_activity_at"],
+        "default_sort": "-created_at",
+        "columns": [
+            "match_id", "job_id", "job_title", "brand_user_id", "brand_name",
+            "influencer_user_id", "influencer_name", "status", "created_at", "completed_at"
+        ]
+    },
+    "contacts": {
+        "collection": "contacts",
+        "projection": {"_id": 0},
+        "filters": ["user_type"],
+        "search": ["name", "email", "message"],
+        "sort": ["created_at", "name", "email"],
+        "default_sort": "-created_at",
+        "columns": ["contact_id", "name", "email", "user_type", "message", "created_at"]
+    },
+    "badges": {
+        "collection": "badges",
+        "projection": {"_id": 0},
+        "filters": ["badge_type", "user_id", "awarded_by"],
+        "search": ["reason"],
+        "sort": ["awarded_at"],
+        "default_sort": "-awarded_at",
+        "columns": ["badge_id", "user_id", "badge_type", "reason", "awarded_by", "awarded_at"]
+    },
+    "disputes": {
+        "collection": "disputes",
+        "projection": {"_id": 0},
+        "filters": ["status", "match_id", "reporter_user_id", "reported_user_id"],
+        "search": ["reason", "description", "reporter_name", "reported_name"],
+        "sort": ["created_at", "resolved_at"],
+        "default_sort": "-created_at",
+        "columns": [
+            "dispute_id", "match_id", "reporter_user_id", "reporter_name", "reported_user_id", "reported_name",
+            "reason", "description", "status", "resolution", "admin_notes", "created_at", "resolved_at"
+        ]
+    }
+}
+
+def admin_list_query(resource: str, request: Request, q: Optional[str] = None) -> dict:
+    """Mongo filter for an admin list from the request's query parameters"""
+    spec = ADMIN_LISTS[resource]
+    query = {}
+    for field in spec["filters"]:
+        value = request.query_params.get(field)
+        if value and value != "all":
+            query[field] = value
+    
+    if q:
+        pattern = {"$regex": re.escape(q), "$options": "i"}
+        query["$or"] = [{field: pattern} for field in spec["search"]]
+    
+    return query
+
+def admin_list_sort(resource: str, sort: Optional[str] = None) -> list:
+    spec = ADMIN_LISTS[resource]
+    sort = sort or spec["default_sort"]
+    field = sort.lstrip("-")
+    if field not in spec["sort"]:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{field}'. Allowed: {', '.join(spec['sort'])}")
+    
+    # _id breaks ties so pages do not overlap when many rows share a sort value
+    return [(field, -1 if sort.startswith("-") else 1), ("_id", 1)]
+
+async def fetch_admin_page(
+    resource: str,
+    query: dict,
+    response: Response,
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> List[dict]:
+    """One page of an admin list; the total match count goes in X-Total-Count"""
+    spec = ADMIN_LISTS[resource]
+    collection = db[spec["collection"]]
+    order = admin_list_sort(resource, sort)
+    limit = max(1, min(limit, ADMIN_MAX_PAGE_SIZE))
+    skip = max(skip, 0)
+    
+    total, docs = await asyncio.gather(
+        collection.count_documents(query),
+        collection.find(query, sparse_projection(fields, spec["projection"])).sort(order).skip(skip).limit(limit).to_list(limit)
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return docs
+
+def export_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        # Keep spreadsheet apps from evaluating user-supplied text as a formula
+        return "'" + value
+    return str(value)
+
+def export_json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+async def stream_admin_export(cursor, columns: List[str], format: str) -> AsyncIterator[str]:
+    """Encode cursor documents in batches so memory stays flat regardless of size"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        # BOM so Excel opens the Turkish characters as UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(columns)
+    
+    rows = 0
+    try:
+        async for doc in cursor:
+            if format == "csv":
+                writer.writerow([export_cell(doc.get(column)) for column in columns])
+            else:
+                buffer.write(json.dumps(doc, ensure_ascii=False, default=export_json_default) + "\n")
+            
+            rows += 1
+            if rows % ADMIN_EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    finally:
+        await cursor.close()
+
+# Request-scoped batching: loads requested in the same event-loop tick are
+# collected and fetched with one $in query, and results are cached until the
+# request ends. Gather the loads (load_many / asyncio.gather) to get batching;
+# a load awaited on its own still works, it just fetches alone.
+request_loaders: ContextVar[Optional[dict]] = ContextVar("request_loaders", default=None)
+
+# Fields never handed out by loaders
+LOADER_PROJECTIONS = {
+    "users": {"_id": 0, "password_hash": 0}
+}
+
+class DataLoader:
+    def __init__(self, batch_fn: Callable[[list], Awaitable[dict]], default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self.cache = {}
+        self.queue = {}
+        self.dispatches = set()  # running dispatch tasks, referenced until done
+    
+    async def load(self, key):
+        future = self.cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.cache[key] = loop.create_future()
+            if not self.queue:
+                loop.call_soon(self.start_dispatch)
+            self.queue[key] = future
+        
+        # Shielded so one cancelled caller does not cancel the load for everyone else
+        result = await asyncio.shield(future)
+        # Callers decorate what they get back, so never hand out the cached object
+        if isinstance(result, dict):
+            return dict(result)
+        if isinstance(result, list):
+            return list(result)
+        return result
+    
+    async def load_many(self, keys) -> list:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+    
+    def start_dispatch(self):
+        task = asyncio.ensure_future(self.dispatch())
+        self.dispatches.add(task)
+        task.add_done_callback(self.dispatch_done)
+    
+    def dispatch_done(self, task: asyncio.Task):
+        self.dispatches.discard(task)
+        # Failures already reached the callers through their futures
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"DataLoader dispatch failed: {task.exception()}")
+    
+    async def dispatch(self):
+        batch, self.queue = self.queue, {}
+        try:
+            results = await self.batch_fn(list(batch))
+            values = {key: results.get(key, self.default) for key in batch}
+        except asyncio.CancelledError:
+            for key, future in batch.items():
+                self.cache.pop(key, None)
+                future.cancel()
+            raise
+        except Exception as e:
+            for key, future in batch.items():
+                self.cache.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values[key])
+
+def request_loader(name: tuple, batch_fn, default=None) -> DataLoader:
+    loaders = request_loaders.get()
+    if loaders is None:
+        # Outside a request (background jobs, manage.py): batch, but do not cache
+        return DataLoader(batch_fn, default)
+    if name not in loaders:
+        loaders[name] = DataLoader(batch_fn, default)
+    return loaders[name]
+
+def doc_loader(collection: str, key: str = "user_id") -> DataLoader:
+    """One document per key value, or None"""
+    async def batch(keys):
+        projection = LOADER_PROJECTIONS.get(collection, {"_id": 0})
+        docs = await db[collection].find({key: {"$in": keys}}, projection).to_list(None)
+        return {doc[key]: doc for doc in docs}
+    return request_loader(("doc", collection, key), batch)
+
+def count_loader(collection: str, key: str) -> DataLoader:
+    """Number of documents per key value"""
+    async def batch(keys):
+        rows = await db[collection].aggregate([
+            {"$match": {key: {"$in": keys}}},
+            {"$group": {"_id": f"${key}", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        return {row["_id"]: row["count"] for row in rows}
+    return request_loader(("count", collection, key), batch, default=0)
+
+# Caching: named caches with an in-process LRU/TTL tier and, when
+# CACHE_REDIS_URL is set, a shared Redis tier so workers see each other's
+# entries. Entries carry tags; write handlers call invalidate_cache(tag) and the
+# invalidation is broadcast to the other workers over pub/sub. Concurrent misses
+# on one key share a single load. Values are stored JSON-encoded, so cached
+# functions must return JSON-serializable data and callers must not mutate it.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'flulance:cache:')
+CACHE_DEFAULT_TTL_SECONDS = 60
+CACHE_LOCAL_MAX_ENTRIES = 1000
+CACHE_INVALIDATION_CHANNEL = f"{CACHE_KEY_PREFIX}invalidate"
+
+class SharedCacheTier:
+    """Cache entries in Redis (or anything speaking redis.asyncio, e.g. fakeredis).
+    
+    Each tag is a Redis set of the keys carrying it. A counter bumped by
+    every invalidation lets a worker refuse to store a value it loaded before
+    someone else's invalidation. Errors are logged and treated as misses so an
+    unreachable Redis only costs the cache.
+    """
+    def __init__(self, redis_client, prefix: str = CACHE_KEY_PREFIX):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.generation_key = f"{prefix}generation"
+    
+    def entry_key(self, cache: str, key: str) -> str:
+        return f"{self.prefix}{cache}:{key}"
+    
+    def tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+    
+    async def get(self, cache: str, key: str) -> tuple:
+        """(stored value wrapped as {"v": value} or None on a miss, invalidation generation)"""
+        raw, generation = await self.redis.mget(self.entry_key(cache, key), self.generation_key)
+        return (json.loads(raw) if raw is not None else None), int(generation or 0)
+    
+    async def set(self, cache: str, key: str, value, ttl: int, tags: List[str], generation: int) -> bool:
+        """Store an entry, unless anything was invalidated since generation was read"""
+        from redis.exceptions import WatchError
+        
+        entry_key = self.entry_key(cache, key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            await pipe.watch(self.generation_key)
+            if int(await pipe.get(self.generation_key) or 0) != generation:
+                return False
+            pipe.multi()
+            pipe.set(entry_key, json.dumps({"v": value}), ex=ttl)
+            for tag in tags:
+                pipe.sadd(self.tag_key(tag), entry_key)
+                # Tag sets only need to outlive the entries they point at
+                pipe.expire(self.tag_key(tag), max(ttl, 3600))
+            try:
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+    
+    async def invalidate(self, tags: List[str]):
+        # Bumped first: a load racing with this can then no longer store its value
+        await self.redis.incr(self.generation_key)
+        for tag in tags:
+            tag_key = self.tag_key(tag)
+            entry_keys = await self.redis.smembers(tag_key)
+            await self.redis.delete(tag_key, *entry_keys)
+            await self.redis.publish(CACHE_INVALIDATION_CHANNEL, tag)
+
+def create_shared_cache_tier() -> Optional[SharedCacheTier]:
+    if not CACHE_REDIS_URL:
+        return None
+    # Only needed when a shared cache is configured
+    import redis.asyncio as redis_asyncio
+    return SharedCacheTier(redis_asyncio.from_url(CACHE_REDIS_URL))
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight awaitable.
+    
+    The first caller starts fn() (a coroutine or a Motor future) as a task;
+    callers arriving before it finishes await the same task instead of
+    issuing the same query again.
+    The result object is shared, so callers must copy it before mutating.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.flights = {}  # key -> asyncio.Task
+        self.stats = {"calls": 0, "executed": 0, "suppressed": 0}
+    
+    async def do(self, key, fn: Callable[[], Awaitable]):
+        self.stats["calls"] += 1
+        task = self.flights.get(key)
+        if task is None:
+            self.stats["executed"] += 1
+            task = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self.land(key, t))
+            self.flights[key] = task
+        else:
+            self.stats["suppressed"] += 1
+        # Shielded so a caller that goes away does not cancel everyone's call
+        return await asyncio.shield(task)
+    
+    def land(self, key, task: asyncio.Task):
+        if self.flights.get(key) is task:
+            del self.flights[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+    
+    def summary(self) -> dict:
+        return {**self.stats, "in_flight": len(self.flights)}
+
+single_flights = {}  # name -> SingleFlight, for lookups that are not cached
+
+def single_flight(name: str) -> SingleFlight:
+    if name not in single_flights:
+        single_flights[name] = SingleFlight(name)
+    return single_flights[name]
+
+cache_shared_tier = create_shared_cache_tier()
+caches = {}  # name -> Cache
+cache_generation = 0  # bumped by every invalidation
+
+class Cache:
+    def __init__(self, name: str, ttl: int, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)  # key -> (value, tags)
+        # Stampede protection: concurrent misses on a key wait for one load
+        self.flight = SingleFlight(name)
+        self.stats = {
+            "local_hits": 0, "shared_hits": 0, "loads": 0,
+            "load_errors": 0, "shared_errors": 0, "invalidated": 0
+        }
+    
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable], tags: List[str]):
+        entry = self.local.get(key)
+        if entry is not None:
+            self.stats["local_hits"] += 1
+            return entry[0]
+        return await self.flight.do(key, lambda: self.fill(key, loader, tags))
+    
+    async def fill(self, key: str, loader: Callable[[], Awaitable], tags: List[str]):
+        generation = cache_generation
+        shared_generation = None
+        if cache_shared_tier is not None:
+            try:
+                stored, shared_generation = await cache_shared_tier.get(self.name, key)
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                logger.warning(f"Shared cache read failed for {self.name}: {e}")
+                stored = None
+            if stored is not None:
+                self.stats["shared_hits"] += 1
+                self.local[key] = (stored["v"], tags)
+                return stored["v"]
+        
+        self.stats["loads"] += 1
+        try:
+            value = jsonable_encoder(await loader())
+        except Exception:
+            self.stats["load_errors"] += 1
+            raise
+        
+        # An invalidation while we were loading, here or in another worker,
+        # may have made the value stale
+        if generation == cache_generation:
+            self.local[key] = (value, tags)
+            if shared_generation is not None:
+                try:
+                    await cache_shared_tier.set(self.name, key, value, self.ttl, tags, shared_generation)
+                except Exception as e:
+                    self.stats["shared_errors"] += 1
+                    logger.warning(f"Shared cache write failed for {self.name}: {e}")
+        return value
+    
+    def drop_tags(self, tags: set):
+        stale = [key for key, (_, entry_tags) in list(self.local.items()) if tags.intersection(entry_tags)]
+        for key in stale:
+            self.local.pop(key, None)
+        self.stats["invalidated"] += len(stale)
+    
+    def summary(self) -> dict:
+        return {
+            **self.stats,
+            "misses": self.flight.stats["executed"],
+            "coalesced": self.flight.stats["suppressed"],
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "ttl": self.ttl
+        }
+
+def get_cache(name: str, ttl: int = CACHE_DEFAULT_TTL_SECONDS, maxsize: int = CACHE_LOCAL_MAX_ENTRIES) -> Cache:
+    if name not in caches:
+        caches[name] = Cache(name, ttl, maxsize)
+    return caches[name]
+
+def cache_key_part(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+def cached(name: str, ttl: int = CACHE_DEFAULT_TTL_SECONDS, tags: List[str] = (), maxsize: int = CACHE_LOCAL_MAX_ENTRIES):
+    """Cache an async function (route handlers included) under the named cache.
+    
+    The key is built from the simple-typed arguments (str/int/float/bool/None),
+    so Request, Response and body models are ignored; only use it for results
+    that do not depend on who is asking. Tags may reference arguments, e.g.
+    "profile:{profile_id}". Exceptions, HTTPException included, are not cached.
+    """
+    cache = get_cache(name, ttl, maxsize)
+    
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if cache_key_part(v)}
+            key = json.dumps(sorted(arguments.items()))
+            entry_tags = [tag.format(**arguments) for tag in tags]
+            return await cache.get_or_load(key, lambda: func(*args, **kwargs), entry_tags)
+        
+        return wrapper
+    return decorator
+
+def drop_local_cache_tags(tags: List[str]):
+    global cache_generation
+    cache_generation += 1
+    for cache in caches.values():
+        cache.drop_tags(set(tags))
+
+def clear_local_caches():
+    global cache_generation
+    cache_generation += 1
+    for cache in caches.values():
+        cache.local.clear()
+
+async def invalidate_cache(*tags: str):
+    """Drop every cached entry carrying one of the tags, in all workers"""
+    drop_local_cache_tags(list(tags))
+    if cache_shared_tier is not None:
+        try:
+            await cache_shared_tier.invalidate(list(tags))
+        except Exception as e:
+            logger.error(f"Shared cache invalidation failed for {tags}: {e}")
+
+async def cache_invalidation_listener():
+    """Apply invalidations published by other workers to the local tier"""
+    while True:
+        try:
+            pubsub = cache_shared_tier.redis.pubsub()
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    tag = message["data"]
+                    drop_local_cache_tags([tag.decode() if isinstance(tag, bytes) else tag])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener failed: {e}")
+            # Invalidations sent while we were not listening are lost, so start over
+            clear_local_caches()
+            await asyncio.sleep(1)
+
+# Fast JSON path for large list endpoints: documents are trimmed to the model's
+# fields and encoded with orjson straight from the Mongo dicts, instead of building
+# a model per item that FastAPI then validates and serializes a second time. The
+# routes keep their response_model for the OpenAPI schema; with DEBUG on, the
+# payload is still checked against it before it goes out.
+FAST_JSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+@functools.lru_cache(maxsize=None)
+def model_defaults(model: type) -> tuple:
+    """(field name, has default, default) for each field of a response model"""
+    return tuple(
+        (name, not field.is_required(), None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def shape_documents(docs: List[dict], model: type, fields: Optional[List[str]] = None) -> List[dict]:
+    """Keep only the model's fields (or the requested subset) and fill in its defaults, like response_model would"""
+    shape = model_defaults(model)
+    if fields is not None:
+        shape = [entry for entry in shape if entry[0] in fields]
+    return [
+        {name: doc[name] if name in doc else default for name, has_default, default in shape if has_default or name in doc}
+        for doc in docs
+    ]
+
+def fast_json_response(content, headers: Optional[dict] = None) -> Response:
+    # Stray BSON values (ObjectId, Decimal128) are written as strings
+    return Response(orjson.dumps(content, default=str, option=FAST_JSON_OPTIONS), media_type="application/json", headers=headers)
+
+def fast_json_list(docs: List[dict], model: type, headers: Optional[dict] = None, fields: Optional[List[str]] = None) -> Response:
+    """Encode a list of raw documents as the JSON response of List[model]"""
+    rows = shape_documents(docs, model, fields)
+    # A sparse fieldset is a partial model by design, so only full rows are checked
+    if DEBUG and fields is None:
+        list_adapter(model).validate_python(rows)
+    return fast_json_response(rows, headers)
+
+# Sparse fieldsets: ?fields=title,budget on the endpoints below turns into a Mongo
+# projection, so only what the client renders is read, decoded and sent. Only the
+# response model's own fields can be requested and the key field is always included.
+SPARSE_FIELDSETS = {
+    "jobs": {"key": "job_id", "model": JobPost},
+    "users": {"key": "user_id", "model": User}
+}
+
+def sparse_fields(resource: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Requested fields of a resource, or None when the full document is wanted"""
+    if not fields:
+        return None
+    spec = SPARSE_FIELDSETS[resource]
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in spec["model"].model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return [spec["key"]] + [name for name in requested if name != spec["key"]]
+
+def sparse_projection(fields: Optional[List[str]], projection: dict) -> dict:
+    """Mongo projection for the requested fields, falling back to the endpoint's own"""
+    if fields is None:
+        return projection
+    return {"_id": 0, **{name: 1 for name in fields}}
+
+# Audit log: handlers call audit_log() and move on; entries wait in an in-memory
+# queue and a background writer inserts them in batches. AuditLogMiddleware adds a
+# generic entry for every successful mutating request that did not log itself.
+AUDIT_LOG_RETENTION_DAYS = int(os.environ.get('AUDIT_LOG_RETENTION_DAYS', '180'))
+AUDIT_LOG_FLUSH_SECONDS = float(os.environ.get('AUDIT_LOG_FLUSH_SECONDS', '1'))
+AUDIT_LOG_BATCH_SIZE = 500
+AUDIT_LOG_QUEUE_SIZE = 10000
+AUDIT_LOG_PAGE_SIZE = 50
+AUDIT_LOG_TTL_INDEX = "timestamp_1"
+
+# Requests that change state but are transport details rather than user actions
+AUDIT_LOG_SKIP_ROUTES = {
+    ("PATCH", "/api/uploads/resumable/{upload_id}"),
+    ("POST", "/api/upload/check")
+}
+
+audit_log_queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIT_LOG_QUEUE_SIZE)
+audit_log_stopping = asyncio.Event()
+audit_log_dropped = 0
+
+def client_ip(request: Request) -> Optional[str]:
+    forwarded_for = request.headers.get("x-forwarded-for", "")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+def enqueue_audit_entry(request: Request, action: str, target_type: str = "", target_id: str = "", details: str = ""):
+    global audit_log_dropped
+    user = getattr(request.state, "user", None)
+    entry = {
+        "log_id": f"log_{uuid.uuid4().hex[:12]}",
+        "user_id": user.user_id if user else None,
+        "action": action,
+        "details": details,
+        "target_type": target_type,
+        "target_id": target_id,
+        "ip_address": client_ip(request),
+        "timestamp": datetime.now(timezone.utc)
+    }
+    try:
+        audit_log_queue.put_nowait(entry)
+    except asyncio.QueueFull:
+        # Never hold up a request for the audit log
+        audit_log_dropped += 1
+
+def audit_log(request: Request, action: str, target_type: str = "", target_id: str = "", details: str = ""):
+    """Record an admin-relevant action without waiting for the database"""
+    request.state.audited = True
+    enqueue_audit_entry(request, action, target_type, target_id, details)
+
+def bulk_audit_details(decision: str, result: dict) -> str:
+    return f"{decision}: {result['updated']} güncellendi, {result['not_found']} bulunamadı, {result['failed']} başarısız"
+
+async def flush_audit_log():
+    """Write everything queued so far"""
+    global audit_log_dropped
+    while not audit_log_queue.empty():
+        batch = []
+        while len(batch) < AUDIT_LOG_BATCH_SIZE and not audit_log_queue.empty():
+            batch.append(audit_log_queue.get_nowait())
+        try:
+            await db.activity_logs.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"Could not write {len(batch)} audit log entries: {e}")
     
-    await db.notifications.insert_one(notification_doc)
+    if audit_log_dropped:
+        logger.warning(f"Audit log queue was full, {audit_log_dropped} entries dropped")
+        audit_log_dropped = 0
+
+async def audit_log_writer():
+    while not audit_log_stopping.is_set():
+        try:
+            await asyncio.wait_for(audit_log_stopping.wait(), AUDIT_LOG_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        await flush_audit_log()
+
+def encode_log_cursor(log: dict) -> str:
+    raw = f"{log['timestamp'].isoformat()}|{log['log_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_log_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, log_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), log_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 # ============= AUTH ROUTES =============
 
@@ -823,6 +1627,7 @@ async def register(user_data: UserCreate):
     }
     
     await db.users.insert_one(user_doc)
+    await record_metric(f"registrations.{user_doc['user_type']}")
     
     # Create session
     session_token = f"session_{uuid.uuid4().hex}"
@@ -998,6 +1803,7 @@ async def complete_google_signup(
     }
     
     await db.users.insert_one(user_doc)
+    await record_metric(f"registrations.{user_doc['user_type']}")
     
     # Create session
     session_token = google_user["session_token"]
@@ -1145,6 +1951,27 @@ async def verify_reset_token(token: str):
 
 # ============= INFLUENCER PROFILE ROUTES =============
 
+async def profile_cache_tags(user_id: str) -> List[str]:
+    """Cache tags of a user's public influencer and brand profiles.
+    
+    Read these before deleting the profiles and invalidate after the delete,
+    so a read in between cannot cache the deleted profile again.
+    """
+    influencer, brand = await asyncio.gather(
+        db.influencer_profiles.find_one({"user_id": user_id}, {"_id": 0, "profile_id": 1}),
+        db.brand_profiles.find_one({"user_id": user_id}, {"_id": 0, "profile_id": 1})
+    )
+    tags = ["profile_list"]
+    if influencer:
+        tags.append(f"profile:{influencer['profile_id']}")
+    if brand:
+        tags.append(f"brand_profile:{brand['profile_id']}")
+    return tags
+
+# Profile fields that may hold /uploads/ URLs
+INFLUENCER_PROFILE_UPLOAD_FIELDS = ["image_url", "portfolio_items"]
+BRAND_PROFILE_UPLOAD_FIELDS = ["logo_url"]
+
 @api_router.post("/profile", response_model=InfluencerProfile)
 async def create_profile(request: Request, profile_data: InfluencerProfileCreate):
     user = await require_role(request, ["influencer"])
@@ -1167,9 +1994,12 @@ async def create_profile(request: Request, profile_data: InfluencerProfileCreate
             {"user_id": user.user_id},
             {"$set": profile_doc}
         )
+        await release_replaced_uploads(user.user_id, existing, profile_doc, INFLUENCER_PROFILE_UPLOAD_FIELDS)
     else:
         await db.influencer_profiles.insert_one(profile_doc)
     
+    await invalidate_cache(f"profile:{profile_id}", "profile_list")
+    
     profile_doc.pop("_id", None)
     return InfluencerProfile(**profile_doc)
 
@@ -1185,11 +2015,13 @@ async def get_my_profile(request: Request):
     return InfluencerProfile(**profile_doc)
 
 @api_router.get("/profiles", response_model=List[InfluencerProfile])
+@cached("profile_list", tags=["profile_list"])
 async def get_profiles():
     profiles = await db.influencer_profiles.find({}, {"_id": 0}).to_list(100)
     return [InfluencerProfile(**p) for p in profiles]
 
-@api_router.get("/profile/{profile_id}", response_model=InfluencerProfile)
+@api_router.api_route("/profile/{profile_id}", methods=["GET", "HEAD"], response_model=InfluencerProfile)
+@cached("profiles", tags=["profile:{profile_id}"])
 async def get_profile(profile_id: str):
     profile_doc = await db.influencer_profiles.find_one({"profile_id": profile_id}, {"_id": 0})
     
@@ -1222,9 +2054,12 @@ async def create_brand_profile(request: Request, profile_data: BrandProfileCreat
             {"user_id": user.user_id},
             {"$set": profile_doc}
         )
+        await release_replaced_uploads(user.user_id, existing, profile_doc, BRAND_PROFILE_UPLOAD_FIELDS)
     else:
         await db.brand_profiles.insert_one(profile_doc)
     
+    await invalidate_cache(f"brand_profile:{profile_id}")
+    
     profile_doc.pop("_id", None)
     return BrandProfile(**profile_doc)
 
@@ -1240,6 +2075,7 @@ async def get_my_brand_profile(request: Request):
     return BrandProfile(**profile_doc)
 
 @api_router.get("/brand-profile/{profile_id}", response_model=BrandProfile)
+@cached("brand_profiles", tags=["brand_profile:{profile_id}"])
 async def get_brand_profile(profile_id: str):
     profile_doc = await db.brand_profiles.find_one({"profile_id": profile_id}, {"_id": 0})
     
@@ -1276,6 +2112,7 @@ async def create_job(request: Request, job_data: JobPostCreate):
     }
     
     await db.job_posts.insert_one(job_doc)
+    await record_metric("jobs.created")
     
     # Create notification for admins
     admins = await db.users.find({"user_type": "admin"}, {"_id": 0, "user_id": 1}).to_list(100)
@@ -1304,8 +2141,10 @@ async def create_job(request: Request, job_data: JobPostCreate):
 async def get_jobs(
     category: Optional[str] = None,
     platform: Optional[str] = None,
-    status: str = "open"
+    status: str = "open",
+    fields: Optional[str] = None
 ):
+    selected = sparse_fields("jobs", fields)
     now = datetime.now(timezone.utc)
     
     # Only show approved and non-expired jobs on public feed
@@ -1323,22 +2162,22 @@ async def get_jobs(
     if platform:
         query["platforms"] = platform
     
-    jobs = await db.job_posts.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    jobs = await db.job_posts.find(query, sparse_projection(selected, {"_id": 0})).sort("created_at", -1).to_list(100)
     
     # Get application counts and increment view count
-    result = []
+    if selected is None or "application_count" in selected:
+        app_counts = await count_loader("applications", "job_id").load_many([j["job_id"] for j in jobs])
+        for j, app_count in zip(jobs, app_counts):
+            j["application_count"] = app_count
     for j in jobs:
-        app_count = await db.applications.count_documents({"job_id": j["job_id"]})
-        j["application_count"] = app_count
         # Set defaults for new fields if not present
         j.setdefault("is_featured", False)
         j.setdefault("is_urgent", False)
         j.setdefault("view_count", 0)
         j.setdefault("approval_status", "approved")  # Legacy jobs are approved
         j.setdefault("duration_days", 15)
-        result.append(JobPost(**j))
     
-    return result
+    return fast_json_list(jobs, JobPost, fields=selected)
 
 @api_router.get("/jobs/my-jobs", response_model=List[JobPost])
 async def get_my_jobs(request: Request):
@@ -1361,10 +2200,12 @@ async def get_my_jobs(request: Request):
             if expires_at < now and j.get("status") == "open":
                 j["status"] = "expired"
                 # Update in DB
-                await db.job_posts.update_one(
-                    {"job_id": j["job_id"]},
+                result = await db.job_posts.update_one(
+                    {"job_id": j["job_id"], "status": "open"},
                     {"$set": {"status": "expired"}}
                 )
+                if result.modified_count:
+                    await record_metric("jobs.expired")
         
         j.setdefault("is_featured", False)
         j.setdefault("is_urgent", False)
@@ -1377,11 +2218,19 @@ async def get_my_jobs(request: Request):
     return result
 
 @api_router.get("/jobs/{job_id}", response_model=JobPost)
-async def get_job(job_id: str):
-    job_doc = await db.job_posts.find_one({"job_id": job_id}, {"_id": 0})
+async def get_job(job_id: str, fields: Optional[str] = None):
+    selected = sparse_fields("jobs", fields)
+    
+    # Not cached because view_count changes on every hit, but a popular job
+    # opened by many people at once is still read only once
+    job_doc = await single_flight("jobs").do(
+        (job_id, tuple(selected or ())),
+        lambda: db.job_posts.find_one({"job_id": job_id}, sparse_projection(selected, {"_id": 0}))
+    )
     
     if not job_doc:
         raise HTTPException(status_code=404, detail="Job not found")
+    job_doc = dict(job_doc)
     
     # Increment view count
     await db.job_posts.update_one(
@@ -1393,6 +2242,8 @@ async def get_job(job_id: str):
     job_doc.setdefault("approval_status", "approved")
     job_doc.setdefault("duration_days", 15)
     
+    if selected is not None:
+        return fast_json_response(shape_documents([job_doc], JobPost, selected)[0])
     return JobPost(**job_doc)
 
 @api_router.delete("/jobs/{job_id}")
@@ -1448,33 +2299,75 @@ async def update_job(request: Request, job_id: str, job_update: JobUpdate):
 # ============= ADMIN JOB MANAGEMENT =============
 
 @api_router.get("/admin/jobs", response_model=List[JobPost])
-async def admin_get_all_jobs(request: Request, approval_status: Optional[str] = None):
-    """Admin can view all jobs with filters"""
+async def admin_get_all_jobs(
+    request: Request,
+    response: Response,
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    q: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Admin can view all jobs with filters (approval_status, status, category, brand_user_id)"""
     user = await require_role(request, ["admin"])
+    selected = sparse_fields("jobs", fields)
     
-    query = {}
-    if approval_status:
-        query["approval_status"] = approval_status
-    
-    jobs = await db.job_posts.find(query, {"_id": 0}).sort("created_at", -1).to_list(500)
+    jobs = await fetch_admin_page("jobs", admin_list_query("jobs", request, q), response, limit, skip, sort, selected)
     
-    result = []
+    if selected is None or "application_count" in selected:
+        app_counts = await count_loader("applications", "job_id").load_many([j["job_id"] for j in jobs])
+        for j, app_count in zip(jobs, app_counts):
+            j["application_count"] = app_count
     for j in jobs:
-        app_count = await db.applications.count_documents({"job_id": j["job_id"]})
-        j["application_count"] = app_count
         j.setdefault("is_featured", False)
         j.setdefault("is_urgent", False)
         j.setdefault("view_count", 0)
         j.setdefault("approval_status", "approved")
         j.setdefault("duration_days", 15)
-        result.append(JobPost(**j))
     
-    return result
+    # A returned Response replaces the injected one, so carry the pagination header over
+    return fast_json_list(jobs, JobPost, headers={"X-Total-Count": response.headers["X-Total-Count"]}, fields=selected)
 
 class JobApproval(BaseModel):
     approval_status: str  # 'approved' or 'rejected'
     rejection_reason: Optional[str] = None
 
+class BulkJobApproval(JobApproval):
+    job_ids: List[str]
+
+def job_approval_update(approval: JobApproval) -> dict:
+    update_data = {
+        "approval_status": approval.approval_status
+    }
+    
+    if approval.approval_status == "approved":
+        update_data["approved_at"] = datetime.now(timezone.utc)
+    
+    if approval.approval_status == "rejected" and approval.rejection_reason:
+        update_data["rejection_reason"] = approval.rejection_reason
+    
+    return update_data
+
+def job_approval_notification(job_doc: dict, approval: JobApproval) -> dict:
+    """create_notification arguments for the job's brand"""
+    if approval.approval_status == "approved":
+        return dict(
+            user_id=job_doc["brand_user_id"],
+            type="update",
+            title="İlanınız Onaylandı! ✅",
+            message=f"'{job_doc['title']}' ilanınız onaylandı ve yayınlandı.",
+            link="/brand#jobs"
+        )
+    
+    reason_text = f" Sebep: {approval.rejection_reason}" if approval.rejection_reason else ""
+    return dict(
+        user_id=job_doc["brand_user_id"],
+        type="update",
+        title="İlanınız Reddedildi ❌",
+        message=f"'{job_doc['title']}' ilanınız reddedildi.{reason_text}",
+        link="/brand#jobs"
+    )
+
 @api_router.put("/admin/jobs/{job_id}/approval")
 async def admin_approve_job(request: Request, job_id: str, approval: JobApproval):
     """Admin approves or rejects a job"""
@@ -1487,39 +2380,54 @@ async def admin_approve_job(request: Request, job_id: str, approval: JobApproval
     if approval.approval_status not in ["approved", "rejected"]:
         raise HTTPException(status_code=400, detail="Invalid approval status")
     
-    update_data = {
-        "approval_status": approval.approval_status
-    }
-    
-    if approval.approval_status == "rejected" and approval.rejection_reason:
-        update_data["rejection_reason"] = approval.rejection_reason
-    
     await db.job_posts.update_one(
         {"job_id": job_id},
-        {"$set": update_data}
+        {"$set": job_approval_update(approval)}
     )
     
+    if approval.approval_status == "approved" and job_doc.get("approval_status") != "approved":
+        await record_metric("jobs.approved")
+    
     # Notify the brand
-    if approval.approval_status == "approved":
-        await create_notification(
-            user_id=job_doc["brand_user_id"],
-            type="update",
-            title="İlanınız Onaylandı! ✅",
-            message=f"'{job_doc['title']}' ilanınız onaylandı ve yayınlandı.",
-            link="/brand#jobs"
-        )
-    else:
-        reason_text = f" Sebep: {approval.rejection_reason}" if approval.rejection_reason else ""
-        await create_notification(
-            user_id=job_doc["brand_user_id"],
-            type="update",
-            title="İlanınız Reddedildi ❌",
-            message=f"'{job_doc['title']}' ilanınız reddedildi.{reason_text}",
-            link="/brand#jobs"
-        )
+    await create_notification(**job_approval_notification(job_doc, approval))
+    
+    audit_log(request, "job.approval", "job", job_id, approval.rejection_reason or approval.approval_status)
     
     return {"message": f"Job {approval.approval_status}"}
 
+@api_router.post("/admin/jobs/bulk-approval")
+async def admin_bulk_approve_jobs(request: Request, approval: BulkJobApproval):
+    """Admin approves or rejects many jobs at once"""
+    await require_role(request, ["admin"])
+    
+    if approval.approval_status not in ["approved", "rejected"]:
+        raise HTTPException(status_code=400, detail="Invalid approval status")
+    
+    job_ids = unique_bulk_ids(approval.job_ids)
+    jobs = await db.job_posts.find(
+        {"job_id": {"$in": job_ids}},
+        {"_id": 0, "job_id": 1, "title": 1, "brand_user_id": 1, "approval_status": 1}
+    ).to_list(None)
+    jobs = {j["job_id"]: j for j in jobs}
+    
+    update_data = job_approval_update(approval)
+    failed = await apply_bulk_updates(db.job_posts, [
+        (job_id, UpdateOne({"job_id": job_id}, {"$set": update_data}))
+        for job_id in jobs
+    ])
+    
+    updated = [job for job_id, job in jobs.items() if job_id not in failed]
+    await create_notifications([new_notification(**job_approval_notification(job, approval)) for job in updated])
+    
+    if approval.approval_status == "approved":
+        newly_approved = sum(1 for job in updated if job.get("approval_status") != "approved")
+        if newly_approved:
+            await record_metric("jobs.approved", newly_approved)
+    
+    result = bulk_results(job_ids, set(job_ids) - set(jobs), failed)
+    audit_log(request, "job.bulk_approval", "job", "", bulk_audit_details(approval.approval_status, result))
+    return result
+
 @api_router.post("/jobs/{job_id}/renew")
 async def renew_job(request: Request, job_id: str):
     """Renew an expired job for another 15 days"""
@@ -1597,6 +2505,7 @@ async def create_application(request: Request, app_data: ApplicationCreate):
     }
     
     await db.applications.insert_one(app_doc)
+    await record_metric("applications.created")
     
     # Create notification for brand
     await create_notification(
@@ -1677,6 +2586,7 @@ async def accept_application(request: Request, application_id: str):
     
     # Create match
     match_id = f"match_{uuid.uuid4().hex[:12]}"
+    now = datetime.now(timezone.utc)
     
     match_doc = {
         "match_id": match_id,
@@ -1687,10 +2597,15 @@ async def accept_application(request: Request, application_id: str):
         "influencer_user_id": app_doc["influencer_user_id"],
         "influencer_name": app_doc["influencer_name"],
         "status": "active",
-        "created_at": datetime.now(timezone.utc)
+        "created_at": now,
+        # Inbox summary, kept up to date by send_message
+        "last_message": None,
+        "last_activity_at": now,
+        "unread_counts": {}
     }
     
     await db.matches.insert_one(match_doc)
+    await record_metric("matches.created")
     
     # Create notification for influencer
     await create_notification(
@@ -1727,6 +2642,202 @@ async def accept_application(request: Request, application_id: str):
 
 # ============= MATCH & MESSAGE ROUTES =============
 
+MESSAGE_PREVIEW_LENGTH = 120
+
+def build_last_message(msg_doc: dict) -> dict:
+    """Short summary of a message stored on its match for the inbox"""
+    attachment = msg_doc.get("attachment")
+    preview = msg_doc.get("message") or ""
+    if not preview and attachment:
+        preview = attachment.get("original_filename") or ""
+    
+    return {
+        "message_id": msg_doc["message_id"],
+        "sender_user_id": msg_doc["sender_user_id"],
+        "sender_name": msg_doc["sender_name"],
+        "preview": preview[:MESSAGE_PREVIEW_LENGTH],
+        "has_attachment": attachment is not None,
+        "timestamp": msg_doc["timestamp"]
+    }
+
+async def update_match_summary(match_doc: dict, msg_doc: dict):
+    """Denormalize the last message and bump the recipient's unread counter"""
+    if msg_doc["sender_user_id"] == match_doc["brand_user_id"]:
+        recipient_id = match_doc["influencer_user_id"]
+    else:
+        recipient_id = match_doc["brand_user_id"]
+    
+    await db.matches.update_one(
+        {"match_id": match_doc["match_id"]},
+        {
+            "$set": {
+                "last_message": build_last_message(msg_doc),
+                "last_activity_at": msg_doc["timestamp"]
+            },
+            "$inc": {f"unread_counts.{recipient_id}": 1}
+        }
+    )
+
+def new_message_bucket(match_id: str, messages: List[dict]) -> dict:
+    """Bucket document holding a consecutive run of a match's messages"""
+    return {
+        "bucket_id": f"bucket_{uuid.uuid4().hex[:12]}",
+        "match_id": match_id,
+        "count": len(messages),
+        "first_timestamp": messages[0]["timestamp"],
+        "last_timestamp": messages[-1]["timestamp"],
+        "messages": messages
+    }
+
+async def store_message(msg_doc: dict):
+    """Persist a chat message in the configured storage layout"""
+    await record_metric("messages.sent")
+    
+    if MESSAGE_STORAGE != "buckets":
+        await db.messages.insert_one(msg_doc)
+        return
+    
+    # Append to the match's newest bucket, or start a new one when it is full.
+    # Older buckets with room left (e.g. after re-bucketing) are never written to,
+    # so buckets stay in chronological order.
+    newest = await db.message_buckets.find_one(
+        {"match_id": msg_doc["match_id"]},
+        {"_id": 0, "bucket_id": 1, "count": 1},
+        sort=[("first_timestamp", -1)]
+    )
+    if newest and newest["count"] < MESSAGE_BUCKET_SIZE:
+        result = await db.message_buckets.update_one(
+            {"bucket_id": newest["bucket_id"], "count": {"$lt": MESSAGE_BUCKET_SIZE}},
+            {
+                "$push": {"messages": msg_doc},
+                "$inc": {"count": 1},
+                "$max": {"last_timestamp": msg_doc["timestamp"]}
+            }
+        )
+        if result.modified_count:
+            return
+    
+    await db.message_buckets.insert_one(new_message_bucket(msg_doc["match_id"], [msg_doc]))
+
+async def load_messages(match_id: str, limit: int = MESSAGE_HISTORY_LIMIT) -> List[dict]:
+    """Read the latest `limit` messages of a conversation in chronological order"""
+    if MESSAGE_STORAGE != "buckets":
+        messages = await db.messages.find(
+            {"match_id": match_id},
+            {"_id": 0}
+        ).sort("timestamp", -1).limit(limit).to_list(limit)
+        messages.reverse()
+        return messages
+    
+    # Newest buckets first, only as many as the limit needs
+    buckets = []
+    loaded = 0
+    cursor = db.message_buckets.find(
+        {"match_id": match_id},
+        {"_id": 0, "messages": 1}
+    ).sort("first_timestamp", -1)
+    async for bucket in cursor:
+        buckets.append(bucket["messages"])
+        loaded += len(bucket["messages"])
+        if loaded >= limit:
+            break
+    
+    # Concurrent sends can each open a bucket, so order by message time as well
+    messages = sorted((m for bucket in reversed(buckets) for m in bucket), key=lambda m: m["timestamp"])
+    return messages[-limit:]
+
+async def mark_messages_read(match_id: str, user_id: str):
+    """Mark the other participant's messages in a conversation as read"""
+    unread = {"sender_user_id": {"$ne": user_id}, "is_read": {"$ne": True}}
+    read_update = {"is_read": True, "read_at": datetime.now(timezone.utc)}
+    
+    if MESSAGE_STORAGE != "buckets":
+        await db.messages.update_many({"match_id": match_id, **unread}, {"$set": read_update})
+        return
+    
+    await db.message_buckets.update_many(
+        {"match_id": match_id, "messages": {"$elemMatch": unread}},
+        {"$set": {f"messages.$[m].{k}": v for k, v in read_update.items()}},
+        array_filters=[{f"m.{k}": v for k, v in unread.items()}]
+    )
+
+async def set_attachment_thumbnail(filename: str, thumbnail_url: str):
+    """Point every chat attachment of a stored file at its thumbnail"""
+    if MESSAGE_STORAGE != "buckets":
+        await db.messages.update_many(
+            {"attachment.filename": filename},
+            {"$set": {"attachment.thumbnail_url": thumbnail_url}}
+        )
+        return
+    
+    await db.message_buckets.update_many(
+        {"messages.attachment.filename": filename},
+        {"$set": {"messages.$[m].attachment.thumbnail_url": thumbnail_url}},
+        array_filters=[{"m.attachment.filename": filename}]
+    )
+
+def aggregate_messages(match_stage: dict, pipeline: List[dict]):
+    """Run an aggregation over individual messages regardless of storage layout"""
+    if MESSAGE_STORAGE != "buckets":
+        return db.messages.aggregate([{"$match": match_stage}, *pipeline])
+    
+    return db.message_buckets.aggregate([
+        {"$match": match_stage},
+        {"$unwind": "$messages"},
+        {"$replaceRoot": {"newRoot": "$messages"}},
+        {"$match": match_stage},
+        *pipeline
+    ])
+
+async def backfill_match_summaries(query: dict):
+    """Build inbox summaries for matches created before they were tracked"""
+    legacy = await db.matches.find(
+        {**query, "last_activity_at": {"$exists": False}},
+        {"_id": 0, "match_id": 1, "brand_user_id": 1, "influencer_user_id": 1, "created_at": 1}
+    ).to_list(None)
+    
+    if not legacy:
+        return
+    
+    # One pass over the messages of all legacy matches: last message and unread count per sender
+    pipeline = [
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": {"match_id": "$match_id", "sender_user_id": "$sender_user_id"},
+            "last": {"$last": "$$ROOT"},
+            "unread": {"$sum": {"$cond": [{"$eq": ["$is_read", True]}, 0, 1]}}
+        }}
+    ]
+    groups = await aggregate_messages(
+        {"match_id": {"$in": [m["match_id"] for m in legacy]}},
+        pipeline
+    ).to_list(None)
+    
+    by_match = {}
+    for g in groups:
+        by_match.setdefault(g["_id"]["match_id"], {})[g["_id"]["sender_user_id"]] = g
+    
+    operations = []
+    for m in legacy:
+        senders = by_match.get(m["match_id"], {})
+        last = max((g["last"] for g in senders.values()), key=lambda d: d["timestamp"], default=None)
+        brand_group = senders.get(m["brand_user_id"])
+        influencer_group = senders.get(m["influencer_user_id"])
+        
+        operations.append(UpdateOne(
+            {"match_id": m["match_id"]},
+            {"$set": {
+                "last_message": build_last_message(last) if last else None,
+                "last_activity_at": last["timestamp"] if last else m["created_at"],
+                "unread_counts": {
+                    m["brand_user_id"]: influencer_group["unread"] if influencer_group else 0,
+                    m["influencer_user_id"]: brand_group["unread"] if brand_group else 0
+                }
+            }}
+        ))
+    
+    await db.matches.bulk_write(operations, ordered=False)
+
 @api_router.get("/matches/my-matches", response_model=List[Match])
 async def get_my_matches(request: Request):
     user = await require_auth(request)
@@ -1742,6 +2853,48 @@ async def get_my_matches(request: Request):
     
     return [Match(**m) for m in matches]
 
+@api_router.get("/inbox")
+async def get_inbox(request: Request, limit: int = 20, skip: int = 0):
+    """Conversation list: every match with its last message and unread count"""
+    user = await require_auth(request)
+    
+    if user.user_type == "marka":
+        query = {"brand_user_id": user.user_id}
+    elif user.user_type == "influencer":
+        query = {"influencer_user_id": user.user_id}
+    else:
+        raise HTTPException(status_code=403, detail="Invalid user type")
+    
+    limit = max(1, min(limit, 100))
+    skip = max(skip, 0)
+    
+    await backfill_match_summaries(query)
+    
+    total = await db.matches.count_documents(query)
+    matches = await db.matches.find(query, {"_id": 0}).sort(
+        [("last_activity_at", -1), ("created_at", -1)]
+    ).skip(skip).limit(limit).to_list(limit)
+    
+    results = []
+    for m in matches:
+        is_brand = m["brand_user_id"] == user.user_id
+        results.append({
+            "match_id": m["match_id"],
+            "job_id": m["job_id"],
+            "job_title": m["job_title"],
+            "status": m["status"],
+            "other_user_id": m["influencer_user_id"] if is_brand else m["brand_user_id"],
+            "other_user_name": m["influencer_name"] if is_brand else m["brand_name"],
+            "last_message": m.get("last_message"),
+            "last_activity_at": m.get("last_activity_at") or m["created_at"],
+            "unread_count": (m.get("unread_counts") or {}).get(user.user_id, 0)
+        })
+    
+    return {
+        "results": results,
+        "total": total
+    }
+
 @api_router.put("/matches/{match_id}/complete")
 async def complete_match(request: Request, match_id: str):
     """Mark a match/job as completed"""
@@ -1800,22 +2953,16 @@ async def get_messages(request: Request, match_id: str):
     if match_doc["brand_user_id"] != user.user_id and match_doc["influencer_user_id"] != user.user_id:
         raise HTTPException(status_code=403, detail="Not your match")
     
-    messages = await db.messages.find(
-        {"match_id": match_id},
-        {"_id": 0}
-    ).sort("timestamp", 1).to_list(1000)
+    messages = await load_messages(match_id)
     
     # Mark messages as read if they're not from the current user
-    await db.messages.update_many(
-        {
-            "match_id": match_id,
-            "sender_user_id": {"$ne": user.user_id},
-            "is_read": {"$ne": True}
-        },
-        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}}
+    await mark_messages_read(match_id, user.user_id)
+    await db.matches.update_one(
+        {"match_id": match_id},
+        {"$set": {f"unread_counts.{user.user_id}": 0}}
     )
     
-    return [Message(**m) for m in messages]
+    return fast_json_list(messages, Message)
 
 @api_router.post("/matches/{match_id}/messages", response_model=Message)
 async def send_message(request: Request, match_id: str, msg_data: MessageCreate):
@@ -1840,32 +2987,72 @@ async def send_message(request: Request, match_id: str, msg_data: MessageCreate)
         "timestamp": datetime.now(timezone.utc)
     }
     
-    await db.messages.insert_one(msg_doc)
+    await store_message(msg_doc)
+    await update_match_summary(match_doc, msg_doc)
     
-    msg_doc.pop("_id")
+    msg_doc.pop("_id", None)
     return Message(**msg_doc)
 
 # ============= ADMIN ROUTES =============
 
-@api_router.get("/admin/users", response_model=List[User])
-async def admin_get_users(request: Request):
+@api_router.get("/admin/export/{resource}")
+async def admin_export(
+    request: Request,
+    resource: str,
+    format: str = "csv",
+    sort: Optional[str] = None,
+    q: Optional[str] = None
+):
+    """Download a full admin list as CSV or NDJSON, with the same filters as the list endpoint"""
     await require_role(request, ["admin"])
     
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    return [User(**u) for u in users]
+    if resource not in ADMIN_LISTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Invalid format. Allowed: csv, ndjson")
+    
+    spec = ADMIN_LISTS[resource]
+    cursor = db[spec["collection"]].find(
+        admin_list_query(resource, request, q),
+        spec["projection"]
+    ).sort(admin_list_sort(resource, sort)).batch_size(ADMIN_EXPORT_BATCH_SIZE)
+    
+    filename = f"flulance_{resource}_{datetime.now(timezone.utc).strftime('%Y%m%d')}.{format}"
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_admin_export(cursor, spec["columns"], format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
-@api_router.get("/admin/jobs", response_model=List[JobPost])
-async def admin_get_jobs(request: Request):
+@api_router.get("/admin/users", response_model=List[User])
+async def admin_get_users(
+    request: Request,
+    response: Response,
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    q: Optional[str] = None,
+    fields: Optional[str] = None
+):
     await require_role(request, ["admin"])
+    selected = sparse_fields("users", fields)
     
-    jobs = await db.job_posts.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return [JobPost(**j) for j in jobs]
+    users = await fetch_admin_page("users", admin_list_query("users", request, q), response, limit, skip, sort, selected)
+    return fast_json_list(users, User, headers={"X-Total-Count": response.headers["X-Total-Count"]}, fields=selected)
 
 @api_router.get("/admin/matches", response_model=List[Match])
-async def admin_get_matches(request: Request):
+async def admin_get_matches(
+    request: Request,
+    response: Response,
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    q: Optional[str] = None
+):
     await require_role(request, ["admin"])
     
-    matches = await db.matches.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    matches = await fetch_admin_page("matches", admin_list_query("matches", request, q), response, limit, skip, sort)
     return [Match(**m) for m in matches]
 
 @api_router.get("/admin/stats")
@@ -1890,10 +3077,8 @@ async def admin_get_stats(request: Request):
         "total_applications": total_applications
     }
 
-@api_router.get("/admin/commission", response_model=CommissionSettings)
-async def get_commission(request: Request):
-    await require_role(request, ["admin"])
-    
+@cached("commission", tags=["commission"])
+async def load_commission_settings() -> dict:
     settings = await db.commission_settings.find_one({}, {"_id": 0})
     if not settings:
         # Default commission
@@ -1902,8 +3087,14 @@ async def get_commission(request: Request):
             "updated_at": datetime.now(timezone.utc)
         }
         await db.commission_settings.insert_one(settings)
-    
-    return CommissionSettings(**settings)
+        settings.pop("_id", None)
+    return settings
+
+@api_router.get("/admin/commission", response_model=CommissionSettings)
+async def get_commission(request: Request):
+    await require_role(request, ["admin"])
+    
+    return CommissionSettings(**await load_commission_settings())
 
 @api_router.put("/admin/commission")
 async def update_commission(request: Request, percentage: float):
@@ -1918,6 +3109,8 @@ async def update_commission(request: Request, percentage: float):
     }
     
     await db.commission_settings.update_one({}, {"$set": settings}, upsert=True)
+    await invalidate_cache("commission")
+    audit_log(request, "commission.update", "commission", "", f"%{percentage}")
     
     return CommissionSettings(**settings)
 
@@ -1925,16 +3118,177 @@ async def update_commission(request: Request, percentage: float):
 async def admin_delete_user(request: Request, user_id: str):
     await require_role(request, ["admin"])
     
+    profile_tags = await profile_cache_tags(user_id)
     result = await db.users.delete_one({"user_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Cleanup related data
     await db.user_sessions.delete_many({"user_id": user_id})
+    profiles = await db.influencer_profiles.find({"user_id": user_id}, {"_id": 0}).to_list(None)
     await db.influencer_profiles.delete_many({"user_id": user_id})
+    await invalidate_cache(*profile_tags)
+    for profile_doc in profiles:
+        await release_replaced_uploads(user_id, profile_doc, None, INFLUENCER_PROFILE_UPLOAD_FIELDS)
+    audit_log(request, "user.delete", "user", user_id)
     
     return {"message": "User deleted"}
 
+# ============= ADMIN METRICS =============
+
+# Counters kept per UTC day in metrics_daily ({"_id": "2026-01-31", "jobs": {"created": 4}, ...}).
+# Every reported period carries all of them, zero-filled.
+DAILY_METRICS = [
+    "registrations.marka", "registrations.influencer",
+    "jobs.created", "jobs.approved", "jobs.expired",
+    "applications.created",
+    "matches.created",
+    "contracts.signed", "contracts.completed",
+    "messages.sent",
+    "disputes.opened"
+]
+
+METRIC_GRANULARITIES = ["day", "week", "month"]
+# Longest start..end span per granularity, in days; keeps the zero-filled series a few hundred periods
+METRIC_MAX_SPAN_DAYS = {"day": 366, "week": 5 * 366, "month": 10 * 366}
+
+def add_metric_counts(target: dict, counts: dict):
+    for section, values in counts.items():
+        if section == "_id" or not isinstance(values, dict):
+            continue
+        bucket = target.setdefault(section, {})
+        for name, value in values.items():
+            bucket[name] = bucket.get(name, 0) + value
+
+def empty_metric_counts() -> dict:
+    counts = {}
+    for metric in DAILY_METRICS:
+        section, name = metric.split(".")
+        counts.setdefault(section, {})[name] = 0
+    return counts
+
+def metric_period_start(day: datetime, granularity: str) -> datetime:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+async def rebuild_daily_metrics() -> int:
+    """Recompute metrics_daily from the source collections.
+    
+    Counters bumped by live traffic while this runs can be overwritten, so run
+    it when the site is quiet. Returns the number of days written.
+    """
+    def per_day(date_expr, metric_expr) -> list:
+        return [{"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": date_expr}},
+                "metric": metric_expr
+            },
+            "count": {"$sum": 1}
+        }}]
+    
+    if MESSAGE_STORAGE == "buckets":
+        messages = (db.message_buckets, [{"$unwind": "$messages"}] + per_day("$messages.timestamp", "messages.sent"))
+    else:
+        messages = (db.messages, per_day("$timestamp", "messages.sent"))
+    
+    sources = [
+        (db.users, [{"$match": {"created_at": {"$type": "date"}, "user_type": {"$type": "string"}}}]
+            + per_day("$created_at", {"$concat": ["registrations.", "$user_type"]})),
+        (db.job_posts, [{"$match": {"created_at": {"$type": "date"}}}] + per_day("$created_at", "jobs.created")),
+        (db.job_posts, [{"$match": {"approval_status": "approved", "created_at": {"$type": "date"}}}]
+            + per_day({"$ifNull": ["$approved_at", "$created_at"]}, "jobs.approved")),
+        (db.job_posts, [{"$match": {"status": "expired", "expires_at": {"$type": "date"}}}] + per_day("$expires_at", "jobs.expired")),
+        (db.applications, [{"$match": {"created_at": {"$type": "date"}}}] + per_day("$created_at", "applications.created")),
+        (db.matches, [{"$match": {"created_at": {"$type": "date"}}}] + per_day("$created_at", "matches.created")),
+        (db.contracts, [{"$match": {"status": {"$in": ["signed", "active", "completed"]}, "created_at": {"$type": "date"}}}]
+            + per_day({"$ifNull": ["$signed_at", "$created_at"]}, "contracts.signed")),
+        (db.contracts, [{"$match": {"status": "completed", "created_at": {"$type": "date"}}}]
+            + per_day({"$ifNull": ["$completed_at", "$updated_at", "$created_at"]}, "contracts.completed")),
+        messages,
+        (db.disputes, [{"$match": {"created_at": {"$type": "date"}}}] + per_day("$created_at", "disputes.opened"))
+    ]
+    
+    results = await asyncio.gather(*(collection.aggregate(pipeline).to_list(None) for collection, pipeline in sources))
+    
+    days = {}
+    for rows in results:
+        for row in rows:
+            section, name = row["_id"]["metric"].split(".", 1)
+            add_metric_counts(days.setdefault(row["_id"]["day"], {}), {section: {name: row["count"]}})
+    
+    ops = [ReplaceOne({"_id": day}, counts, upsert=True) for day, counts in days.items()]
+    for i in range(0, len(ops), 1000):
+        await db.metrics_daily.bulk_write(ops[i:i + 1000], ordered=False)
+    await db.metrics_daily.delete_many({"_id": {"$nin": list(days)}})
+    
+    return len(days)
+
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    granularity: str = "day"
+):
+    """Activity counters over a date range, read from the daily rollups"""
+    await require_role(request, ["admin"])
+    
+    if granularity not in METRIC_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid granularity. Allowed: {', '.join(METRIC_GRANULARITIES)}")
+    
+    try:
+        end_day = datetime.strptime(end, "%Y-%m-%d") if end else datetime.now(timezone.utc).replace(tzinfo=None)
+        end_day = end_day.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_day = datetime.strptime(start, "%Y-%m-%d") if start else end_day - timedelta(days=29)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    max_span = METRIC_MAX_SPAN_DAYS[granularity]
+    if (end_day - start_day).days >= max_span:
+        raise HTTPException(status_code=400, detail=f"Date range too long for {granularity} granularity (max {max_span} days)")
+    
+    rows = await db.metrics_daily.find({
+        "_id": {"$gte": start_day.strftime("%Y-%m-%d"), "$lte": end_day.strftime("%Y-%m-%d")}
+    }).to_list(None)
+    
+    periods = {}
+    period = metric_period_start(start_day, granularity)
+    while period <= end_day:
+        periods[period.strftime("%Y-%m-%d")] = empty_metric_counts()
+        if granularity == "day":
+            period += timedelta(days=1)
+        elif granularity == "week":
+            period += timedelta(weeks=1)
+        else:
+            period = (period + timedelta(days=32)).replace(day=1)
+    
+    for row in rows:
+        day = datetime.strptime(row["_id"], "%Y-%m-%d")
+        add_metric_counts(periods[metric_period_start(day, granularity).strftime("%Y-%m-%d")], row)
+    
+    return {
+        "granularity": granularity,
+        "start": start_day.strftime("%Y-%m-%d"),
+        "end": end_day.strftime("%Y-%m-%d"),
+        "series": [{"period": period, **counts} for period, counts in periods.items()]
+    }
+
+@api_router.get("/admin/cache/stats")
+async def admin_cache_stats(request: Request):
+    """Admin: Hit/miss counters and sizes of every cache and single-flight group in this worker"""
+    await require_role(request, ["admin"])
+    
+    return {
+        "shared_tier": "redis" if cache_shared_tier is not None else None,
+        "caches": {name: cache.summary() for name, cache in sorted(caches.items())},
+        "single_flight": {name: flight.summary() for name, flight in sorted(single_flights.items())}
+    }
+
 # ============= CONTACT ROUTES =============
 
 @api_router.post("/contact", response_model=Contact)
@@ -1953,10 +3307,17 @@ async def create_contact(contact_data: ContactCreate):
     return Contact(**contact_doc)
 
 @api_router.get("/admin/contacts", response_model=List[Contact])
-async def admin_get_contacts(request: Request):
+async def admin_get_contacts(
+    request: Request,
+    response: Response,
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    q: Optional[str] = None
+):
     await require_role(request, ["admin"])
     
-    contacts = await db.contacts.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    contacts = await fetch_admin_page("contacts", admin_list_query("contacts", request, q), response, limit, skip, sort)
     return [Contact(**c) for c in contacts]
 
 # ============= NOTIFICATION ROUTES =============
@@ -1970,7 +3331,7 @@ async def get_notifications(request: Request):
         {"_id": 0}
     ).sort("created_at", -1).limit(50).to_list(50)
     
-    return [Notification(**n) for n in notifications]
+    return fast_json_list(notifications, Notification)
 
 @api_router.get("/notifications/unread-count")
 async def get_unread_count(request: Request):
@@ -2010,12 +3371,14 @@ async def mark_all_read(request: Request):
 
 # ============= ANNOUNCEMENT ROUTES =============
 
-@api_router.get("/announcements", response_model=List[Announcement])
+@api_router.api_route("/announcements", methods=["GET", "HEAD"], response_model=List[Announcement])
+@cached("announcements", tags=["announcements"])
 async def get_announcements():
     announcements = await db.announcements.find({}, {"_id": 0}).sort("created_at", -1).limit(50).to_list(50)
     return [Announcement(**a) for a in announcements]
 
-@api_router.get("/announcements/pinned", response_model=List[Announcement])
+@api_router.api_route("/announcements/pinned", methods=["GET", "HEAD"], response_model=List[Announcement])
+@cached("pinned_announcements", tags=["announcements"])
 async def get_pinned_announcements():
     """Ana sayfada gösterilecek pinned duyurular"""
     announcements = await db.announcements.find({"is_pinned": True}, {"_id": 0}).sort("created_at", -1).limit(3).to_list(3)
@@ -2034,8 +3397,10 @@ async def create_announcement(request: Request, announcement_data: AnnouncementC
     }
     
     await db.announcements.insert_one(announcement_doc)
+    await invalidate_cache("announcements")
     
     announcement_doc.pop("_id")
+    audit_log(request, "announcement.create", "announcement", announcement_id, announcement_data.title)
     return Announcement(**announcement_doc)
 
 @api_router.put("/admin/announcements/{announcement_id}", response_model=Announcement)
@@ -2054,8 +3419,10 @@ async def update_announcement(request: Request, announcement_id: str, announceme
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
+    await invalidate_cache("announcements")
     
     updated = await db.announcements.find_one({"announcement_id": announcement_id}, {"_id": 0})
+    audit_log(request, "announcement.update", "announcement", announcement_id, announcement_data.title)
     return Announcement(**updated)
 
 @api_router.delete("/admin/announcements/{announcement_id}")
@@ -2066,7 +3433,9 @@ async def delete_announcement(request: Request, announcement_id: str):
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
+    await invalidate_cache("announcements")
     
+    audit_log(request, "announcement.delete", "announcement", announcement_id)
     return {"message": "Announcement deleted"}
 
 # ============= FAVORITE ROUTES =============
@@ -2139,7 +3508,8 @@ async def check_favorite(request: Request, job_id: str):
 
 # ============= TRENDING & RECOMMENDATIONS =============
 
-@api_router.get("/trending/categories")
+@api_router.api_route("/trending/categories", methods=["GET", "HEAD"])
+@cached("trending_categories", ttl=300)
 async def get_trending_categories():
     # Aggregate jobs by category
     pipeline = [
@@ -2232,11 +3602,18 @@ async def create_review(request: Request, review_data: ReviewCreate):
         "created_at": datetime.now(timezone.utc)
     }
     
-    await db.reviews.insert_one(review_doc)
+    try:
+        await db.reviews.insert_one(review_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="You already reviewed this match")
     
-    # Update influencer stats if reviewed is influencer
-    if review_type == "brand_to_influencer":
-        await update_influencer_rating(reviewed_user_id)
+    # Add the rating to the reviewed user's influencer_stats / brand_stats counters
+    await rating_stats_collection(review_type).update_one(
+        {"user_id": reviewed_user_id},
+        rating_stats_update(review_data.rating),
+        upsert=True
+    )
+    await invalidate_cache("leaderboards")
     
     # Create notification
     await create_notification(
@@ -2250,29 +3627,149 @@ async def create_review(request: Request, review_data: ReviewCreate):
     review_doc.pop("_id", None)
     return Review(**review_doc)
 
-async def update_influencer_rating(user_id: str):
-    """Update influencer's average rating and total reviews"""
-    pipeline = [
-        {"$match": {"reviewed_user_id": user_id, "review_type": "brand_to_influencer"}},
-        {"$group": {
-            "_id": "$reviewed_user_id",
-            "average_rating": {"$avg": "$rating"},
-            "total_reviews": {"$sum": 1}
+# Rankings use a Bayesian average that pulls users with few reviews towards
+# RATING_PRIOR_MEAN, as if everyone started with RATING_PRIOR_WEIGHT reviews of
+# that value, so one 5-star review does not outrank fifty 4.8-star ones.
+RATING_PRIOR_MEAN = float(os.environ.get('RATING_PRIOR_MEAN', '3.5'))
+RATING_PRIOR_WEIGHT = float(os.environ.get('RATING_PRIOR_WEIGHT', '5'))
+RATING_STARS = ["1", "2", "3", "4", "5"]
+REVIEW_UNIQUE_KEY = [("match_id", 1), ("reviewer_user_id", 1)]
+
+def rating_stats_fields(rating_sum: int, rating_count: int, histogram: dict) -> dict:
+    """Stats document fields derived from the rating counters"""
+    return {
+        "rating_sum": rating_sum,
+        "rating_count": rating_count,
+        "rating_histogram": {star: histogram.get(star, 0) for star in RATING_STARS},
+        "average_rating": round(rating_sum / rating_count, 1) if rating_count else 0.0,
+        "total_reviews": rating_count,
+        "rating_score": round(
+            (RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT + rating_sum) / (RATING_PRIOR_WEIGHT + rating_count), 3
+        )
+    }
+
+def rating_stats_update(rating: int) -> list:
+    """Update pipeline adding one review to a stats document.
+
+    Increments rating_sum, rating_count and the histogram bucket and recomputes
+    the average and score from them in the same write, so concurrent reviews
+    never lose an update and nothing has to re-read the reviews collection.
+    """
+    def counter(field: str, legacy=0) -> dict:
+        return {"$ifNull": [f"${field}", legacy]}
+    
+    # Stats written before the counters existed start from their stored average
+    # until `python manage.py backfill-ratings` rebuilds them exactly
+    legacy_count = counter("total_reviews")
+    legacy_sum = {"$multiply": [counter("average_rating"), legacy_count]}
+    weighted_count = {"$add": [RATING_PRIOR_WEIGHT, "$rating_count"]}
+    return [
+        {"$set": {
+            "stats_id": {"$ifNull": ["$stats_id", f"stats_{uuid.uuid4().hex[:12]}"]},
+            "rating_sum": {"$add": [counter("rating_sum", legacy_sum), rating]},
+            "rating_count": {"$add": [counter("rating_count", legacy_count), 1]},
+            "rating_histogram": {
+                star: {"$add": [counter(f"rating_histogram.{star}"), int(star == str(rating))]}
+                for star in RATING_STARS
+            },
+            "updated_at": datetime.now(timezone.utc)
+        }},
+        {"$set": {
+            "average_rating": {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 1]},
+            "total_reviews": "$rating_count",
+            "rating_score": {"$round": [
+                {"$divide": [{"$add": [RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT, "$rating_sum"]}, weighted_count]}, 3
+            ]}
         }}
     ]
+
+def rating_stats_collection(review_type: str):
+    """Stats collection holding the rating counters of the reviewed user"""
+    return db.influencer_stats if review_type == "brand_to_influencer" else db.brand_stats
+
+async def remove_duplicate_reviews() -> int:
+    """Keep only the first review per (match, reviewer).
     
-    results = await db.reviews.aggregate(pipeline).to_list(1)
+    Concurrent submissions could store the same review twice before the unique
+    index existed, and the index cannot be built while such duplicates remain.
+    """
+    rows = await db.reviews.aggregate([
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {"match_id": "$match_id", "reviewer_user_id": "$reviewer_user_id"},
+            "ids": {"$push": "$_id"}
+        }},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ], allowDiskUse=True).to_list(None)
     
-    if results:
-        await db.influencer_stats.update_one(
-            {"user_id": user_id},
-            {"$set": {
-                "average_rating": round(results[0]["average_rating"], 1),
-                "total_reviews": results[0]["total_reviews"],
-                "updated_at": datetime.now(timezone.utc)
-            }},
-            upsert=True
+    extra = [doc_id for row in rows for doc_id in row["ids"][1:]]
+    for i in range(0, len(extra), 1000):
+        await db.reviews.delete_many({"_id": {"$in": extra[i:i + 1000]}})
+    return len(extra)
+
+async def create_review_unique_index():
+    try:
+        await db.reviews.create_index(REVIEW_UNIQUE_KEY, unique=True)
+    except OperationFailure as e:
+        # Duplicates from before the index; `python manage.py backfill-ratings` removes them
+        logger.error(f"Unique review index not created, run backfill-ratings: {e}")
+
+async def rebuild_rating_stats() -> int:
+    """Recompute every user's rating counters from the reviews collection.
+    
+    The counters are overwritten with absolute values, so a review submitted
+    while this runs can be lost; it is only run from `manage.py backfill-ratings`,
+    never while the server takes traffic.
+    """
+    rows = await db.reviews.aggregate([
+        {"$group": {
+            "_id": {"user_id": "$reviewed_user_id", "review_type": "$review_type", "rating": "$rating"},
+            "count": {"$sum": 1}
+        }}
+    ]).to_list(None)
+    
+    counters = {}
+    for row in rows:
+        key = (row["_id"]["review_type"], row["_id"]["user_id"])
+        rating, count = row["_id"]["rating"], row["count"]
+        entry = counters.setdefault(key, {"sum": 0, "count": 0, "histogram": {}})
+        entry["sum"] += rating * count
+        entry["count"] += count
+        entry["histogram"][str(rating)] = count
+    
+    now = datetime.now(timezone.utc)
+    for review_type in ["brand_to_influencer", "influencer_to_brand"]:
+        collection = rating_stats_collection(review_type)
+        rated = {user_id: entry for (kind, user_id), entry in counters.items() if kind == review_type}
+        
+        updates = [
+            UpdateOne(
+                {"user_id": user_id},
+                {
+                    "$set": {**rating_stats_fields(entry["sum"], entry["count"], entry["histogram"]), "updated_at": now},
+                    "$setOnInsert": {"stats_id": f"stats_{uuid.uuid4().hex[:12]}"}
+                },
+                upsert=True
+            )
+            for user_id, entry in rated.items()
+        ]
+        if updates:
+            await collection.bulk_write(updates, ordered=False)
+        
+        # Users whose reviews are all gone
+        await collection.update_many(
+            {"user_id": {"$nin": list(rated)}, "rating_count": {"$ne": 0}},
+            {"$set": rating_stats_fields(0, 0, {})}
         )
+    
+    return len(counters)
+
+@api_router.get("/brand-stats/{user_id}")
+async def get_brand_stats(user_id: str):
+    """Public endpoint to get a brand's rating summary"""
+    stats_doc = await db.brand_stats.find_one({"user_id": user_id}, {"_id": 0})
+    
+    return stats_doc or {"user_id": user_id, **rating_stats_fields(0, 0, {})}
 
 @api_router.get("/reviews/user/{user_id}", response_model=List[Review])
 async def get_user_reviews(user_id: str):
@@ -2340,7 +3837,7 @@ async def create_update_stats(request: Request, stats_data: InfluencerStatsCreat
     # Check if stats exist
     existing = await db.influencer_stats.find_one({"user_id": user.user_id})
     
-    stats_id = existing["stats_id"] if existing else f"stats_{uuid.uuid4().hex[:12]}"
+    stats_id = (existing or {}).get("stats_id") or f"stats_{uuid.uuid4().hex[:12]}"
     
     # Calculate total reach
     total_reach = 0
@@ -2358,19 +3855,20 @@ async def create_update_stats(request: Request, stats_data: InfluencerStatsCreat
         "user_id": user.user_id,
         **stats_data.model_dump(),
         "total_reach": total_reach,
-        "completed_jobs": existing.get("completed_jobs", 0) if existing else 0,
-        "average_rating": existing.get("average_rating", 0.0) if existing else 0.0,
-        "total_reviews": existing.get("total_reviews", 0) if existing else 0,
         "updated_at": datetime.now(timezone.utc)
     }
     
     if existing:
+        # Rating counters are only changed by new reviews, never overwritten here
         await db.influencer_stats.update_one(
             {"user_id": user.user_id},
             {"$set": stats_doc}
         )
+        stats_doc = {**existing, **stats_doc}
     else:
+        stats_doc.update(completed_jobs=0, **rating_stats_fields(0, 0, {}))
         await db.influencer_stats.insert_one(stats_doc)
+    await invalidate_cache("leaderboards")
     
     stats_doc.pop("_id", None)
     return InfluencerStats(**stats_doc)
@@ -2387,22 +3885,27 @@ async def get_my_stats(request: Request):
     return InfluencerStats(**stats_doc)
 
 @api_router.get("/influencer-stats/top-influencers")
+@cached("top_influencers", ttl=300, tags=["leaderboards"])
 async def get_top_influencers():
     """Get top influencers by rating and reach"""
     pipeline = [
         {"$match": {"total_reach": {"$gt": 0}}},
-        {"$sort": {"average_rating": -1, "total_reach": -1}},
+        {"$set": {"rating_score": {"$ifNull": ["$rating_score", RATING_PRIOR_MEAN]}}},
+        {"$sort": {"rating_score": -1, "total_reach": -1}},
         {"$limit": 10}
     ]
     
     stats = await db.influencer_stats.aggregate(pipeline).to_list(10)
     
     # Get user info for each
+    user_ids = [stat["user_id"] for stat in stats]
+    users, profiles = await asyncio.gather(
+        doc_loader("users").load_many(user_ids),
+        doc_loader("influencer_profiles").load_many(user_ids)
+    )
+    
     result = []
-    for stat in stats:
-        user_doc = await db.users.find_one({"user_id": stat["user_id"]}, {"_id": 0, "password_hash": 0})
-        profile_doc = await db.influencer_profiles.find_one({"user_id": stat["user_id"]}, {"_id": 0})
-        
+    for stat, user_doc, profile_doc in zip(stats, users, profiles):
         if user_doc:
             result.append({
                 "user": user_doc,
@@ -2473,6 +3976,8 @@ async def award_badge(request: Request, user_id: str, badge_data: BadgeRequest):
         link="/profile"
     )
     
+    audit_log(request, "badge.award", "user", user_id, badge_data.badge_type)
+    
     return {"message": f"Badge '{badge_data.badge_type}' awarded to user"}
 
 @api_router.delete("/admin/badges/{user_id}")
@@ -2483,24 +3988,29 @@ async def remove_badge(request: Request, user_id: str):
         {"user_id": user_id},
         {"$set": {"badge": None}}
     )
+    audit_log(request, "badge.remove", "user", user_id)
     
     return {"message": "Badge removed"}
 
 @api_router.get("/admin/badges")
-async def get_all_badges(request: Request):
+async def get_all_badges(
+    request: Request,
+    response: Response,
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    q: Optional[str] = None
+):
     await require_role(request, ["admin"])
     
-    badges = await db.badges.find({}, {"_id": 0}).sort("awarded_at", -1).to_list(100)
+    badges = await fetch_admin_page("badges", admin_list_query("badges", request, q), response, limit, skip, sort)
     
     # Get user names
-    result = []
-    for badge in badges:
-        user_doc = await db.users.find_one({"user_id": badge["user_id"]}, {"_id": 0, "password_hash": 0})
-        if user_doc:
-            badge["user_name"] = user_doc.get("name", "Unknown")
-            result.append(badge)
+    users = await doc_loader("users").load_many([b["user_id"] for b in badges])
+    for badge, user_doc in zip(badges, users):
+        badge["user_name"] = user_doc.get("name", "Unknown") if user_doc else "Unknown"
     
-    return result
+    return badges
 
 @api_router.get("/badges/user/{user_id}")
 async def get_user_badges(user_id: str):
@@ -2517,109 +4027,165 @@ async def get_user_badges(user_id: str):
 
 # ============= ADMIN CONTENT MANAGEMENT ROUTES =============
 
-@api_router.get("/admin/dashboard-stats")
-async def get_dashboard_stats(request: Request):
-    """Get detailed dashboard statistics for admin"""
-    await require_role(request, ["admin"])
-    
-    # User stats
-    total_users = await db.users.count_documents({})
-    brands = await db.users.count_documents({"user_type": "marka"})
-    influencers = await db.users.count_documents({"user_type": "influencer"})
-    
-    # Get users by date for chart
-    from datetime import timedelta
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=30)
+# Dashboard numbers are served from a snapshot document. A snapshot younger than
+# DASHBOARD_STATS_FRESH_SECONDS is returned as is; an older one is still returned
+# while a background task recomputes it, up to DASHBOARD_STATS_MAX_AGE_SECONDS,
+# after which the request waits for fresh numbers.
+DASHBOARD_STATS_FRESH_SECONDS = int(os.environ.get('DASHBOARD_STATS_FRESH_SECONDS', '60'))
+DASHBOARD_STATS_MAX_AGE_SECONDS = int(os.environ.get('DASHBOARD_STATS_MAX_AGE_SECONDS', '3600'))
+DASHBOARD_GROWTH_DAYS = 30
+
+dashboard_refresh_task: Optional[asyncio.Task] = None
+
+def count_by(field: str) -> list:
+    return [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+
+def counts_of(rows: list) -> dict:
+    return {row["_id"]: row["count"] for row in rows}
+
+async def compute_dashboard_stats() -> dict:
+    """Collect all dashboard numbers with one aggregation per collection"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start_date = today - timedelta(days=DASHBOARD_GROWTH_DAYS - 1)
+    
+    users, jobs, matches, applications = await asyncio.gather(
+        db.users.aggregate([{"$facet": {
+            "by_type": count_by("user_type"),
+            "growth": [
+                {"$match": {"created_at": {"$gte": start_date}}},
+                {"$group": {
+                    "_id": {"$dateTrunc": {"date": "$created_at", "unit": "day"}},
+                    "count": {"$sum": 1}
+                }}
+            ]
+        }}]).to_list(1),
+        db.job_posts.aggregate([{"$facet": {
+            "by_status": count_by("status"),
+            "by_approval": count_by("approval_status"),
+            "categories": count_by("category") + [{"$sort": {"count": -1}}, {"$limit": 10}]
+        }}]).to_list(1),
+        db.matches.aggregate(count_by("status")).to_list(None),
+        db.applications.aggregate(count_by("status")).to_list(None)
+    )
     
+    users_by_type = counts_of(users[0]["by_type"])
+    signups = {row["_id"].strftime("%Y-%m-%d"): row["count"] for row in users[0]["growth"]}
     user_growth = []
-    for i in range(30):
-        day = start_date + timedelta(days=i)
-        next_day = day + timedelta(days=1)
-        count = await db.users.count_documents({
-            "created_at": {"$gte": day, "$lt": next_day}
-        })
-        user_growth.append({
-            "date": day.strftime("%Y-%m-%d"),
-            "count": count
-        })
-    
-    # Job stats
-    total_jobs = await db.job_posts.count_documents({})
-    open_jobs = await db.job_posts.count_documents({"status": "open"})
-    pending_jobs = await db.job_posts.count_documents({"approval_status": "pending"})
-    approved_jobs = await db.job_posts.count_documents({"approval_status": "approved"})
-    
-    # Match stats
-    total_matches = await db.matches.count_documents({})
-    active_matches = await db.matches.count_documents({"status": "active"})
-    completed_matches = await db.matches.count_documents({"status": "completed"})
-    
-    # Application stats
-    total_applications = await db.applications.count_documents({})
-    pending_applications = await db.applications.count_documents({"status": "pending"})
-    accepted_applications = await db.applications.count_documents({"status": "accepted"})
+    for i in range(DASHBOARD_GROWTH_DAYS):
+        day = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
+        user_growth.append({"date": day, "count": signups.get(day, 0)})
     
-    # Category distribution
-    categories = await db.job_posts.aggregate([
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]).to_list(10)
+    jobs_by_status = counts_of(jobs[0]["by_status"])
+    jobs_by_approval = counts_of(jobs[0]["by_approval"])
+    matches_by_status = counts_of(matches)
+    applications_by_status = counts_of(applications)
     
     return {
         "users": {
-            "total": total_users,
-            "brands": brands,
-            "influencers": influencers,
+            "total": sum(users_by_type.values()),
+            "brands": users_by_type.get("marka", 0),
+            "influencers": users_by_type.get("influencer", 0),
             "growth": user_growth
         },
         "jobs": {
-            "total": total_jobs,
-            "open": open_jobs,
-            "pending": pending_jobs,
-            "approved": approved_jobs
+            "total": sum(jobs_by_status.values()),
+            "open": jobs_by_status.get("open", 0),
+            "pending": jobs_by_approval.get("pending", 0),
+            "approved": jobs_by_approval.get("approved", 0)
         },
         "matches": {
-            "total": total_matches,
-            "active": active_matches,
-            "completed": completed_matches
+            "total": sum(matches_by_status.values()),
+            "active": matches_by_status.get("active", 0),
+            "completed": matches_by_status.get("completed", 0)
         },
         "applications": {
-            "total": total_applications,
-            "pending": pending_applications,
-            "accepted": accepted_applications
+            "total": sum(applications_by_status.values()),
+            "pending": applications_by_status.get("pending", 0),
+            "accepted": applications_by_status.get("accepted", 0)
         },
-        "categories": [{"name": c["_id"] or "Diğer", "count": c["count"]} for c in categories]
+        "categories": [{"name": c["_id"] or "Diğer", "count": c["count"]} for c in jobs[0]["categories"]]
     }
 
+async def refresh_dashboard_snapshot() -> dict:
+    stats = await compute_dashboard_stats()
+    stats["generated_at"] = datetime.now(timezone.utc)
+    await db.dashboard_snapshots.replace_one(
+        {"_id": "admin_dashboard"},
+        {"stats": stats, "generated_at": stats["generated_at"]},
+        upsert=True
+    )
+    return stats
+
+async def refresh_dashboard_snapshot_in_background():
+    # The lease keeps several workers from recomputing the same stale snapshot
+    try:
+        if await acquire_maintenance_lease("dashboard_stats", DASHBOARD_STATS_FRESH_SECONDS):
+            await refresh_dashboard_snapshot()
+    except Exception as e:
+        logger.error(f"Dashboard snapshot refresh failed: {e}")
+
+@api_router.get("/admin/dashboard-stats")
+async def get_dashboard_stats(request: Request):
+    """Get detailed dashboard statistics for admin"""
+    global dashboard_refresh_task
+    await require_role(request, ["admin"])
+    
+    snapshot = await db.dashboard_snapshots.find_one({"_id": "admin_dashboard"})
+    if not snapshot:
+        return await refresh_dashboard_snapshot()
+    
+    generated_at = snapshot["generated_at"]
+    if generated_at.tzinfo is None:
+        generated_at = generated_at.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - generated_at).total_seconds()
+    
+    if age > DASHBOARD_STATS_MAX_AGE_SECONDS:
+        return await refresh_dashboard_snapshot()
+    
+    if age > DASHBOARD_STATS_FRESH_SECONDS and (dashboard_refresh_task is None or dashboard_refresh_task.done()):
+        dashboard_refresh_task = asyncio.create_task(refresh_dashboard_snapshot_in_background())
+    
+    return snapshot["stats"]
+
 @api_router.get("/admin/activity-logs")
-async def get_activity_logs(request: Request, limit: int = 50, skip: int = 0):
-    """Get recent activity logs"""
+async def get_activity_logs(
+    request: Request,
+    response: Response,
+    limit: int = AUDIT_LOG_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None,
+    action: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None
+):
+    """Get recent activity logs, newest first. Pass X-Next-Cursor back as ?cursor= for the next page."""
     await require_role(request, ["admin"])
     
+    limit = max(1, min(limit, 200))
+    query = {
+        field: value for field, value in
+        {"user_id": user_id, "action": action, "target_type": target_type, "target_id": target_id}.items()
+        if value
+    }
+    
+    if cursor:
+        timestamp, log_id = decode_log_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "log_id": {"$lt": log_id}}
+        ]
+    
     logs = await db.activity_logs.find(
-        {},
+        query,
         {"_id": 0}
-    ).sort("timestamp", -1).skip(skip).limit(limit).to_list(limit)
+    ).sort([("timestamp", -1), ("log_id", -1)]).limit(limit + 1).to_list(limit + 1)
+    
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_log_cursor(logs[-1])
     
     return logs
 
-@api_router.post("/admin/activity-logs")
-async def create_activity_log(user_id: str, action: str, details: str = "", target_type: str = "", target_id: str = ""):
-    """Create an activity log entry (internal use)"""
-    log_doc = {
-        "log_id": f"log_{uuid.uuid4().hex[:12]}",
-        "user_id": user_id,
-        "action": action,
-        "details": details,
-        "target_type": target_type,
-        "target_id": target_id,
-        "timestamp": datetime.now(timezone.utc)
-    }
-    await db.activity_logs.insert_one(log_doc)
-    return log_doc
-
 # Popup Settings
 @api_router.get("/admin/popup-settings")
 async def get_popup_settings(request: Request):
@@ -2653,9 +4219,13 @@ async def update_popup_settings(request: Request, settings: dict):
         upsert=True
     )
     
+    await invalidate_cache("popup_settings")
+    audit_log(request, "popup.update", "popup_settings", "homepage")
+    
     return {"message": "Popup settings updated"}
 
-@api_router.get("/popup-settings")
+@api_router.api_route("/popup-settings", methods=["GET", "HEAD"])
+@cached("popup_settings", tags=["popup_settings"])
 async def get_public_popup_settings():
     """Get popup settings for public display"""
     settings = await db.popup_settings.find_one({"type": "homepage", "enabled": True}, {"_id": 0})
@@ -2708,43 +4278,52 @@ async def create_admin_content(request: Request, content: dict):
         content_doc["event_type"] = content.get("event_type", "webinar")
     
     await db.admin_content.insert_one(content_doc)
+    await invalidate_cache("content")
     content_doc.pop("_id", None)
+    audit_log(request, "content.create", content_doc["content_type"], content_doc["content_id"], content_doc["title"])
     
     return content_doc
 
 @api_router.put("/admin/content/{content_id}")
 async def update_admin_content(request: Request, content_id: str, content: dict):
     """Update existing content"""
-    await require_role(request, ["admin"])
+    admin = await require_role(request, ["admin"])
     
     content["updated_at"] = datetime.now(timezone.utc)
     content.pop("content_id", None)
     content.pop("_id", None)
     
-    result = await db.admin_content.update_one(
+    existing = await db.admin_content.find_one_and_update(
         {"content_id": content_id},
         {"$set": content}
     )
     
-    if result.matched_count == 0:
+    if not existing:
         raise HTTPException(status_code=404, detail="Content not found")
+    await invalidate_cache("content")
+    await release_replaced_uploads(admin.user_id, existing, {**existing, **content}, ["image_url"])
     
+    audit_log(request, "content.update", "content", content_id, content.get("title", ""))
     return {"message": "Content updated"}
 
 @api_router.delete("/admin/content/{content_id}")
 async def delete_admin_content(request: Request, content_id: str):
     """Delete content"""
-    await require_role(request, ["admin"])
+    admin = await require_role(request, ["admin"])
     
-    result = await db.admin_content.delete_one({"content_id": content_id})
+    deleted = await db.admin_content.find_one_and_delete({"content_id": content_id})
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Content not found")
+    await invalidate_cache("content")
+    await release_replaced_uploads(admin.user_id, deleted, None, ["image_url"])
     
+    audit_log(request, "content.delete", "content", content_id)
     return {"message": "Content deleted"}
 
 # Public content endpoints
-@api_router.get("/content/{content_type}")
+@api_router.api_route("/content/{content_type}", methods=["GET", "HEAD"])
+@cached("content", tags=["content"])
 async def get_public_content(content_type: str, limit: int = 10):
     """Get published content by type"""
     content = await db.admin_content.find(
@@ -2754,7 +4333,8 @@ async def get_public_content(content_type: str, limit: int = 10):
     
     return content
 
-@api_router.get("/content/{content_type}/featured")
+@api_router.api_route("/content/{content_type}/featured", methods=["GET", "HEAD"])
+@cached("featured_content", tags=["content"])
 async def get_featured_content(content_type: str, limit: int = 5):
     """Get featured content by type"""
     content = await db.admin_content.find(
@@ -2943,6 +4523,7 @@ async def accept_proposal(request: Request, brief_id: str, proposal_id: str):
     )
     
     # Create a match
+    now = datetime.now(timezone.utc)
     match_doc = {
         "match_id": f"match_{uuid.uuid4().hex[:12]}",
         "job_id": brief_id,  # Using brief_id as job reference
@@ -2953,10 +4534,15 @@ async def accept_proposal(request: Request, brief_id: str, proposal_id: str):
         "influencer_name": proposal["influencer_name"],
         "agreed_price": proposal["proposed_price"],
         "status": "active",
-        "created_at": datetime.now(timezone.utc)
+        "created_at": now,
+        # Inbox summary, kept up to date by send_message
+        "last_message": None,
+        "last_activity_at": now,
+        "unread_counts": {}
     }
     
     await db.matches.insert_one(match_doc)
+    await record_metric("matches.created")
     
     # Notify influencer
     await create_notification(
@@ -2991,6 +4577,8 @@ async def get_portfolio(user_id: str):
         "portfolio": items
     }
 
+PORTFOLIO_UPLOAD_FIELDS = ["image_url", "video_url"]
+
 @api_router.post("/portfolio")
 async def add_portfolio_item(request: Request, item: dict):
     """Add a portfolio item"""
@@ -3033,6 +4621,7 @@ async def update_portfolio_item(request: Request, item_id: str, item: dict):
         {"item_id": item_id},
         {"$set": item}
     )
+    await release_replaced_uploads(user.user_id, existing, {**existing, **item}, PORTFOLIO_UPLOAD_FIELDS)
     
     return {"message": "Portfolio item updated"}
 
@@ -3041,13 +4630,14 @@ async def delete_portfolio_item(request: Request, item_id: str):
     """Delete a portfolio item"""
     user = await require_role(request, ["influencer"])
     
-    result = await db.portfolio_items.delete_one({
+    deleted = await db.portfolio_items.find_one_and_delete({
         "item_id": item_id,
         "user_id": user.user_id
     })
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Item not found or not yours")
+    await release_replaced_uploads(user.user_id, deleted, None, PORTFOLIO_UPLOAD_FIELDS)
     
     return {"message": "Portfolio item deleted"}
 
@@ -3261,12 +4851,50 @@ async def admin_get_verifications(request: Request, status: str = "pending"):
     ).sort("submitted_at", -1).to_list(100)
     
     # Get user info for each
-    for v in verifications:
-        user = await db.users.find_one({"user_id": v["user_id"]}, {"_id": 0, "password_hash": 0})
+    users = await doc_loader("users").load_many([v["user_id"] for v in verifications])
+    for v, user in zip(verifications, users):
         v["user"] = user
     
     return verifications
 
+class BulkVerificationReview(BaseModel):
+    verification_ids: List[str]
+    status: str  # 'approved' or 'rejected'
+    notes: Optional[str] = None
+
+def verification_review_update(status: str, admin: User, notes: Optional[str]) -> dict:
+    return {
+        "status": status,
+        "reviewed_at": datetime.now(timezone.utc),
+        "reviewed_by": admin.user_id,
+        "admin_notes": notes or ""
+    }
+
+def verification_user_update(status: str) -> dict:
+    # Approval also grants the verified badge
+    if status == "approved":
+        return {"badge": "verified", "verification_status": "approved"}
+    return {"verification_status": "rejected"}
+
+def verification_notification(user_id: str, status: str, notes: Optional[str]) -> dict:
+    """create_notification arguments for a reviewed verification"""
+    if status == "approved":
+        return dict(
+            user_id=user_id,
+            type="verification",
+            title="Kimlik Doğrulandı! ✓",
+            message="Kimlik doğrulamanız onaylandı. Artık 'Doğrulanmış' rozetine sahipsiniz.",
+            link="/settings"
+        )
+    
+    return dict(
+        user_id=user_id,
+        type="verification",
+        title="Doğrulama Reddedildi",
+        message=f"Kimlik doğrulamanız reddedildi. Sebep: {notes or 'Belirtilmedi'}",
+        link="/settings"
+    )
+
 @api_router.put("/admin/identity-verifications/{verification_id}")
 async def admin_review_verification(request: Request, verification_id: str, data: dict):
     """Admin: Approve or reject verification"""
@@ -3282,47 +4910,57 @@ async def admin_review_verification(request: Request, verification_id: str, data
     
     await db.identity_verifications.update_one(
         {"verification_id": verification_id},
-        {"$set": {
-            "status": status,
-            "reviewed_at": datetime.now(timezone.utc),
-            "reviewed_by": admin.user_id,
-            "admin_notes": data.get("notes", "")
-        }}
+        {"$set": verification_review_update(status, admin, data.get("notes"))}
     )
     
     # Update user badge
-    if status == "approved":
-        await db.users.update_one(
-            {"user_id": verification["user_id"]},
-            {"$set": {
-                "badge": "verified",
-                "verification_status": "approved"
-            }}
-        )
-        
-        await create_notification(
-            user_id=verification["user_id"],
-            type="verification",
-            title="Kimlik Doğrulandı! ✓",
-            message="Kimlik doğrulamanız onaylandı. Artık 'Doğrulanmış' rozetine sahipsiniz.",
-            link="/settings"
-        )
-    else:
-        await db.users.update_one(
-            {"user_id": verification["user_id"]},
-            {"$set": {"verification_status": "rejected"}}
-        )
-        
-        await create_notification(
-            user_id=verification["user_id"],
-            type="verification",
-            title="Doğrulama Reddedildi",
-            message=f"Kimlik doğrulamanız reddedildi. Sebep: {data.get('notes', 'Belirtilmedi')}",
-            link="/settings"
-        )
+    await db.users.update_one(
+        {"user_id": verification["user_id"]},
+        {"$set": verification_user_update(status)}
+    )
+    
+    await create_notification(**verification_notification(verification["user_id"], status, data.get("notes")))
+    
+    audit_log(request, "verification.review", "verification", verification_id, status)
     
     return {"message": f"Verification {status}"}
 
+@api_router.post("/admin/identity-verifications/bulk-review")
+async def admin_bulk_review_verifications(request: Request, review: BulkVerificationReview):
+    """Admin: Approve or reject many verifications at once"""
+    admin = await require_role(request, ["admin"])
+    
+    if review.status not in ["approved", "rejected"]:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    verification_ids = unique_bulk_ids(review.verification_ids)
+    verifications = await db.identity_verifications.find(
+        {"verification_id": {"$in": verification_ids}},
+        {"_id": 0, "verification_id": 1, "user_id": 1}
+    ).to_list(None)
+    owners = {v["verification_id"]: v["user_id"] for v in verifications}
+    
+    update_data = verification_review_update(review.status, admin, review.notes)
+    failed = await apply_bulk_updates(db.identity_verifications, [
+        (verification_id, UpdateOne({"verification_id": verification_id}, {"$set": update_data}))
+        for verification_id in owners
+    ])
+    
+    reviewed_users = list(dict.fromkeys(user_id for vid, user_id in owners.items() if vid not in failed))
+    if reviewed_users:
+        await db.users.update_many(
+            {"user_id": {"$in": reviewed_users}},
+            {"$set": verification_user_update(review.status)}
+        )
+    await create_notifications([
+        new_notification(**verification_notification(user_id, review.status, review.notes))
+        for user_id in reviewed_users
+    ])
+    
+    result = bulk_results(verification_ids, set(verification_ids) - set(owners), failed)
+    audit_log(request, "verification.bulk_review", "verification", "", bulk_audit_details(review.status, result))
+    return result
+
 # ============= ETAP 5: DISPUTE RESOLUTION =============
 
 @api_router.post("/disputes")
@@ -3369,6 +5007,7 @@ async def create_dispute(request: Request, data: dict):
     }
     
     await db.disputes.insert_one(dispute_doc)
+    await record_metric("disputes.opened")
     
     # Notify admin
     admins = await db.users.find({"user_type": "admin"}).to_list(10)
@@ -3400,15 +5039,23 @@ async def get_my_disputes(request: Request):
     return disputes
 
 @api_router.get("/admin/disputes")
-async def admin_get_disputes(request: Request, status: str = "open"):
+async def admin_get_disputes(
+    request: Request,
+    response: Response,
+    status: str = "open",
+    limit: int = ADMIN_PAGE_SIZE,
+    skip: int = 0,
+    sort: Optional[str] = None,
+    q: Optional[str] = None
+):
     """Admin: Get all disputes"""
     await require_role(request, ["admin"])
     
-    query = {} if status == "all" else {"status": status}
-    
-    disputes = await db.disputes.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    query = admin_list_query("disputes", request, q)
+    if status != "all":
+        query["status"] = status
     
-    return disputes
+    return await fetch_admin_page("disputes", query, response, limit, skip, sort)
 
 @api_router.put("/admin/disputes/{dispute_id}")
 async def admin_resolve_dispute(request: Request, dispute_id: str, data: dict):
@@ -3443,8 +5090,57 @@ async def admin_resolve_dispute(request: Request, dispute_id: str, data: dict):
             link="/settings"
         )
     
+    audit_log(request, "dispute.update", "dispute", dispute_id, update["status"])
+    
     return {"message": "Dispute updated"}
 
+class BulkDisputeUpdate(BaseModel):
+    dispute_ids: List[str]
+    status: str
+    admin_notes: Optional[str] = None
+    resolution: Optional[str] = None
+
+@api_router.post("/admin/disputes/bulk-update")
+async def admin_bulk_update_disputes(request: Request, data: BulkDisputeUpdate):
+    """Admin: Set the status (and optionally notes/resolution) of many disputes"""
+    await require_role(request, ["admin"])
+    
+    dispute_ids = unique_bulk_ids(data.dispute_ids)
+    disputes = await db.disputes.find(
+        {"dispute_id": {"$in": dispute_ids}},
+        {"_id": 0, "dispute_id": 1, "reporter_user_id": 1, "reported_user_id": 1}
+    ).to_list(None)
+    
+    update = {"status": data.status}
+    if data.admin_notes is not None:
+        update["admin_notes"] = data.admin_notes
+    if data.resolution is not None:
+        update["resolution"] = data.resolution
+    if data.status == "resolved":
+        update["resolved_at"] = datetime.now(timezone.utc)
+    
+    failed = await apply_bulk_updates(db.disputes, [
+        (d["dispute_id"], UpdateOne({"dispute_id": d["dispute_id"]}, {"$set": update}))
+        for d in disputes
+    ])
+    
+    # Notify both parties of every updated dispute
+    await create_notifications([
+        new_notification(
+            user_id=user_id,
+            type="dispute",
+            title="Anlaşmazlık Güncellendi",
+            message=f"Anlaşmazlık durumu: {data.status}",
+            link="/settings"
+        )
+        for d in disputes if d["dispute_id"] not in failed
+        for user_id in [d["reporter_user_id"], d["reported_user_id"]]
+    ])
+    
+    result = bulk_results(dispute_ids, set(dispute_ids) - {d["dispute_id"] for d in disputes}, failed)
+    audit_log(request, "dispute.bulk_update", "dispute", "", bulk_audit_details(data.status, result))
+    return result
+
 # ============= ADMIN: SOCIAL ACCOUNTS =============
 
 @api_router.get("/admin/social-accounts")
@@ -3478,6 +5174,16 @@ async def admin_get_social_accounts(request: Request):
     accounts = await db.social_accounts.aggregate(pipeline).to_list(100)
     return accounts
 
+def social_account_notification(user_id: str, platform: str, verified: bool) -> dict:
+    """create_notification arguments for a reviewed social account"""
+    return dict(
+        user_id=user_id,
+        type="social_verification",
+        title="Sosyal Hesap Doğrulama",
+        message=f"{platform.capitalize()} hesabınız {'onaylandı' if verified else 'reddedildi'}!",
+        link="/social-accounts"
+    )
+
 @api_router.put("/admin/social-accounts/{user_id}/{platform}")
 async def admin_update_social_account(request: Request, user_id: str, platform: str):
     """Admin: Approve or reject social account"""
@@ -3495,44 +5201,103 @@ async def admin_update_social_account(request: Request, user_id: str, platform:
         raise HTTPException(status_code=404, detail="Social account not found")
     
     # Notify user
-    await create_notification(
-        user_id=user_id,
-        type="social_verification",
-        title="Sosyal Hesap Doğrulama",
-        message=f"{platform.capitalize()} hesabınız {'onaylandı' if verified else 'reddedildi'}!",
-        link="/social-accounts"
-    )
+    await create_notification(**social_account_notification(user_id, platform, verified))
+    
+    audit_log(request, "social_account.review", "social_account", f"{user_id}:{platform}", "verified" if verified else "rejected")
     
     return {"message": f"Social account {'verified' if verified else 'rejected'}"}
 
-# ============= ETAP 5: CONTRACT SIGNATURES =============
+class SocialAccountRef(BaseModel):
+    user_id: str
+    platform: str
 
-@api_router.post("/contracts/{contract_id}/sign")
-async def sign_contract(request: Request, contract_id: str):
-    """Sign a contract"""
-    user = await require_auth(request)
+class BulkSocialAccountReview(BaseModel):
+    accounts: List[SocialAccountRef]
+    verified: bool
+
+@api_router.post("/admin/social-accounts/bulk-review")
+async def admin_bulk_update_social_accounts(request: Request, review: BulkSocialAccountReview):
+    """Admin: Approve or reject many social accounts at once. Items are identified as "user_id:platform"."""
+    await require_role(request, ["admin"])
     
-    # Get contract
-    contract = await db.contracts.find_one({"contract_id": contract_id})
-    if not contract:
-        raise HTTPException(status_code=404, detail="Contract not found")
-    
-    # Verify user is part of this contract
-    if contract["brand_user_id"] != user.user_id and contract["influencer_user_id"] != user.user_id:
-        raise HTTPException(status_code=403, detail="Not your contract")
+    keys = unique_bulk_ids([f"{a.user_id}:{a.platform}" for a in review.accounts])
+    refs = [key.split(":", 1) for key in keys]
+    existing = await db.social_accounts.find(
+        {"$or": [{"user_id": user_id, "platform": platform} for user_id, platform in refs]},
+        {"_id": 0, "user_id": 1, "platform": 1}
+    ).to_list(None)
+    found = {f"{a['user_id']}:{a['platform']}" for a in existing}
+    
+    update = {"verified": review.verified, "verified_at": datetime.now(timezone.utc) if review.verified else None}
+    failed = await apply_bulk_updates(db.social_accounts, [
+        (f"{user_id}:{platform}", UpdateOne({"user_id": user_id, "platform": platform}, {"$set": update}))
+        for user_id, platform in refs if f"{user_id}:{platform}" in found
+    ])
+    
+    await create_notifications([
+        new_notification(**social_account_notification(user_id, platform, review.verified))
+        for user_id, platform in refs
+        if f"{user_id}:{platform}" in found and f"{user_id}:{platform}" not in failed
+    ])
+    
+    result = bulk_results(keys, set(keys) - found, failed)
+    audit_log(request, "social_account.bulk_review", "social_account", "", bulk_audit_details("verified" if review.verified else "rejected", result))
+    return result
+
+# ============= ETAP 5: CONTRACT SIGNATURES =============
+
+# Contracts can only be signed before both parties have. The brand_signed /
+# influencer_signed flags on the contract are the record of who signed;
+# contract_signatures keeps one audit row per signer.
+SIGNABLE_CONTRACT_STATUSES = ["draft", "pending"]
+CONTRACT_SIGNATURE_UNIQUE_KEY = [("contract_id", 1), ("user_id", 1)]
+CONTRACT_SIGNATURE_MIGRATION_LEASE_SECONDS = 3600
+CONTRACT_SIGNATURE_MIGRATION_BATCH_SIZE = 500
+
+def contract_signed_update(signer_ids: list, now: datetime, legacy_signed: bool = False) -> list:
+    """Update pipeline marking signer_ids as signed and activating the contract once both have.
     
-    # Check if already signed
-    existing = await db.contract_signatures.find_one({
-        "contract_id": contract_id,
-        "user_id": user.user_id
-    })
-    if existing:
-        raise HTTPException(status_code=400, detail="Already signed")
+    legacy_signed also counts status "signed", which the previous signature flow
+    set once both parties had signed, as signed by both.
+    """
+    def signed(flag: str, party: str) -> dict:
+        conditions = [f"${flag}", {"$in": [f"${party}", signer_ids]}]
+        if legacy_signed:
+            conditions.append({"$eq": ["$status", "signed"]})
+        return {"$or": conditions}
+    
+    both_signed = {"$and": ["$brand_signed", "$influencer_signed"]}
+    return [
+        {"$set": {
+            "brand_signed": signed("brand_signed", "brand_user_id"),
+            "influencer_signed": signed("influencer_signed", "influencer_user_id"),
+            "updated_at": now
+        }},
+        {"$set": {
+            "status": {"$cond": [
+                both_signed, "active",
+                {"$cond": [{"$or": ["$brand_signed", "$influencer_signed"]}, "pending", "$status"]}
+            ]},
+            "signed_at": {"$cond": [both_signed, {"$ifNull": ["$signed_at", now]}, "$$REMOVE"]}
+        }}
+    ]
+
+@api_router.post("/contracts/{contract_id}/sign")
+async def sign_contract(request: Request, contract_id: str):
+    """Sign a contract.
+
+    The signature flag and the status transition are applied by a single
+    conditional update, so two parties signing at the same moment cannot both
+    miss the "both signed" step, and a second signature by the same user
+    matches nothing. The audit record is written in the same transaction.
+    """
+    user = await require_auth(request)
     
     # Get IP and user agent
     forwarded_for = request.headers.get("x-forwarded-for", "")
     ip_address = forwarded_for.split(",")[0].strip() if forwarded_for else request.client.host
     user_agent = request.headers.get("user-agent", "Unknown")
+    now = datetime.now(timezone.utc)
     
     signature_doc = {
         "signature_id": f"sig_{uuid.uuid4().hex[:12]}",
@@ -3540,36 +5305,66 @@ async def sign_contract(request: Request, contract_id: str):
         "user_id": user.user_id,
         "user_name": user.name,
         "user_type": user.user_type,
-        "signed_at": datetime.now(timezone.utc),
+        "signed_at": now,
         "ip_address": ip_address,
         "user_agent": user_agent[:500],  # Limit length
         "accepted_terms": True
     }
     
-    await db.contract_signatures.insert_one(signature_doc)
+    async def sign(session):
+        contract = await db.contracts.find_one_and_update(
+            {
+                "contract_id": contract_id,
+                "status": {"$in": SIGNABLE_CONTRACT_STATUSES},
+                "$or": [
+                    {"brand_user_id": user.user_id, "brand_signed": {"$ne": True}},
+                    {"influencer_user_id": user.user_id, "influencer_signed": {"$ne": True}}
+                ]
+            },
+            contract_signed_update([user.user_id], now),
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if contract:
+            await db.contract_signatures.insert_one(dict(signature_doc), session=session)
+        return contract
     
-    # Check if both parties signed
-    signatures = await db.contract_signatures.find({"contract_id": contract_id}).to_list(2)
+    try:
+        contract = await run_in_transaction(sign)
+    except DuplicateKeyError:
+        # A signature row without the flag, written before migrate_contract_signatures() ran
+        raise HTTPException(status_code=400, detail="Already signed")
     
-    if len(signatures) == 2:
-        # Both signed - update contract status
-        await db.contracts.update_one(
-            {"contract_id": contract_id},
-            {"$set": {"status": "signed", "signed_at": datetime.now(timezone.utc)}}
-        )
+    if not contract:
+        # Nothing matched: work out why for the error message
+        contract = await db.contracts.find_one({"contract_id": contract_id}, {"_id": 0})
+        if not contract:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        if contract["brand_user_id"] != user.user_id and contract["influencer_user_id"] != user.user_id:
+            raise HTTPException(status_code=403, detail="Not your contract")
+        signed_field = "brand_signed" if user.user_id == contract["brand_user_id"] else "influencer_signed"
+        if contract.get(signed_field):
+            raise HTTPException(status_code=400, detail="Already signed")
+        raise HTTPException(status_code=400, detail=f"Contract is {contract['status']}")
+    
+    if contract["status"] == "active":
+        await record_metric("contracts.signed")
         
         # Notify both parties
-        for sig in signatures:
-            await create_notification(
-                user_id=sig["user_id"],
+        await create_notifications([
+            new_notification(
+                user_id=uid,
                 type="contract",
                 title="Sözleşme İmzalandı! ✍️",
                 message="Her iki taraf da sözleşmeyi imzaladı. İşbirliği başlayabilir!",
-                link="/contracts"
+                link=f"/contracts/{contract_id}"
             )
+            for uid in [contract["brand_user_id"], contract["influencer_user_id"]]
+        ])
     else:
         # Notify the other party
-        other_user_id = contract["influencer_user_id"] if user.user_type == "marka" else contract["brand_user_id"]
+        other_user_id = contract["influencer_user_id"] if user.user_id == contract["brand_user_id"] else contract["brand_user_id"]
         await create_notification(
             user_id=other_user_id,
             type="contract",
@@ -3578,9 +5373,92 @@ async def sign_contract(request: Request, contract_id: str):
             link=f"/contracts/{contract_id}"
         )
     
-    signature_doc.pop("_id", None)
+    signature_doc["contract_status"] = contract["status"]
     return signature_doc
 
+async def remove_duplicate_contract_signatures() -> int:
+    """Keep only the first signature row per (contract, user) so the unique index can be built"""
+    rows = await db.contract_signatures.aggregate([
+        {"$sort": {"signed_at": 1}},
+        {"$group": {
+            "_id": {"contract_id": "$contract_id", "user_id": "$user_id"},
+            "ids": {"$push": "$_id"}
+        }},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ], allowDiskUse=True).to_list(None)
+    
+    extra = [doc_id for row in rows for doc_id in row["ids"][1:]]
+    for i in range(0, len(extra), 1000):
+        await db.contract_signatures.delete_many({"_id": {"$in": extra[i:i + 1000]}})
+    return len(extra)
+
+async def create_contract_signature_unique_index():
+    """One signature row per (contract, user), replacing the earlier non-unique index"""
+    existing = (await db.contract_signatures.index_information()).get("contract_id_1_user_id_1")
+    if existing and existing.get("unique"):
+        return
+    removed = await remove_duplicate_contract_signatures()
+    if removed:
+        logger.info(f"Removed {removed} duplicate contract signatures")
+    try:
+        if existing:
+            await db.contract_signatures.drop_index("contract_id_1_user_id_1")
+        await db.contract_signatures.create_index(CONTRACT_SIGNATURE_UNIQUE_KEY, unique=True)
+    except OperationFailure as e:
+        # Retried on the next start; sign_contract's flag filter still blocks double signing
+        logger.error(f"Unique contract signature index not created: {e}")
+
+async def migrate_contract_signatures():
+    """Set the signature flags once for contracts signed through the previous flow.
+    
+    That flow only wrote contract_signatures rows and moved fully signed
+    contracts to status "signed". The flags are set from the rows and "signed"
+    becomes "active"; each contract is one atomic pipeline update that only
+    adds signers, so signatures arriving meanwhile are kept.
+    """
+    try:
+        if await db.maintenance_reports.find_one({"_id": "contract_signature_flags"}, {"_id": 1}):
+            return
+        if not await acquire_maintenance_lease("contract_signature_migration", CONTRACT_SIGNATURE_MIGRATION_LEASE_SECONDS):
+            return
+        
+        migratable = {"status": {"$in": SIGNABLE_CONTRACT_STATUSES + ["signed"]}}
+        now = datetime.now(timezone.utc)
+        updated = 0
+        cursor = db.contracts.find(migratable, {"_id": 0, "contract_id": 1})
+        batch = []
+        async for contract in cursor:
+            batch.append(contract["contract_id"])
+            if len(batch) < CONTRACT_SIGNATURE_MIGRATION_BATCH_SIZE:
+                continue
+            updated += await migrate_contract_signature_batch(batch, migratable, now)
+            batch = []
+        if batch:
+            updated += await migrate_contract_signature_batch(batch, migratable, now)
+        
+        await db.maintenance_reports.update_one(
+            {"_id": "contract_signature_flags"},
+            {"$set": {"finished_at": datetime.now(timezone.utc), "contracts": updated}},
+            upsert=True
+        )
+        logger.info(f"Contract signature flags set for {updated} contracts")
+    except Exception as e:
+        logger.error(f"Contract signature migration failed: {e}")
+
+async def migrate_contract_signature_batch(contract_ids: list, migratable: dict, now: datetime) -> int:
+    signers = {}
+    async for row in db.contract_signatures.find({"contract_id": {"$in": contract_ids}}, {"_id": 0, "contract_id": 1, "user_id": 1}):
+        signers.setdefault(row["contract_id"], []).append(row["user_id"])
+    
+    result = await db.contracts.bulk_write([
+        UpdateOne(
+            {"contract_id": contract_id, **migratable},
+            contract_signed_update(signers.get(contract_id, []), now, legacy_signed=True)
+        )
+        for contract_id in contract_ids
+    ], ordered=False)
+    return result.modified_count
+
 @api_router.get("/contracts/{contract_id}/signatures")
 async def get_contract_signatures(request: Request, contract_id: str):
     """Get signatures for a contract"""
@@ -3623,15 +5501,18 @@ async def search_influencers(
     # Get all influencer users
     users = await db.users.find(query, {"_id": 0, "password_hash": 0}).to_list(1000)
     
+    # Profiles and stats (which carry the rating counters)
+    user_ids = [user["user_id"] for user in users]
+    profiles, all_stats = await asyncio.gather(
+        doc_loader("influencer_profiles").load_many(user_ids),
+        doc_loader("influencer_stats").load_many(user_ids)
+    )
+    
     results = []
-    for user in users:
-        # Get profile
-        profile = await db.influencer_profiles.find_one({"user_id": user["user_id"]}, {"_id": 0})
-        # Get stats
-        stats = await db.influencer_stats.find_one({"user_id": user["user_id"]}, {"_id": 0})
-        # Get reviews for avg rating
-        reviews = await db.reviews.find({"reviewed_user_id": user["user_id"]}).to_list(100)
-        avg_rating = sum(r.get("rating", 0) for r in reviews) / len(reviews) if reviews else 0
+    for user, profile, stats in zip(users, profiles, all_stats):
+        rating_sum = (stats or {}).get("rating_sum", 0)
+        rating_count = (stats or {}).get("rating_count", 0)
+        ratings = rating_stats_fields(rating_sum, rating_count, {})
         
         # Combine data
         influencer = {
@@ -3653,8 +5534,9 @@ async def search_influencers(
                 (stats.get("tiktok_followers", 0) if stats else 0) +
                 (stats.get("twitter_followers", 0) if stats else 0)
             ),
-            "avg_rating": avg_rating,
-            "review_count": len(reviews),
+            "avg_rating": rating_sum / rating_count if rating_count else 0,
+            "review_count": rating_count,
+            "rating_score": ratings["rating_score"],
             "created_at": user.get("created_at")
         }
         
@@ -3694,7 +5576,7 @@ async def search_influencers(
     
     # Sort results
     if sort == "rating":
-        results.sort(key=lambda x: x["avg_rating"], reverse=True)
+        results.sort(key=lambda x: x["rating_score"], reverse=True)
     elif sort == "followers":
         results.sort(key=lambda x: x["total_followers"], reverse=True)
     elif sort == "price_low":
@@ -3789,6 +5671,265 @@ ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
 ALLOWED_VIDEO_TYPES = ['video/mp4', 'video/webm', 'video/quicktime']
 ALLOWED_DOC_TYPES = ['application/pdf', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_PROFILE_PHOTO_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB per read
+# Unreferenced blobs are kept this long before garbage collection
+UPLOAD_BLOB_GRACE_SECONDS = int(os.environ.get('UPLOAD_BLOB_GRACE_SECONDS', '3600'))
+BLOB_COMMIT_RETRIES = 50
+# Blobs are stored under a random name rather than their hash: /uploads/ is
+# public, and a hash-derived URL would tell anyone holding a file whether it
+# was uploaded. Blobs stored before this keep their <sha256>.<ext> names.
+BLOB_NAME_BYTES = 20
+# Per-user storage quota by user type, in MB (0 = unlimited)
+STORAGE_QUOTAS = {
+    "influencer": int(os.environ.get('STORAGE_QUOTA_INFLUENCER_MB', '2048')) * 1024 * 1024,
+    "marka": int(os.environ.get('STORAGE_QUOTA_MARKA_MB', '1024')) * 1024 * 1024,
+    "admin": 0
+}
+# Background upload GC: how often it runs (0 disables), and how hard it may hit storage
+UPLOAD_GC_INTERVAL_SECONDS = int(os.environ.get('UPLOAD_GC_INTERVAL_SECONDS', '21600'))
+UPLOAD_GC_BATCH_SIZE = int(os.environ.get('UPLOAD_GC_BATCH_SIZE', '500'))
+UPLOAD_GC_BATCH_PAUSE_SECONDS = float(os.environ.get('UPLOAD_GC_BATCH_PAUSE_SECONDS', '1'))
+UPLOAD_GC_REPORT_LEASE_SECONDS = 600
+# Downscaled WebP copies generated for uploaded images, smallest is the thumbnail
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '320,640,1280').split(',')]
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', '2'))
+IMAGE_DERIVATIVE_QUALITY = 80
+
+image_pool: Optional[ProcessPoolExecutor] = None
+derivative_tasks = {}  # sha256 -> asyncio.Task, keeps running jobs referenced
+
+# ============= FAZ 3: UPLOAD STORAGE =============
+# Finished uploads live in the backend selected by UPLOAD_STORAGE: 'local'
+# (UPLOAD_DIR, sharded into nested directories) or 's3' (any S3-compatible
+# service, S3_ENDPOINT_URL points it at MinIO or a local stand-in). Files
+# still being received are staged on local disk in UPLOAD_STAGING_DIR.
+# Public URLs are /uploads/<name> regardless of the backend.
+
+UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'local')
+UPLOAD_STAGING_DIR = UPLOAD_DIR / ".staging"
+UPLOAD_STAGING_DIR.mkdir(exist_ok=True)
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_PREFIX = os.environ.get('S3_PREFIX', 'uploads/')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None
+UPLOAD_SERVE_CHUNK_SIZE = 256 * 1024
+
+class StoredFile(BaseModel):
+    size: int
+    modified: float  # unix timestamp
+
+class LocalUploadStorage:
+    """Files stored as root/<h[0:2]>/<h[2:4]>/<name> with h = sha256(name).
+    
+    Two levels of 256 directories keep every directory small at millions of
+    files. Files from the old flat layout are still found until
+    `python manage.py migrate-uploads` moves them.
+    """
+    name = "local"
+    
+    def __init__(self, root: Path):
+        self.root = root
+    
+    def path_for(self, name: str) -> Path:
+        h = hashlib.sha256(name.encode()).hexdigest()
+        return self.root / h[:2] / h[2:4] / name
+    
+    def local_path(self, name: str) -> Optional[Path]:
+        """Path of an existing file on disk (blocking)"""
+        for path in (self.path_for(name), self.root / name):
+            if path.is_file():
+                return path
+        return None
+    
+    def walk_files(self):
+        """Lazily yield (name, path) of every stored file in either layout (blocking)"""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for f in filenames:
+                if not f.startswith("."):
+                    yield f, Path(dirpath) / f
+    
+    def list_files(self) -> List[tuple]:
+        """(name, path) of every stored file in either layout (blocking)"""
+        return list(self.walk_files())
+    
+    def _put(self, name: str, source: Path, keep_source: bool):
+        target = self.path_for(name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if keep_source:
+            staged = UPLOAD_STAGING_DIR / f".{uuid.uuid4().hex}.part"
+            shutil.copyfile(source, staged)
+            source = staged
+        os.replace(source, target)
+    
+    def _stat(self, name: str) -> Optional[StoredFile]:
+        path = self.local_path(name)
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            return None
+        return StoredFile(size=st.st_size, modified=st.st_mtime) if st else None
+    
+    def _delete(self, name: str):
+        for path in (self.path_for(name), self.root / name):
+            path.unlink(missing_ok=True)
+    
+    async def put_file(self, name: str, source: Path, keep_source: bool = False):
+        """Store a complete local file under name (moved unless keep_source)"""
+        await asyncio.to_thread(self._put, name, source, keep_source)
+    
+    async def stat(self, name: str) -> Optional[StoredFile]:
+        return await asyncio.to_thread(self._stat, name)
+    
+    async def iter_range(self, name: str, start: int, end: int) -> AsyncIterator[bytes]:
+        path = await asyncio.to_thread(self.local_path, name)
+        if path is None:
+            return
+        
+        handle = await asyncio.to_thread(open, path, "rb")
+        try:
+            await asyncio.to_thread(handle.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(handle.read, min(UPLOAD_SERVE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(handle.close)
+    
+    async def delete(self, name: str):
+        await asyncio.to_thread(self._delete, name)
+    
+    async def iter_files(self, page_size: int) -> AsyncIterator[List[tuple]]:
+        """Pages of (name, StoredFile) for every stored file, walking the tree as it goes"""
+        files = self.walk_files()
+        def next_page():
+            return [(name, self._stat(name)) for name, _ in itertools.islice(files, page_size)]
+        
+        while True:
+            page = await asyncio.to_thread(next_page)
+            if not page:
+                break
+            yield [(name, stored) for name, stored in page if stored]
+    
+    async def internal_location(self, name: str) -> str:
+        """Location relative to the storage root, for X-Accel-Redirect"""
+        path = await asyncio.to_thread(self.local_path, name)
+        return (path or self.path_for(name)).relative_to(self.root).as_posix()
+    
+    @asynccontextmanager
+    async def local_copy(self, name: str):
+        """A local path to read the file from; here the stored file itself"""
+        path = await asyncio.to_thread(self.local_path, name)
+        if path is None:
+            raise FileNotFoundError(name)
+        yield path
+
+class S3UploadStorage:
+    """Objects stored as <prefix><name> in an S3-compatible bucket.
+    
+    boto3 is synchronous, so every call runs on a worker thread. Transfers
+    are streamed: upload_file switches to multipart for large files and
+    reads are consumed chunk by chunk.
+    """
+    name = "s3"
+    
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        # Only needed when S3 storage is configured
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+    
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+    
+    def local_path(self, name: str) -> Optional[Path]:
+        return None
+    
+    async def put_file(self, name: str, source: Path, keep_source: bool = False):
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        await asyncio.to_thread(
+            self.client.upload_file,
+            str(source),
+            self.bucket,
+            self.key(name),
+            ExtraArgs={"ContentType": content_type}
+        )
+        if not keep_source:
+            await asyncio.to_thread(Path(source).unlink, missing_ok=True)
+    
+    async def stat(self, name: str) -> Optional[StoredFile]:
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.key(name))
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredFile(size=head["ContentLength"], modified=head["LastModified"].timestamp())
+    
+    async def iter_range(self, name: str, start: int, end: int) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(
+            self.client.get_object,
+            Bucket=self.bucket,
+            Key=self.key(name),
+            Range=f"bytes={start}-{end}"
+        )
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, UPLOAD_SERVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+    
+    async def delete(self, name: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.key(name))
+    
+    async def iter_files(self, page_size: int) -> AsyncIterator[List[tuple]]:
+        pages = iter(self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket,
+            Prefix=self.prefix,
+            PaginationConfig={"PageSize": page_size}
+        ))
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            yield [
+                (obj["Key"][len(self.prefix):], StoredFile(size=obj["Size"], modified=obj["LastModified"].timestamp()))
+                for obj in page.get("Contents", [])
+            ]
+    
+    async def internal_location(self, name: str) -> str:
+        return self.key(name)
+    
+    @asynccontextmanager
+    async def local_copy(self, name: str):
+        """Download to the staging directory for the duration of the block"""
+        path = UPLOAD_STAGING_DIR / f".{uuid.uuid4().hex}{Path(name).suffix}"
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, self.key(name), str(path))
+            yield path
+        finally:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+
+def create_upload_storage(kind: str = UPLOAD_STORAGE):
+    if kind == "s3":
+        if not S3_BUCKET:
+            raise RuntimeError("S3_BUCKET must be set when UPLOAD_STORAGE=s3")
+        return S3UploadStorage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL)
+    return LocalUploadStorage(UPLOAD_DIR)
+
+upload_storage = create_upload_storage()
+
+async def delete_stored_files(filenames: List[str]):
+    for filename in filenames:
+        await upload_storage.delete(filename)
 
 def get_file_type(content_type: str) -> str:
     if content_type in ALLOWED_IMAGE_TYPES:
@@ -3799,10 +5940,622 @@ def get_file_type(content_type: str) -> str:
         return 'document'
     return 'unknown'
 
+def _write_chunk(handle, digest, chunk: bytes):
+    digest.update(chunk)
+    handle.write(chunk)
+
+def _discard_partial(handle, tmp_path: Path):
+    handle.close()
+    tmp_path.unlink(missing_ok=True)
+
+def upload_extension(filename: Optional[str]) -> str:
+    ext = Path(filename).suffix.lower() if filename else ''
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,10}", ext) else '.bin'
+
+def upload_filename_from_url(url: Optional[str]) -> Optional[str]:
+    """Stored filename for an /uploads/ URL, None for external URLs"""
+    if not url or not url.startswith("/uploads/"):
+        return None
+    return url[len("/uploads/"):]
+
+def blob_upload_info(blob: dict, deduplicated: bool) -> dict:
+    return {
+        "filename": blob["filename"],
+        "file_size": blob["file_size"],
+        "sha256": blob["sha256"],
+        "url": f"/uploads/{blob['filename']}",
+        "deduplicated": deduplicated,
+        # None until image derivatives have been generated for this content
+        "thumbnail_url": blob.get("thumbnail_url"),
+        "derivatives": blob.get("derivatives")
+    }
+
+def blob_files(blob: dict) -> List[str]:
+    """Every stored file that belongs to a blob"""
+    derived = [upload_filename_from_url(d["url"]) for d in blob.get("derivatives") or []]
+    return [blob["filename"], *derived]
+
+async def retain_blob(sha256: str, owner_id: Optional[str] = None) -> Optional[dict]:
+    """Take a reference on stored content, if the server already has it (and owner_id uploaded it)"""
+    query = {"sha256": sha256, "deleting": {"$ne": True}}
+    if owner_id:
+        query["owner_ids"] = owner_id
+    return await db.upload_blobs.find_one_and_update(
+        query,
+        {"$inc": {"ref_count": 1}, "$set": {"released_at": None, "last_referenced_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def reserve_storage(user: User, size: int):
+    """Charge size bytes to the user's storage counter, refusing to exceed their quota.
+    
+    A single conditional $inc, so concurrent uploads cannot overshoot together.
+    """
+    quota = STORAGE_QUOTAS.get(user.user_type, 0)
+    query = {"user_id": user.user_id}
+    if quota:
+        if size > quota:
+            raise HTTPException(status_code=413, detail="Storage quota exceeded")
+        query["$or"] = [
+            {"storage_used": {"$lte": quota - size}},
+            {"storage_used": {"$exists": False}}
+        ]
+    
+    result = await db.users.update_one(query, {"$inc": {"storage_used": size}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=413, detail="Storage quota exceeded")
+
+async def release_storage(user_id: str, size: int):
+    """Credit size bytes back to the user's storage counter"""
+    if not size:
+        return
+    await db.users.update_one({"user_id": user_id}, {"$inc": {"storage_used": -size}})
+    # Files from before quotas were tracked were never charged
+    await db.users.update_one({"user_id": user_id, "storage_used": {"$lt": 0}}, {"$set": {"storage_used": 0}})
+
+async def release_upload(url: Optional[str], owner_id: Optional[str] = None):
+    """Drop a reference to an uploaded file, crediting its size to owner_id if given.
+    
+    Blobs are only deleted by collect_unreferenced_blobs once they have stayed
+    unreferenced for UPLOAD_BLOB_GRACE_SECONDS. Files from before
+    content-addressed storage have no blob record and are removed directly.
+    """
+    filename = upload_filename_from_url(url)
+    if not filename:
+        return
+    
+    blob = await db.upload_blobs.find_one_and_update(
+        {"filename": filename, "ref_count": {"$gt": 0}},
+        {"$inc": {"ref_count": -1}, "$set": {"released_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0, "file_size": 1}
+    )
+    if not blob:
+        blob = await db.upload_blobs.find_one({"filename": filename}, {"_id": 0, "file_size": 1})
+    
+    if blob:
+        size = blob["file_size"]
+    else:
+        stored = await upload_storage.stat(filename)
+        size = stored.size if stored else 0
+        await upload_storage.delete(filename)
+    
+    if owner_id:
+        await release_storage(owner_id, size)
+
+def stored_upload_names(doc: Optional[dict], fields: List[str]) -> set:
+    """Filenames of the /uploads/ URLs held in doc's fields, nested lists and dicts included"""
+    names = set()
+    for field in fields:
+        _collect_upload_names((doc or {}).get(field), names)
+    return names
+
+async def release_replaced_uploads(owner_id: str, old_doc: Optional[dict], new_doc: Optional[dict], fields: List[str]):
+    """Release the uploads old_doc held in fields that new_doc (None once deleted) no longer holds.
+    
+    A URL from /upload carries the reference and quota charge taken there, and
+    the document storing it keeps them until the URL is replaced or removed.
+    Only blobs owner_id uploaded are released: a URL copied from someone
+    else's upload never brought a reference with it.
+    """
+    dropped = stored_upload_names(old_doc, fields) - stored_upload_names(new_doc, fields)
+    if not dropped:
+        return
+    
+    owned = await db.upload_blobs.find(
+        {"filename": {"$in": list(dropped)}, "owner_ids": owner_id},
+        {"_id": 0, "filename": 1}
+    ).to_list(None)
+    for blob in owned:
+        await release_upload(f"/uploads/{blob['filename']}", owner_id=owner_id)
+
+async def commit_blob(tmp_path: Path, sha256: str, size: int, ext: str, content_type: str, owner_id: str) -> dict:
+    """Move a fully written temp file to its content address and take a reference.
+    
+    If the content is already stored, the temp file is dropped and the existing
+    blob is shared instead. owner_id is recorded as having uploaded the bytes,
+    which is what lets them reuse the blob through /upload/check later.
+    Deduplication goes by the sha256 field; the filename is random.
+    """
+    filename = f"{secrets.token_hex(BLOB_NAME_BYTES)}{ext}"
+    
+    for _ in range(BLOB_COMMIT_RETRIES):
+        try:
+            existing = await db.upload_blobs.find_one_and_update(
+                {"sha256": sha256, "deleting": {"$ne": True}},
+                {
+                    "$inc": {"ref_count": 1},
+                    "$set": {"released_at": None, "last_referenced_at": datetime.now(timezone.utc)},
+                    "$addToSet": {"owner_ids": owner_id},
+                    "$setOnInsert": {
+                        "filename": filename,
+                        "file_size": size,
+                        "content_type": content_type,
+                        "created_at": datetime.now(timezone.utc)
+                    }
+                },
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # The blob is being garbage-collected right now; retry once it is gone
+            await asyncio.sleep(0.1)
+            continue
+        
+        if existing:
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+            return blob_upload_info(existing, deduplicated=True)
+        
+        await upload_storage.put_file(filename, tmp_path)
+        return blob_upload_info({"filename": filename, "file_size": size, "sha256": sha256}, deduplicated=False)
+    
+    await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+    raise HTTPException(status_code=503, detail="Upload storage busy, please retry")
+
+async def save_upload(file: UploadFile, owner: User, max_size: int = MAX_FILE_SIZE) -> dict:
+    """Stream an uploaded file into content-addressed storage in fixed-size chunks.
+    
+    The size limit is enforced while reading, hashing and disk writes run in a
+    worker thread, and the file only appears under its final name once it is
+    complete (temp file + atomic rename). Memory use is one chunk per upload.
+    The upload is charged to the owner's storage quota before anything is
+    written. The caller owns one reference on the returned blob.
+    """
+    too_large = f"File too large. Max {max_size // (1024 * 1024)}MB allowed"
+    
+    # The multipart parser already knows the size; reject before touching the disk
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=400, detail=too_large)
+    
+    reserved = file.size if file.size is not None else max_size
+    await reserve_storage(owner, reserved)
+    try:
+        stored = await stream_to_blob(file, max_size, too_large, owner.user_id)
+    except BaseException:
+        await release_storage(owner.user_id, reserved)
+        raise
+    
+    # Settle the reservation to the real size
+    if stored["file_size"] != reserved:
+        await db.users.update_one({"user_id": owner.user_id}, {"$inc": {"storage_used": stored["file_size"] - reserved}})
+    return stored
+
+async def stream_to_blob(file: UploadFile, max_size: int, too_large: str, owner_id: str) -> dict:
+    tmp_path = UPLOAD_STAGING_DIR / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        handle = await asyncio.to_thread(open, tmp_path, "wb")
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=400, detail=too_large)
+            
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+        
+        await asyncio.to_thread(handle.close)
+    except HTTPException:
+        await asyncio.to_thread(_discard_partial, handle, tmp_path)
+        raise
+    except OSError as e:
+        await asyncio.to_thread(_discard_partial, handle, tmp_path)
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    
+    content_type = file.content_type or 'application/octet-stream'
+    return await commit_blob(tmp_path, digest.hexdigest(), size, upload_extension(file.filename), content_type, owner_id)
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global image_pool
+    if image_pool is None:
+        # spawn: workers only import image_derivatives, never this module or its Mongo client
+        image_pool = ProcessPoolExecutor(
+            max_workers=IMAGE_DERIVATIVE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return image_pool
+
+def queue_image_derivatives(stored: dict):
+    """Generate thumbnails for a stored image in the background.
+    
+    Does nothing when the content already has derivatives or a job for it is
+    running. Call after the referencing document is inserted, so the finished
+    job can find it.
+    """
+    sha256 = stored["sha256"]
+    if stored.get("derivatives") is not None or sha256 in derivative_tasks:
+        return
+    
+    task = asyncio.create_task(build_image_derivatives(sha256, stored["filename"]))
+    derivative_tasks[sha256] = task
+    task.add_done_callback(lambda _: derivative_tasks.pop(sha256, None))
+
+async def build_image_derivatives(sha256: str, filename: str):
+    loop = asyncio.get_running_loop()
+    work_dir = Path(await asyncio.to_thread(tempfile.mkdtemp, dir=UPLOAD_STAGING_DIR))
+    try:
+        async with upload_storage.local_copy(filename) as source:
+            rendered = await loop.run_in_executor(
+                get_image_pool(),
+                render_image_derivatives,
+                str(source),
+                str(work_dir),
+                Path(filename).stem,
+                IMAGE_DERIVATIVE_WIDTHS,
+                IMAGE_DERIVATIVE_QUALITY
+            )
+        for r in rendered:
+            await upload_storage.put_file(r["filename"], work_dir / r["filename"])
+    except Exception as e:
+        # Unreadable or unsupported image: record an empty result so it is not retried
+        logger.warning(f"Image derivatives failed for {filename}: {e}")
+        rendered = []
+    finally:
+        await asyncio.to_thread(shutil.rmtree, work_dir, ignore_errors=True)
+    
+    derivatives = [
+        {"width": r["width"], "height": r["height"], "url": f"/uploads/{r['filename']}"}
+        for r in rendered
+    ]
+    thumbnail_url = derivatives[0]["url"] if derivatives else None
+    
+    result = await db.upload_blobs.update_one(
+        {"sha256": sha256, "deleting": {"$ne": True}},
+        {"$set": {"derivatives": derivatives, "thumbnail_url": thumbnail_url}}
+    )
+    if result.matched_count == 0:
+        # The blob was garbage-collected while we were rendering
+        await delete_stored_files([r["filename"] for r in rendered])
+        return
+    
+    if thumbnail_url:
+        await db.media_library.update_many(
+            {"sha256": sha256},
+            {"$set": {"thumbnail_url": thumbnail_url, "derivatives": derivatives}}
+        )
+        await set_attachment_thumbnail(filename, thumbnail_url)
+
+async def collect_unreferenced_blobs(grace_seconds: int = None, dry_run: bool = False) -> dict:
+    """Delete blobs that have had no references for longer than the grace period"""
+    if grace_seconds is None:
+        grace_seconds = UPLOAD_BLOB_GRACE_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    query = {"ref_count": {"$lte": 0}, "released_at": {"$lt": cutoff}, "deleting": {"$ne": True}}
+    
+    if dry_run:
+        totals = await db.upload_blobs.aggregate([
+            {"$match": query},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "bytes": {"$sum": "$file_size"}}}
+        ]).to_list(1)
+        return {"deleted": 0, "reclaimable": totals[0]["count"] if totals else 0, "bytes": totals[0]["bytes"] if totals else 0}
+    
+    deleted = 0
+    reclaimed = 0
+    while True:
+        # Claim the blob first so a concurrent upload of the same content waits instead of reusing it
+        blob = await db.upload_blobs.find_one_and_update(query, {"$set": {"deleting": True}})
+        if not blob:
+            break
+        
+        await delete_stored_files(blob_files(blob))
+        await db.upload_blobs.delete_one({"sha256": blob["sha256"], "deleting": True})
+        deleted += 1
+        reclaimed += blob.get("file_size", 0)
+        if deleted % UPLOAD_GC_BATCH_SIZE == 0:
+            await asyncio.sleep(UPLOAD_GC_BATCH_PAUSE_SECONDS)
+    
+    return {"deleted": deleted, "reclaimable": 0, "bytes": reclaimed}
+
+# Everywhere an /uploads/ URL can be stored: (collection, query, projected fields).
+# A projection of None scans whole documents, for free-form settings.
+UPLOAD_REFERENCES = [
+    ("messages", {"attachment": {"$ne": None}}, ["attachment"]),
+    ("message_buckets", {"messages.attachment": {"$ne": None}}, ["messages.attachment"]),
+    ("media_library", {}, ["url", "thumbnail_url", "derivatives"]),
+    ("milestones", {}, ["submission_files"]),
+    ("users", {}, ["picture"]),
+    ("portfolio_items", {}, ["image_url", "video_url"]),
+    ("influencer_profiles", {}, ["image_url", "portfolio_items"]),
+    ("brand_profiles", {}, ["logo_url"]),
+    ("admin_content", {}, ["image_url"]),
+    ("disputes", {}, ["evidence_urls"]),
+    ("resumable_uploads", {"status": "complete"}, ["url"]),
+    ("popup_settings", {}, None),
+]
+
+def _collect_upload_names(value, names: set):
+    if isinstance(value, str):
+        filename = upload_filename_from_url(value)
+        if filename:
+            names.add(filename)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_upload_names(item, names)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_upload_names(item, names)
+
+async def count_upload_references() -> dict:
+    """Stored filename -> number of documents in UPLOAD_REFERENCES referencing it"""
+    counts = {}
+    for collection, query, fields in UPLOAD_REFERENCES:
+        projection = {"_id": 0, **{f: 1 for f in fields}} if fields else {"_id": 0}
+        cursor = db[collection].find(query, projection).batch_size(UPLOAD_GC_BATCH_SIZE)
+        async for doc in cursor:
+            names = set()
+            _collect_upload_names(doc, names)
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+    return counts
+
+async def repair_reference_counts(references: dict, cutoff: datetime, dry_run: bool = False) -> dict:
+    """Set ref_count to the references actually found, for blobs untouched since cutoff.
+    
+    Lowers counts leaked by requests that took a reference nothing stored (an
+    /upload URL never used, a failed request), which frees the blob for
+    collection, and raises counts a release took below what is still stored.
+    Each write is conditional on the count read, so a reference taken or
+    released meanwhile makes it skip that blob until the next pass.
+    """
+    quiet = {
+        "deleting": {"$ne": True},
+        "$or": [
+            {"last_referenced_at": {"$lt": cutoff}},
+            {"last_referenced_at": {"$exists": False}, "created_at": {"$lt": cutoff}}
+        ]
+    }
+    report = {"leaked": 0, "restored": 0}
+    cursor = db.upload_blobs.find(quiet, {"_id": 0, "sha256": 1, "filename": 1, "ref_count": 1}).batch_size(UPLOAD_GC_BATCH_SIZE)
+    async for blob in cursor:
+        ref_count = blob.get("ref_count", 0)
+        found = references.get(blob["filename"], 0)
+        if ref_count == found or (found == 0 and ref_count < 0):
+            continue
+        
+        if not dry_run:
+            update = {"ref_count": found}
+            if found == 0:
+                update["released_at"] = datetime.now(timezone.utc)
+            result = await db.upload_blobs.update_one({**quiet, "sha256": blob["sha256"], "ref_count": ref_count}, {"$set": update})
+            if result.modified_count == 0:
+                continue
+        
+        if ref_count > found:
+            report["leaked"] += ref_count - found
+        else:
+            report["restored"] += found - ref_count
+    return report
+
+async def reconcile_upload_store(grace_seconds: int = None, dry_run: bool = False) -> dict:
+    """Delete stored files that nothing references.
+    
+    Catches what reference counting cannot: files from before blob records
+    existed, references leaked by failed requests (ref_count is first
+    reconciled with the references found, see repair_reference_counts), and
+    derivatives whose blob is gone. Files and blobs touched within the grace
+    period are left alone, so uploads in flight while the scan runs are never
+    collected.
+    """
+    if grace_seconds is None:
+        grace_seconds = UPLOAD_BLOB_GRACE_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    
+    references = await count_upload_references()
+    referenced = set(references)
+    # A referenced blob keeps all of its derivatives
+    referenced_stems = {m.group(1) for m in map(BLOB_FILE_NAME.fullmatch, referenced) if m}
+    
+    report = {"scanned": 0, "orphaned": 0, "deleted": 0, "bytes": 0}
+    report["references"] = await repair_reference_counts(references, cutoff, dry_run=dry_run)
+    removed = set()
+    
+    async for page in upload_storage.iter_files(UPLOAD_GC_BATCH_SIZE):
+        for filename, stored in page:
+            report["scanned"] += 1
+            if filename in referenced or filename in removed or stored.modified >= cutoff.timestamp():
+                continue
+            
+            match = BLOB_FILE_NAME.fullmatch(filename)
+            stem = match.group(1) if match else None
+            if stem in referenced_stems:
+                continue
+            # After the repair above this only keeps blobs referenced within the grace
+            # period (and, in a dry run, those whose leaked references were reported)
+            if stem and await db.upload_blobs.find_one({**blob_name_query(stem), "ref_count": {"$gt": 0}}, {"_id": 1}):
+                continue
+            
+            report["orphaned"] += 1
+            report["bytes"] += stored.size
+            if dry_run:
+                continue
+            
+            # Blob-backed files are claimed like in collect_unreferenced_blobs, and only
+            # if nothing took a reference since before the scan started
+            blob = await db.upload_blobs.find_one_and_update(
+                {
+                    **blob_name_query(stem),
+                    "ref_count": {"$lte": 0},
+                    "deleting": {"$ne": True},
+                    "$or": [
+                        {"last_referenced_at": {"$lt": cutoff}},
+                        {"last_referenced_at": {"$exists": False}, "created_at": {"$lt": cutoff}}
+                    ]
+                },
+                {"$set": {"deleting": True}}
+            ) if stem else None
+            
+            if blob:
+                files = blob_files(blob)
+                await delete_stored_files(files)
+                await db.upload_blobs.delete_one({"sha256": blob["sha256"], "deleting": True})
+                removed.update(files)
+            elif not stem or not await db.upload_blobs.find_one(blob_name_query(stem), {"_id": 1}):
+                await upload_storage.delete(filename)
+                removed.add(filename)
+            else:
+                # Re-referenced while we were scanning
+                report["orphaned"] -= 1
+                report["bytes"] -= stored.size
+                continue
+            
+            report["deleted"] += 1
+        
+        await asyncio.sleep(UPLOAD_GC_BATCH_PAUSE_SECONDS)
+    
+    return report
+
+async def run_upload_gc(grace_seconds: int = None, dry_run: bool = False) -> dict:
+    """One full garbage collection pass over uploads"""
+    expired = 0 if dry_run else await expire_resumable_uploads()
+    # Reconcile first: it restores counts a release took too low before anything is collected
+    orphaned = await reconcile_upload_store(grace_seconds, dry_run=dry_run)
+    return {
+        "expired_uploads": expired,
+        "unreferenced_blobs": await collect_unreferenced_blobs(grace_seconds, dry_run=dry_run),
+        "orphaned_files": orphaned
+    }
+
+async def recount_storage_usage() -> int:
+    """Rebuild every users.storage_used counter from what each user stores now.
+    
+    Counts media library items, chat attachments, profile photos and milestone
+    submissions. Meant for initialising the counters and repairing drift, at
+    low traffic: uploads finishing during the run may be missed.
+    """
+    usage = {}
+    def add(user_id, size):
+        if user_id:
+            usage[user_id] = usage.get(user_id, 0) + (size or 0)
+    
+    async for item in db.media_library.find({}, {"_id": 0, "user_id": 1, "file_size": 1}):
+        add(item["user_id"], item.get("file_size"))
+    
+    attachments = aggregate_messages(
+        {"attachment": {"$ne": None}},
+        [{"$group": {"_id": "$sender_user_id", "size": {"$sum": "$attachment.file_size"}}}]
+    )
+    async for row in attachments:
+        add(row["_id"], row["size"])
+    
+    # Profile photos and milestone files only store URLs; sizes come from blob records
+    owned = []
+    async for user_doc in db.users.find({"picture": {"$regex": "^/uploads/"}}, {"_id": 0, "user_id": 1, "picture": 1}):
+        owned.append((user_doc["user_id"], user_doc["picture"]))
+    
+    submitters = {}
+    async for milestone in db.milestones.find({"submission_files.0": {"$exists": True}}, {"_id": 0, "contract_id": 1, "submission_files": 1}):
+        contract_id = milestone["contract_id"]
+        if contract_id not in submitters:
+            contract_doc = await db.contracts.find_one({"contract_id": contract_id}, {"_id": 0, "influencer_user_id": 1})
+            submitters[contract_id] = contract_doc["influencer_user_id"] if contract_doc else None
+        owned.extend((submitters[contract_id], url) for url in milestone["submission_files"])
+    
+    sizes = {}
+    names = list({upload_filename_from_url(url) for _, url in owned} - {None})
+    for i in range(0, len(names), 1000):
+        async for blob in db.upload_blobs.find({"filename": {"$in": names[i:i + 1000]}}, {"_id": 0, "filename": 1, "file_size": 1}):
+            sizes[blob["filename"]] = blob["file_size"]
+    for user_id, url in owned:
+        add(user_id, sizes.get(upload_filename_from_url(url), 0))
+    
+    await db.users.update_many({"user_id": {"$nin": list(usage)}}, {"$set": {"storage_used": 0}})
+    ops = [UpdateOne({"user_id": user_id}, {"$set": {"storage_used": size}}) for user_id, size in usage.items()]
+    for i in range(0, len(ops), 1000):
+        await db.users.bulk_write(ops[i:i + 1000], ordered=False)
+    
+    return len(usage)
+
+async def acquire_maintenance_lease(job: str, seconds: int) -> bool:
+    """Let only one worker process run a periodic job at a time"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.maintenance_leases.find_one_and_update(
+            {"_id": job, "expires_at": {"$lt": now}},
+            {"$set": {"expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def run_and_store_upload_gc(dry_run: bool = False) -> dict:
+    """Run an upload GC pass and keep its report for GET /admin/uploads/gc-report"""
+    await db.maintenance_reports.update_one(
+        {"_id": "upload_gc"},
+        {"$set": {"status": "running", "dry_run": dry_run, "started_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    try:
+        report = await run_upload_gc(dry_run=dry_run)
+    except BaseException:
+        await db.maintenance_reports.update_one({"_id": "upload_gc"}, {"$set": {"status": "failed"}})
+        raise
+    await db.maintenance_reports.update_one(
+        {"_id": "upload_gc"},
+        {"$set": {"status": "idle", "report": report, "finished_at": datetime.now(timezone.utc)}}
+    )
+    return report
+
+async def upload_gc_loop():
+    while True:
+        await asyncio.sleep(UPLOAD_GC_INTERVAL_SECONDS)
+        try:
+            if await acquire_maintenance_lease("upload_gc", UPLOAD_GC_INTERVAL_SECONDS):
+                report = await run_and_store_upload_gc()
+                logger.info(f"Upload GC: {report}")
+        except Exception as e:
+            logger.error(f"Upload GC failed: {e}")
+
+async def upload_gc_dry_run():
+    try:
+        await run_and_store_upload_gc(dry_run=True)
+    except Exception as e:
+        logger.error(f"Upload GC dry run failed: {e}")
+
+upload_gc_report_task: Optional[asyncio.Task] = None
+
+class UploadCheck(BaseModel):
+    sha256: str
+    filename: Optional[str] = None
+
 @api_router.post("/upload")
 async def upload_file(request: Request, file: UploadFile = File(...)):
-    """Generic file upload endpoint"""
-    await require_auth(request)
+    """Generic file upload endpoint.
+    
+    The returned URL carries one blob reference and the quota charge; the
+    document that stores it gives both back when the URL is replaced or the
+    document deleted (release_replaced_uploads).
+    """
+    user = await require_auth(request)
     
     # Validate file type
     content_type = file.content_type or 'application/octet-stream'
@@ -3811,33 +6564,516 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
     if file_type == 'unknown':
         raise HTTPException(status_code=400, detail="File type not allowed. Allowed: images, videos, PDFs")
     
-    # Generate unique filename
-    ext = Path(file.filename).suffix if file.filename else '.bin'
-    unique_filename = f"{uuid.uuid4().hex}{ext}"
-    file_path = UPLOAD_DIR / unique_filename
-    
     # Save file
+    stored = await save_upload(file, user)
+    
+    return {
+        "filename": stored["filename"],
+        "original_filename": file.filename,
+        "file_type": file_type,
+        "file_size": stored["file_size"],
+        "url": stored["url"],
+        "content_type": content_type,
+        "sha256": stored["sha256"]
+    }
+
+@api_router.post("/upload/check")
+async def check_upload(request: Request, data: UploadCheck):
+    """Instant upload: reuse content the server already stores, keyed by SHA-256.
+    
+    Clients hash the file locally and call this first; when it returns
+    exists=true the response is equivalent to /upload and no bytes need to be sent.
+    Only content the caller has uploaded before is reused: knowing a hash must
+    not grant access to someone else's file or reveal that it exists.
+    """
+    user = await require_auth(request)
+    
+    blob = await retain_blob(data.sha256.lower(), owner_id=user.user_id)
+    if not blob:
+        return {"exists": False}
+    
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            if len(content) > MAX_FILE_SIZE:
-                raise HTTPException(status_code=400, detail="File too large. Max 50MB allowed")
-            buffer.write(content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        await reserve_storage(user, blob["file_size"])
+    except HTTPException:
+        await release_upload(f"/uploads/{blob['filename']}")
+        raise
+    
+    content_type = blob.get("content_type") or 'application/octet-stream'
+    return {
+        "exists": True,
+        "filename": blob["filename"],
+        "original_filename": data.filename,
+        "file_type": get_file_type(content_type),
+        "file_size": blob["file_size"],
+        "url": f"/uploads/{blob['filename']}",
+        "content_type": content_type,
+        "sha256": blob["sha256"]
+    }
+
+# ============= FAZ 3: UPLOAD SERVING =============
+
+# e.g. '/internal-uploads/': nginx serves the bytes from that internal location
+# (mapped to the local storage root or the S3 bucket) and the app only answers
+# with headers
+UPLOADS_ACCEL_REDIRECT_PREFIX = os.environ.get('UPLOADS_ACCEL_REDIRECT_PREFIX', '')
+# Blob files (<random name>.<ext>, or <sha256>.<ext> for older blobs) and their
+# <name>_w<width>.webp derivatives never change content, so they can be cached forever
+BLOB_FILE_NAME = re.compile(r"([0-9a-f]{40}|[0-9a-f]{64})(_w\d+)?\.[a-z0-9]{1,10}")
+
+def blob_name_query(stem: str) -> dict:
+    """Match the blob stored as <stem>.<ext>"""
+    return {"filename": {"$regex": f"^{stem}\\."}}
+# No path separators and no leading dot, which keeps partial uploads private
+SERVABLE_UPLOAD_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*")
+
+class UploadResponse(Response):
+    """Send bytes [start, end] of a stored upload.
     
-    # Get file URL
-    file_url = f"/uploads/{unique_filename}"
+    Files on local disk go out through the ASGI zero-copy send extension
+    (sendfile) when the server offers it; otherwise the range is streamed
+    from the storage backend chunk by chunk.
+    """
+    def __init__(self, filename: str, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.filename = filename
+        self.start = start
+        self.end = end
+        self.count = end - start + 1
+        self.headers["content-length"] = str(self.count)
+    
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            path = await asyncio.to_thread(upload_storage.local_path, self.filename)
+            if path is not None:
+                handle = await asyncio.to_thread(open, path, "rb")
+                try:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": handle,
+                        "offset": self.start,
+                        "count": self.count,
+                        "more_body": False
+                    })
+                finally:
+                    await asyncio.to_thread(handle.close)
+                return
+        
+        async for chunk in upload_storage.iter_range(self.filename, self.start, self.end):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        # Also ends the body early, rather than hanging, if the file was truncated underneath us
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Inclusive (start, end) for a single 'bytes=' range, None to send the whole file.
+    
+    Malformed and multi-range headers are ignored, as RFC 9110 allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
     
+    first, sep, last = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    
+    try:
+        if first == "":
+            # Suffix range: the last N bytes (zero of them is unsatisfiable)
+            length = int(last)
+            start = max(0, size - length) if length > 0 else size
+            end = size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+def request_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against a representation"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@app.api_route("/uploads/{filename}", methods=["GET", "HEAD"])
+async def serve_upload(request: Request, filename: str):
+    """Serve an uploaded file with cache validators and byte ranges"""
+    if not SERVABLE_UPLOAD_NAME.fullmatch(filename):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    stored = await upload_storage.stat(filename)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    blob_file = BLOB_FILE_NAME.fullmatch(filename)
+    if blob_file:
+        etag = f'"{blob_file.group(1)}{blob_file.group(2) or ""}"'
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        etag = f'"{int(stored.modified * 1000000):x}-{stored.size:x}"'
+        cache_control = "public, max-age=86400"
+    
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stored.modified, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes"
+    }
+    
+    if request_not_modified(request, etag, stored.modified):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    
+    if UPLOADS_ACCEL_REDIRECT_PREFIX:
+        # The proxy handles ranges and sendfile itself
+        headers["X-Accel-Redirect"] = f"{UPLOADS_ACCEL_REDIRECT_PREFIX}{await upload_storage.internal_location(filename)}"
+        return Response(headers=headers, media_type=media_type)
+    
+    # If-Range: only honour the range while the client's copy is still current
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        byte_range = parse_byte_range(request.headers.get("range"), stored.size)
+    
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+        return UploadResponse(filename, start, end, 206, headers, media_type)
+    
+    return UploadResponse(filename, 0, stored.size - 1, 200, headers, media_type)
+
+# ============= FAZ 3: RESUMABLE UPLOADS =============
+# tus-style protocol for large files: create an upload, PATCH chunks at the
+# current offset (query it with HEAD after a dropped connection), then
+# finalize. Finished uploads are referenced by upload_id from the chat,
+# media library and milestone endpoints.
+
+RESUMABLE_UPLOAD_TTL_HOURS = int(os.environ.get('RESUMABLE_UPLOAD_TTL_HOURS', '24'))
+# A PATCH that dies without releasing its lease blocks the upload this long
+RESUMABLE_PATCH_LEASE_SECONDS = 600
+
+class ResumableUploadCreate(BaseModel):
+    filename: str
+    content_type: str
+    file_size: int
+
+def resumable_part_path(upload_id: str) -> Path:
+    return UPLOAD_STAGING_DIR / f".{upload_id}.part"
+
+def _open_at_offset(path: Path, offset: int):
+    handle = open(path, "r+b")
+    # Drop bytes past the recorded offset, left behind by a request that died mid-write
+    handle.truncate(offset)
+    handle.seek(offset)
+    return handle
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def upload_offset_headers(upload_doc: dict) -> dict:
     return {
-        "filename": unique_filename,
-        "original_filename": file.filename,
+        "Upload-Offset": str(upload_doc["offset"]),
+        "Upload-Length": str(upload_doc["file_size"]),
+        "Cache-Control": "no-store"
+    }
+
+async def get_own_resumable_upload(user: User, upload_id: str) -> dict:
+    upload_doc = await db.resumable_uploads.find_one({"upload_id": upload_id}, {"_id": 0})
+    if not upload_doc:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if upload_doc["user_id"] != user.user_id:
+        raise HTTPException(status_code=403, detail="Not your upload")
+    
+    return upload_doc
+
+async def use_resumable_upload(user: User, upload_id: str) -> dict:
+    """Reference a finalized resumable upload, shaped like save_upload's result.
+    
+    Each use takes its own reference on the stored content, so the same upload
+    can back several documents.
+    """
+    upload_doc = await get_own_resumable_upload(user, upload_id)
+    if upload_doc["status"] != "complete":
+        raise HTTPException(status_code=400, detail="Upload is not finalized")
+    
+    # The quota reserved when the upload was created pays for its first use
+    charged = upload_doc.get("use_count", 0) > 0
+    if charged:
+        await reserve_storage(user, upload_doc["file_size"])
+    
+    blob = await retain_blob(upload_doc["sha256"])
+    if not blob:
+        if charged:
+            await release_storage(user.user_id, upload_doc["file_size"])
+        raise HTTPException(status_code=410, detail="Upload expired")
+    
+    await db.resumable_uploads.update_one({"upload_id": upload_id}, {"$inc": {"use_count": 1}})
+    
+    return {
+        **blob_upload_info(blob, deduplicated=True),
+        "original_filename": upload_doc["filename"],
+        "content_type": upload_doc["content_type"]
+    }
+
+async def expire_resumable_uploads() -> int:
+    """Remove resumable uploads past their expiry.
+    
+    Unfinished ones lose their partial file, finalized ones give up the
+    reference they held for later use. Quota reserved at creation is credited
+    back unless a document ended up using the upload.
+    """
+    now = datetime.now(timezone.utc)
+    expired = 0
+    while True:
+        upload_doc = await db.resumable_uploads.find_one_and_delete({"expires_at": {"$lt": now}})
+        if not upload_doc:
+            break
+        
+        if upload_doc["status"] == "complete":
+            await release_upload(upload_doc["url"])
+        else:
+            await asyncio.to_thread(resumable_part_path(upload_doc["upload_id"]).unlink, missing_ok=True)
+        
+        if not upload_doc.get("use_count"):
+            await release_storage(upload_doc["user_id"], upload_doc["file_size"])
+        expired += 1
+    
+    return expired
+
+@api_router.post("/uploads/resumable", status_code=201)
+async def create_resumable_upload(request: Request, data: ResumableUploadCreate, response: Response):
+    """Start a resumable upload"""
+    user = await require_auth(request)
+    
+    file_type = get_file_type(data.content_type)
+    if file_type == 'unknown':
+        raise HTTPException(status_code=400, detail="File type not allowed. Allowed: images, videos, PDFs")
+    
+    if data.file_size <= 0 or data.file_size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail=f"File too large. Max {MAX_FILE_SIZE // (1024 * 1024)}MB allowed")
+    
+    await reserve_storage(user, data.file_size)
+    
+    upload_id = f"upl_{uuid.uuid4().hex[:12]}"
+    now = datetime.now(timezone.utc)
+    upload_doc = {
+        "upload_id": upload_id,
+        "user_id": user.user_id,
+        "filename": data.filename,
+        "content_type": data.content_type,
         "file_type": file_type,
-        "file_size": len(content),
-        "url": file_url,
-        "content_type": content_type
+        "file_size": data.file_size,
+        "offset": 0,
+        "status": "uploading",
+        "lease_until": None,
+        "created_at": now,
+        "expires_at": now + timedelta(hours=RESUMABLE_UPLOAD_TTL_HOURS)
+    }
+    
+    await asyncio.to_thread(resumable_part_path(upload_id).touch)
+    await db.resumable_uploads.insert_one(upload_doc)
+    
+    upload_doc.pop("_id", None)
+    upload_doc.pop("lease_until", None)
+    response.headers.update(upload_offset_headers(upload_doc))
+    response.headers["Location"] = f"/api/uploads/resumable/{upload_id}"
+    return upload_doc
+
+@api_router.head("/uploads/resumable/{upload_id}")
+async def head_resumable_upload(request: Request, upload_id: str):
+    """Current offset of a resumable upload"""
+    user = await require_auth(request)
+    upload_doc = await get_own_resumable_upload(user, upload_id)
+    return Response(status_code=200, headers=upload_offset_headers(upload_doc))
+
+@api_router.get("/uploads/resumable/{upload_id}")
+async def get_resumable_upload(request: Request, upload_id: str, response: Response):
+    """Status of a resumable upload"""
+    user = await require_auth(request)
+    upload_doc = await get_own_resumable_upload(user, upload_id)
+    upload_doc.pop("lease_until", None)
+    response.headers.update(upload_offset_headers(upload_doc))
+    return upload_doc
+
+@api_router.patch("/uploads/resumable/{upload_id}")
+async def patch_resumable_upload(request: Request, upload_id: str, upload_offset: int = Header(..., alias="Upload-Offset")):
+    """Append the request body to a resumable upload at Upload-Offset.
+    
+    The body is written to disk as it arrives. If the connection drops, the
+    bytes received so far are kept and the client resumes from the offset
+    reported by HEAD.
+    """
+    user = await require_auth(request)
+    upload_doc = await get_own_resumable_upload(user, upload_id)
+    
+    if upload_doc["status"] != "uploading":
+        raise HTTPException(status_code=400, detail="Upload already finalized")
+    
+    # Claim the upload at the expected offset so two PATCHes can never interleave
+    now = datetime.now(timezone.utc)
+    claimed = await db.resumable_uploads.find_one_and_update(
+        {
+            "upload_id": upload_id,
+            "status": "uploading",
+            "offset": upload_offset,
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+        },
+        {"$set": {"lease_until": now + timedelta(seconds=RESUMABLE_PATCH_LEASE_SECONDS)}},
+        projection={"_id": 0}
+    )
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Offset mismatch or upload busy")
+    
+    offset = upload_offset
+    error = None
+    try:
+        handle = await asyncio.to_thread(_open_at_offset, resumable_part_path(upload_id), offset)
+    except OSError as e:
+        await db.resumable_uploads.update_one({"upload_id": upload_id}, {"$set": {"lease_until": None}})
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    
+    try:
+        async for chunk in request.stream():
+            if offset + len(chunk) > claimed["file_size"]:
+                error = HTTPException(status_code=400, detail="Chunk exceeds declared upload length")
+                break
+            await asyncio.to_thread(handle.write, chunk)
+            offset += len(chunk)
+    except ClientDisconnect:
+        pass
+    except OSError as e:
+        error = HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    finally:
+        try:
+            await asyncio.to_thread(handle.close)
+        except OSError as e:
+            # Nothing after the last durable write can be trusted
+            offset = upload_offset
+            error = HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        # Record progress even when the client went away, that is what makes it resumable
+        await db.resumable_uploads.update_one(
+            {"upload_id": upload_id},
+            {"$set": {"offset": offset, "lease_until": None}}
+        )
+    
+    if error:
+        raise error
+    
+    return Response(status_code=204, headers=upload_offset_headers({**claimed, "offset": offset}))
+
+@api_router.post("/uploads/resumable/{upload_id}/finalize")
+async def finalize_resumable_upload(request: Request, upload_id: str):
+    """Move a fully received upload into storage"""
+    user = await require_auth(request)
+    upload_doc = await get_own_resumable_upload(user, upload_id)
+    
+    if upload_doc["status"] == "uploading":
+        if upload_doc["offset"] != upload_doc["file_size"]:
+            raise HTTPException(status_code=400, detail="Upload incomplete")
+        
+        # Only one finalize may take the part file; a PATCH lease left behind by
+        # a crashed request counts as released once it expires, as in PATCH
+        now = datetime.now(timezone.utc)
+        claimed = await db.resumable_uploads.find_one_and_update(
+            {
+                "upload_id": upload_id,
+                "status": "uploading",
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            {"$set": {"status": "finalizing", "lease_until": None}}
+        )
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Upload busy")
+        
+        tmp_path = resumable_part_path(upload_id)
+        try:
+            sha256 = await asyncio.to_thread(_hash_file, tmp_path)
+            stored = await commit_blob(tmp_path, sha256, upload_doc["file_size"], upload_extension(upload_doc["filename"]), upload_doc["content_type"], user.user_id)
+        except Exception:
+            # commit_blob drops the temp file when it gives up; the client then starts over
+            restart = {}
+            if not await asyncio.to_thread(tmp_path.exists):
+                await asyncio.to_thread(tmp_path.touch)
+                restart = {"offset": 0}
+            await db.resumable_uploads.update_one({"upload_id": upload_id}, {"$set": {"status": "uploading", **restart}})
+            raise
+        
+        upload_doc = await db.resumable_uploads.find_one_and_update(
+            {"upload_id": upload_id},
+            {"$set": {
+                "status": "complete",
+                "sha256": sha256,
+                "url": stored["url"],
+                "finalized_at": datetime.now(timezone.utc),
+                # Finalized uploads stay usable by upload_id for another TTL period
+                "expires_at": datetime.now(timezone.utc) + timedelta(hours=RESUMABLE_UPLOAD_TTL_HOURS)
+            }},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    elif upload_doc["status"] != "complete":
+        raise HTTPException(status_code=409, detail="Upload busy")
+    
+    return {
+        "upload_id": upload_id,
+        "filename": upload_filename_from_url(upload_doc["url"]),
+        "original_filename": upload_doc["filename"],
+        "file_type": upload_doc["file_type"],
+        "file_size": upload_doc["file_size"],
+        "url": upload_doc["url"],
+        "content_type": upload_doc["content_type"],
+        "sha256": upload_doc["sha256"]
     }
 
+@api_router.get("/admin/uploads/gc-report")
+async def admin_upload_gc_report(request: Request):
+    """Report of the last upload garbage collection run (real or dry)"""
+    await require_role(request, ["admin"])
+    report = await db.maintenance_reports.find_one({"_id": "upload_gc"}, {"_id": 0})
+    return report or {"status": "idle", "report": None}
+
+@api_router.post("/admin/uploads/gc-report", status_code=202)
+async def admin_start_upload_gc_report(request: Request):
+    """Start a dry run in the background; its result replaces the stored report"""
+    global upload_gc_report_task
+    await require_role(request, ["admin"])
+    
+    running = upload_gc_report_task is not None and not upload_gc_report_task.done()
+    # The scan is throttled and can take a while, so one at a time across workers
+    if not running and await acquire_maintenance_lease("upload_gc_report", UPLOAD_GC_REPORT_LEASE_SECONDS):
+        upload_gc_report_task = asyncio.create_task(upload_gc_dry_run())
+    
+    return {"status": "running"}
+
 # ============= FAZ 3: CHAT WITH ATTACHMENTS =============
 
 @api_router.post("/matches/{match_id}/messages/with-attachment")
@@ -3845,9 +7081,10 @@ async def send_message_with_attachment(
     request: Request,
     match_id: str,
     message: str = Form(""),
-    file: UploadFile = File(None)
+    file: UploadFile = File(None),
+    upload_id: Optional[str] = Form(None)
 ):
-    """Send message with optional file attachment"""
+    """Send message with optional file attachment (multipart file or finalized resumable upload_id)"""
     user = await require_auth(request)
     
     # Verify match access
@@ -3862,6 +7099,7 @@ async def send_message_with_attachment(
     attachment_data = None
     
     # Handle file upload if present
+    stored = None
     if file and file.filename:
         content_type = file.content_type or 'application/octet-stream'
         file_type = get_file_type(content_type)
@@ -3869,28 +7107,25 @@ async def send_message_with_attachment(
         if file_type == 'unknown':
             raise HTTPException(status_code=400, detail="File type not allowed")
         
-        ext = Path(file.filename).suffix if file.filename else '.bin'
-        unique_filename = f"chat_{uuid.uuid4().hex}{ext}"
-        file_path = UPLOAD_DIR / unique_filename
-        
-        try:
-            content = await file.read()
-            if len(content) > MAX_FILE_SIZE:
-                raise HTTPException(status_code=400, detail="File too large. Max 50MB allowed")
-            with open(file_path, "wb") as buffer:
-                buffer.write(content)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-        
+        stored = await save_upload(file, user)
+        original_filename = file.filename
+    elif upload_id:
+        stored = await use_resumable_upload(user, upload_id)
+        content_type = stored["content_type"]
+        file_type = get_file_type(content_type)
+        original_filename = stored["original_filename"]
+    
+    if stored:
         attachment_id = f"attach_{uuid.uuid4().hex[:12]}"
         attachment_data = {
             "attachment_id": attachment_id,
             "message_id": message_id,
-            "filename": unique_filename,
-            "original_filename": file.filename,
+            "filename": stored["filename"],
+            "original_filename": original_filename,
             "file_type": file_type,
-            "file_size": len(content),
-            "url": f"/uploads/{unique_filename}",
+            "file_size": stored["file_size"],
+            "url": stored["url"],
+            "thumbnail_url": stored["thumbnail_url"],
             "content_type": content_type
         }
     
@@ -3905,7 +7140,11 @@ async def send_message_with_attachment(
         "timestamp": datetime.now(timezone.utc)
     }
     
-    await db.messages.insert_one(msg_doc)
+    await store_message(msg_doc)
+    await update_match_summary(match_doc, msg_doc)
+    
+    if attachment_data and attachment_data["file_type"] == 'image':
+        queue_image_derivatives(stored)
     
     msg_doc.pop("_id", None)
     return msg_doc
@@ -3968,30 +7207,59 @@ async def create_contract(request: Request, contract_data: ContractCreate):
     contract_doc.pop("_id", None)
     return Contract(**contract_doc)
 
+def contract_details_stages() -> list:
+    """Aggregation stages adding job/party names from the match and defaulting the signature flags"""
+    return [
+        {"$lookup": {
+            "from": "matches",
+            "localField": "match_id",
+            "foreignField": "match_id",
+            "as": "match"
+        }},
+        {"$set": {
+            "job_title": {"$arrayElemAt": ["$match.job_title", 0]},
+            "brand_name": {"$arrayElemAt": ["$match.brand_name", 0]},
+            "influencer_name": {"$arrayElemAt": ["$match.influencer_name", 0]},
+            # The same flags sign_contract checks and sets
+            "brand_signed": {"$eq": ["$brand_signed", True]},
+            "influencer_signed": {"$eq": ["$influencer_signed", True]}
+        }},
+        {"$project": {"_id": 0, "match": 0}}
+    ]
+
 @api_router.get("/contracts/my-contracts")
-async def get_my_contracts(request: Request):
-    """Get all contracts for current user"""
+async def get_my_contracts(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0
+):
+    """Get contracts for current user, newest first. status accepts a comma-separated list."""
     user = await require_auth(request)
     
     query = {"$or": [
         {"brand_user_id": user.user_id},
         {"influencer_user_id": user.user_id}
     ]}
-    
-    contracts = await db.contracts.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    
-    # Add match info and signature status
-    for contract in contracts:
-        match_doc = await db.matches.find_one({"match_id": contract["match_id"]}, {"_id": 0})
-        if match_doc:
-            contract["job_title"] = match_doc.get("job_title")
-            contract["brand_name"] = match_doc.get("brand_name")
-            contract["influencer_name"] = match_doc.get("influencer_name")
-        
-        # Get signature status
-        signatures = await db.contract_signatures.find({"contract_id": contract["contract_id"]}, {"_id": 0}).to_list(2)
-        contract["brand_signed"] = any(s.get("user_id") == contract["brand_user_id"] for s in signatures)
-        contract["influencer_signed"] = any(s.get("user_id") == contract["influencer_user_id"] for s in signatures)
+    if status:
+        query["status"] = {"$in": status.split(",")}
+    
+    limit = max(1, min(limit, 100))
+    skip = max(skip, 0)
+    
+    # Page first so the joins only run for the contracts returned
+    total, contracts = await asyncio.gather(
+        db.contracts.count_documents(query),
+        db.contracts.aggregate([
+            {"$match": query},
+            {"$sort": {"created_at": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            *contract_details_stages()
+        ]).to_list(limit)
+    )
+    response.headers["X-Total-Count"] = str(total)
     
     return contracts
 
@@ -4000,83 +7268,30 @@ async def get_contract(request: Request, contract_id: str):
     """Get contract details"""
     user = await require_auth(request)
     
-    contract_doc = await db.contracts.find_one({"contract_id": contract_id}, {"_id": 0})
-    if not contract_doc:
+    contracts = await db.contracts.aggregate([
+        {"$match": {"contract_id": contract_id}},
+        {"$limit": 1},
+        *contract_details_stages(),
+        {"$lookup": {
+            "from": "milestones",
+            "localField": "contract_id",
+            "foreignField": "contract_id",
+            "as": "milestones"
+        }},
+        {"$project": {"milestones._id": 0}}
+    ]).to_list(1)
+    if not contracts:
         raise HTTPException(status_code=404, detail="Contract not found")
+    contract_doc = contracts[0]
     
     # Verify access
     if contract_doc["brand_user_id"] != user.user_id and contract_doc["influencer_user_id"] != user.user_id:
         raise HTTPException(status_code=403, detail="Not your contract")
     
-    # Get milestones
-    milestones = await db.milestones.find({"contract_id": contract_id}, {"_id": 0}).sort("due_date", 1).to_list(100)
-    contract_doc["milestones"] = milestones
-    
-    # Get match info
-    match_doc = await db.matches.find_one({"match_id": contract_doc["match_id"]}, {"_id": 0})
-    if match_doc:
-        contract_doc["job_title"] = match_doc.get("job_title")
-        contract_doc["brand_name"] = match_doc.get("brand_name")
-        contract_doc["influencer_name"] = match_doc.get("influencer_name")
-    
-    # Get signature status
-    signatures = await db.contract_signatures.find({"contract_id": contract_id}, {"_id": 0}).to_list(2)
-    contract_doc["brand_signed"] = any(s.get("user_id") == contract_doc["brand_user_id"] for s in signatures)
-    contract_doc["influencer_signed"] = any(s.get("user_id") == contract_doc["influencer_user_id"] for s in signatures)
+    contract_doc["milestones"].sort(key=lambda m: m.get("due_date") or "")
     
     return contract_doc
 
-@api_router.post("/contracts/{contract_id}/sign")
-async def sign_contract(request: Request, contract_id: str):
-    """Sign a contract"""
-    user = await require_auth(request)
-    
-    contract_doc = await db.contracts.find_one({"contract_id": contract_id})
-    if not contract_doc:
-        raise HTTPException(status_code=404, detail="Contract not found")
-    
-    # Verify access
-    if contract_doc["brand_user_id"] != user.user_id and contract_doc["influencer_user_id"] != user.user_id:
-        raise HTTPException(status_code=403, detail="Not your contract")
-    
-    # Update signature
-    update_field = "brand_signed" if user.user_id == contract_doc["brand_user_id"] else "influencer_signed"
-    
-    await db.contracts.update_one(
-        {"contract_id": contract_id},
-        {"$set": {update_field: True, "updated_at": datetime.now(timezone.utc)}}
-    )
-    
-    # Check if both signed
-    contract_doc = await db.contracts.find_one({"contract_id": contract_id})
-    if contract_doc["brand_signed"] and contract_doc["influencer_signed"]:
-        await db.contracts.update_one(
-            {"contract_id": contract_id},
-            {"$set": {"status": "active"}}
-        )
-        
-        # Notify both parties
-        for uid in [contract_doc["brand_user_id"], contract_doc["influencer_user_id"]]:
-            await create_notification(
-                user_id=uid,
-                type="contract",
-                title="Sözleşme Aktif!",
-                message="Sözleşme her iki tarafça imzalandı ve aktif hale geldi",
-                link=f"/contracts/{contract_id}"
-            )
-    else:
-        # Notify other party
-        other_user_id = contract_doc["influencer_user_id"] if user.user_id == contract_doc["brand_user_id"] else contract_doc["brand_user_id"]
-        await create_notification(
-            user_id=other_user_id,
-            type="contract",
-            title="Sözleşme İmzalandı!",
-            message=f"{user.name} sözleşmeyi imzaladı. Sizin de imzalamanız bekleniyor.",
-            link=f"/contracts/{contract_id}"
-        )
-    
-    return {"message": "Contract signed successfully"}
-
 @api_router.post("/contracts/{contract_id}/complete")
 async def complete_contract(request: Request, contract_id: str):
     """Mark contract as completed"""
@@ -4093,10 +7308,12 @@ async def complete_contract(request: Request, contract_id: str):
     if contract_doc["status"] != "active":
         raise HTTPException(status_code=400, detail="Contract must be active to complete")
     
+    now = datetime.now(timezone.utc)
     await db.contracts.update_one(
         {"contract_id": contract_id},
-        {"$set": {"status": "completed", "updated_at": datetime.now(timezone.utc)}}
+        {"$set": {"status": "completed", "completed_at": now, "updated_at": now}}
     )
+    await record_metric("contracts.completed")
     
     # Update influencer stats
     await db.influencer_stats.update_one(
@@ -4173,9 +7390,10 @@ async def submit_milestone(
     request: Request,
     milestone_id: str,
     note: str = Form(""),
-    files: List[UploadFile] = File([])
+    files: List[UploadFile] = File([]),
+    upload_ids: str = Form("")
 ):
-    """Submit milestone for approval"""
+    """Submit milestone for approval (files and/or comma-separated resumable upload_ids)"""
     user = await require_role(request, ["influencer"])
     
     milestone_doc = await db.milestones.find_one({"milestone_id": milestone_id})
@@ -4190,15 +7408,11 @@ async def submit_milestone(
     file_urls = []
     for file in files:
         if file.filename:
-            ext = Path(file.filename).suffix
-            unique_filename = f"milestone_{uuid.uuid4().hex}{ext}"
-            file_path = UPLOAD_DIR / unique_filename
-            
-            content = await file.read()
-            with open(file_path, "wb") as buffer:
-                buffer.write(content)
-            
-            file_urls.append(f"/uploads/{unique_filename}")
+            stored = await save_upload(file, user)
+            file_urls.append(stored["url"])
+    for upload_id in [u.strip() for u in upload_ids.split(",") if u.strip()]:
+        stored = await use_resumable_upload(user, upload_id)
+        file_urls.append(stored["url"])
     
     await db.milestones.update_one(
         {"milestone_id": milestone_id},
@@ -4210,6 +7424,10 @@ async def submit_milestone(
         }}
     )
     
+    # A resubmission replaces the previous files
+    for url in milestone_doc.get("submission_files") or []:
+        await release_upload(url, owner_id=user.user_id)
+    
     # Notify brand
     await create_notification(
         user_id=contract_doc["brand_user_id"],
@@ -4258,29 +7476,29 @@ async def approve_milestone(request: Request, milestone_id: str):
 @api_router.post("/media-library")
 async def upload_to_media_library(
     request: Request,
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
+    upload_id: Optional[str] = Form(None),
     tags: str = Form(""),
     description: str = Form("")
 ):
-    """Upload file to influencer's media library"""
+    """Upload file to influencer's media library (multipart file or finalized resumable upload_id)"""
     user = await require_role(request, ["influencer"])
     
-    content_type = file.content_type or 'application/octet-stream'
-    file_type = get_file_type(content_type)
-    
-    if file_type == 'unknown':
-        raise HTTPException(status_code=400, detail="File type not allowed")
-    
-    ext = Path(file.filename).suffix if file.filename else '.bin'
-    unique_filename = f"media_{uuid.uuid4().hex}{ext}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large. Max 50MB allowed")
-    
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+    if file and file.filename:
+        content_type = file.content_type or 'application/octet-stream'
+        file_type = get_file_type(content_type)
+        
+        if file_type == 'unknown':
+            raise HTTPException(status_code=400, detail="File type not allowed")
+        
+        stored = await save_upload(file, user)
+        original_filename = file.filename
+    elif upload_id:
+        stored = await use_resumable_upload(user, upload_id)
+        file_type = get_file_type(stored["content_type"])
+        original_filename = stored["original_filename"]
+    else:
+        raise HTTPException(status_code=400, detail="File or upload_id required")
     
     media_id = f"media_{uuid.uuid4().hex[:12]}"
     
@@ -4289,12 +7507,14 @@ async def upload_to_media_library(
     media_doc = {
         "media_id": media_id,
         "user_id": user.user_id,
-        "filename": unique_filename,
-        "original_filename": file.filename,
+        "filename": stored["filename"],
+        "original_filename": original_filename,
         "file_type": file_type,
-        "file_size": len(content),
-        "url": f"/uploads/{unique_filename}",
-        "thumbnail_url": None,
+        "file_size": stored["file_size"],
+        "url": stored["url"],
+        "sha256": stored["sha256"],
+        "thumbnail_url": stored["thumbnail_url"],
+        "derivatives": stored["derivatives"] or [],
         "tags": tag_list,
         "description": description,
         "created_at": datetime.now(timezone.utc)
@@ -4302,6 +7522,9 @@ async def upload_to_media_library(
     
     await db.media_library.insert_one(media_doc)
     
+    if file_type == 'image':
+        queue_image_derivatives(stored)
+    
     media_doc.pop("_id", None)
     return media_doc
 
@@ -4330,12 +7553,8 @@ async def delete_media(request: Request, media_id: str):
     if media_doc["user_id"] != user.user_id:
         raise HTTPException(status_code=403, detail="Not your media")
     
-    # Delete file
-    file_path = UPLOAD_DIR / media_doc["filename"]
-    if file_path.exists():
-        file_path.unlink()
-    
     await db.media_library.delete_one({"media_id": media_id})
+    await release_upload(media_doc["url"], owner_id=user.user_id)
     
     return {"message": "Media deleted"}
 
@@ -4413,11 +7632,14 @@ async def search_influencers(
     profiles = await db.influencer_profiles.find(profile_query, {"_id": 0}).to_list(200)
     
     # Get stats and filter
+    user_ids = [profile["user_id"] for profile in profiles]
+    users, all_stats = await asyncio.gather(
+        doc_loader("users").load_many(user_ids),
+        doc_loader("influencer_stats").load_many(user_ids)
+    )
+    
     results = []
-    for profile in profiles:
-        user_doc = await db.users.find_one({"user_id": profile["user_id"]}, {"_id": 0, "password_hash": 0})
-        stats_doc = await db.influencer_stats.find_one({"user_id": profile["user_id"]}, {"_id": 0})
-        
+    for profile, user_doc, stats_doc in zip(profiles, users, all_stats):
         if not user_doc:
             continue
         
@@ -4444,7 +7666,7 @@ async def search_influencers(
     if sort_by == "total_reach":
         results.sort(key=lambda x: (x.get("stats") or {}).get("total_reach", 0) or 0, reverse=(sort_order == "desc"))
     elif sort_by == "average_rating":
-        results.sort(key=lambda x: (x.get("stats") or {}).get("average_rating", 0) or 0, reverse=(sort_order == "desc"))
+        results.sort(key=lambda x: (x.get("stats") or {}).get("rating_score", RATING_PRIOR_MEAN), reverse=(sort_order == "desc"))
     elif sort_by == "starting_price":
         results.sort(key=lambda x: x.get("profile", {}).get("starting_price", 0) or 0, reverse=(sort_order == "desc"))
     
@@ -4496,10 +7718,18 @@ async def get_settings(request: Request):
         {"_id": 0}
     ).sort("created_at", -1).to_list(10)
     
+    quota = STORAGE_QUOTAS.get(user.user_type, 0)
+    used = user_doc.get("storage_used", 0)
+    
     return {
         "user": user_doc,
         "settings": settings_doc,
-        "sessions": sessions
+        "sessions": sessions,
+        "storage": {
+            "used": used,
+            "quota": quota or None,
+            "remaining": max(0, quota - used) if quota else None
+        }
     }
 
 @api_router.put("/settings/profile")
@@ -4531,24 +7761,17 @@ async def upload_profile_photo(request: Request, file: UploadFile = File(...)):
     if not content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
     
-    ext = Path(file.filename).suffix if file.filename else '.jpg'
-    unique_filename = f"profile_{user.user_id}_{uuid.uuid4().hex[:8]}{ext}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    content = await file.read()
-    if len(content) > 5 * 1024 * 1024:  # 5MB limit for profile photos
-        raise HTTPException(status_code=400, detail="File too large. Max 5MB allowed")
-    
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
-    
-    photo_url = f"/uploads/{unique_filename}"
+    stored = await save_upload(file, user, max_size=MAX_PROFILE_PHOTO_SIZE)
+    photo_url = stored["url"]
     
     await db.users.update_one(
         {"user_id": user.user_id},
         {"$set": {"picture": photo_url}}
     )
     
+    # Drop the reference held by the previous photo (balances the new one if unchanged)
+    await release_upload(user.picture, owner_id=user.user_id)
+    
     return {"picture": photo_url}
 
 @api_router.put("/settings/password")
@@ -4722,17 +7945,31 @@ async def delete_account(request: Request, password: str = Form(...)):
         if not verify_password(password, user_doc["password_hash"]):
             raise HTTPException(status_code=400, detail="Password is incorrect")
     
+    media_items = await db.media_library.find({"user_id": user.user_id}, {"_id": 0, "url": 1}).to_list(None)
+    influencer_profile, brand_profile = await asyncio.gather(
+        db.influencer_profiles.find_one({"user_id": user.user_id}, {"_id": 0}),
+        db.brand_profiles.find_one({"user_id": user.user_id}, {"_id": 0})
+    )
+    
     # Delete all user data
     await db.users.delete_one({"user_id": user.user_id})
     await db.sessions.delete_many({"user_id": user.user_id})
     await db.user_settings.delete_one({"user_id": user.user_id})
+    profile_tags = await profile_cache_tags(user.user_id)
     await db.influencer_profiles.delete_one({"user_id": user.user_id})
     await db.brand_profiles.delete_one({"user_id": user.user_id})
+    await invalidate_cache(*profile_tags)
     await db.influencer_stats.delete_one({"user_id": user.user_id})
     await db.notifications.delete_many({"user_id": user.user_id})
     await db.favorites.delete_many({"user_id": user.user_id})
     await db.media_library.delete_many({"user_id": user.user_id})
     
+    # Release the user's uploads; unreferenced blobs are garbage-collected later
+    for url in [user_doc.get("picture"), *(m["url"] for m in media_items)]:
+        await release_upload(url)
+    await release_replaced_uploads(user.user_id, influencer_profile, None, INFLUENCER_PROFILE_UPLOAD_FIELDS)
+    await release_replaced_uploads(user.user_id, brand_profile, None, BRAND_PROFILE_UPLOAD_FIELDS)
+    
     return {"message": "Account deleted permanently"}
 
 @api_router.get("/settings/sessions")
@@ -4765,6 +8002,287 @@ async def revoke_session(request: Request, session_id: str):
 # Include router in app
 app.include_router(api_router)
 
+class AuditLogMiddleware:
+    """Log successful authenticated POST/PUT/PATCH/DELETE API calls whose handler did not call audit_log"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH", "DELETE"):
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_status)
+        
+        # The router leaves the matched route in the scope; handlers leave auth info in its state
+        route = scope.get("route")
+        state = scope.get("state", {})
+        if status_code >= 400 or route is None or state.get("audited"):
+            return
+        # Login, register, contact forms and the like have no one to attribute them to
+        if state.get("user") is None:
+            return
+        if (scope["method"], route.path) in AUDIT_LOG_SKIP_ROUTES:
+            return
+        
+        path_params = scope.get("path_params", {})
+        target_type = route.path.removeprefix("/api/").split("/")[0]
+        target_id = next(iter(path_params.values()), "")
+        enqueue_audit_entry(Request(scope), f"{scope['method']} {route.path}", target_type, str(target_id))
+
+app.add_middleware(AuditLogMiddleware)
+
+class RequestLoadersMiddleware:
+    """Give every request its own DataLoader cache (see request_loader)"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = request_loaders.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_loaders.reset(token)
+
+app.add_middleware(RequestLoadersMiddleware)
+
+# Public GET routes answered with validators (strong ETag over the body plus
+# Last-Modified) and these Cache-Control policies. Browsers revalidate with
+# If-None-Match / If-Modified-Since and get an empty 304 while nothing changed.
+# The routes also accept HEAD: the handler renders the full body, which is
+# hashed like a GET's, and the server drops it from the response.
+CONDITIONAL_GET_POLICIES = {
+    "/api/announcements": "public, max-age=30, stale-while-revalidate=300",
+    "/api/announcements/pinned": "public, max-age=30, stale-while-revalidate=300",
+    "/api/popup-settings": "public, max-age=30, stale-while-revalidate=300",
+    "/api/content/{content_type}": "public, max-age=300, stale-while-revalidate=3600",
+    "/api/content/{content_type}/featured": "public, max-age=300, stale-while-revalidate=3600",
+    "/api/trending/categories": "public, max-age=300, stale-while-revalidate=3600",
+    "/api/profile/{profile_id}": "public, max-age=60, stale-while-revalidate=600"
+}
+# url -> (etag, unix time it became current); feeds Last-Modified
+representation_versions = TTLCache(maxsize=10000, ttl=7 * 86400)
+
+class ConditionalGetMiddleware:
+    """ETag / Last-Modified / 304 handling for the routes in CONDITIONAL_GET_POLICIES"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        
+        start = None
+        body = []
+        
+        async def buffer_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Routing has happened by now, so the matched route is known
+                route = scope.get("route")
+                if message["status"] == 200 and route is not None and route.path in CONDITIONAL_GET_POLICIES:
+                    start = message
+                    return
+            elif start is not None:
+                body.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self.respond(scope, start, b"".join(body), send)
+                return
+            await send(message)
+        
+        await self.app(scope, receive, buffer_send)
+    
+    async def respond(self, scope, start, content: bytes, send):
+        url = scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+        version = representation_versions.get(url)
+        etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+        if version is None or version[0] != etag:
+            version = (etag, int(datetime.now(timezone.utc).timestamp()))
+            representation_versions[url] = version
+        
+        headers = [(k, v) for k, v in start["headers"] if k not in (b"etag", b"last-modified", b"cache-control")]
+        headers += [
+            (b"etag", etag.encode()),
+            (b"last-modified", formatdate(version[1], usegmt=True).encode()),
+            (b"cache-control", CONDITIONAL_GET_POLICIES[scope["route"].path].encode())
+        ]
+        
+        if request_not_modified(Request(scope), etag, version[1]):
+            headers = [(k, v) for k, v in headers if k not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+app.add_middleware(ConditionalGetMiddleware)
+
+# Response compression: JSON/text bodies of at least COMPRESSION_MIN_BYTES are
+# sent with the best encoding the client accepts. Bodies carrying an ETag are
+# compressed once per (ETag, encoding) and then served from
+# compressed_responses; big bodies are compressed on a worker thread.
+# Streamed responses (exports, file downloads) pass through untouched.
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_THREAD_MIN_BYTES = 128 * 1024
+COMPRESSION_CACHE_BYTES = int(os.environ.get('COMPRESSION_CACHE_BYTES', str(64 * 1024 * 1024)))
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+# Server preference when the client accepts several equally
+RESPONSE_ENCODINGS = [name for name, available in [
+    ("br", brotli is not None),
+    ("zstd", zstandard is not None),
+    ("gzip", True)
+] if available]
+
+compressed_responses = LRUCache(maxsize=COMPRESSION_CACHE_BYTES, getsizeof=len)  # (etag, encoding) -> bytes
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick an encoding from an Accept-Encoding header, honouring q-values"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    
+    best, best_q = None, 0.0
+    for name in RESPONSE_ENCODINGS:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+def compress_body(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=5)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(content)
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    # Each encoding is its own representation and needs its own strong ETag
+    return f'{etag[:-1]}-{encoding}"'
+
+class CompressionMiddleware:
+    """Negotiated br/zstd/gzip compression with a cache of compressed bodies by ETag"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_headers = dict(scope["headers"])
+        encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        
+        # Validators we handed out carry the encoding; the inner layers only know the plain ETag
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        revalidated_encoding = None
+        for name in RESPONSE_ENCODINGS:
+            if f'-{name}"' in if_none_match:
+                revalidated_encoding = name
+                if_none_match = if_none_match.replace(f'-{name}"', '"')
+        if revalidated_encoding:
+            scope = {**scope, "headers": [
+                (k, if_none_match.encode("latin-1") if k == b"if-none-match" else v) for k, v in scope["headers"]
+            ]}
+        
+        start = None
+        passthrough = False
+        
+        async def compress_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message["headers"])
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                compressible = (
+                    content_type.startswith(COMPRESSIBLE_TYPES)
+                    and b"content-encoding" not in headers
+                    # Byte ranges refer to the stored bytes, so never encode those
+                    and b"accept-ranges" not in headers
+                    and b"no-transform" not in headers.get(b"cache-control", b"")
+                )
+                if message["status"] == 304 and revalidated_encoding and b"etag" in headers:
+                    message = {**message, "headers": [
+                        (k, encoded_etag(v.decode(), revalidated_encoding).encode() if k == b"etag" else v)
+                        for k, v in message["headers"]
+                    ]}
+                # A 304 has no content-type, but the 200 it stands for varied by encoding
+                route = scope.get("route")
+                revalidated = message["status"] == 304 and (
+                    revalidated_encoding is not None
+                    or (route is not None and route.path in CONDITIONAL_GET_POLICIES)
+                )
+                if compressible or revalidated:
+                    message = {**message, "headers": [*message["headers"], (b"vary", b"Accept-Encoding")]}
+                if not compressible or encoding is None or message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            
+            if passthrough or start is None:
+                await send(message)
+                return
+            
+            content = message.get("body", b"")
+            if message.get("more_body", False) or len(content) < COMPRESSION_MIN_BYTES:
+                # Streamed or too small to be worth it
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            
+            await self.send_compressed(start, content, encoding, send)
+        
+        await self.app(scope, receive, compress_send)
+    
+    async def send_compressed(self, start, content: bytes, encoding: str, send):
+        headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+        etag = next((v.decode() for k, v in headers if k == b"etag"), None)
+        
+        compressed = compressed_responses.get((etag, encoding)) if etag else None
+        if compressed is None:
+            if len(content) >= COMPRESSION_THREAD_MIN_BYTES:
+                compressed = await asyncio.to_thread(compress_body, content, encoding)
+            else:
+                compressed = compress_body(content, encoding)
+            if etag:
+                compressed_responses[(etag, encoding)] = compressed
+        
+        if etag:
+            headers = [(k, encoded_etag(etag, encoding).encode() if k == b"etag" else v) for k, v in headers]
+        headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(compressed)).encode())]
+        
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": compressed})
+
+app.add_middleware(CompressionMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -4772,6 +8290,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Content-Disposition"],
 )
 
 # Logging
@@ -4781,6 +8300,97 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    await db.messages.create_index([("match_id", 1), ("timestamp", 1)])
+    await db.message_buckets.create_index([("match_id", 1), ("first_timestamp", 1)])
+    await db.upload_blobs.create_index("sha256", unique=True)
+    await db.upload_blobs.create_index("filename")
+    await db.resumable_uploads.create_index("upload_id", unique=True)
+    await db.resumable_uploads.create_index("expires_at")
+    await db.contracts.create_index("contract_id")
+    await db.contracts.create_index([("brand_user_id", 1), ("created_at", -1)])
+    await db.contracts.create_index([("influencer_user_id", 1), ("created_at", -1)])
+    await create_contract_signature_unique_index()
+    await db.matches.create_index("match_id")
+    await db.milestones.create_index("contract_id")
+    await create_review_unique_index()
+    await db.reviews.create_index([("reviewed_user_id", 1), ("created_at", -1)])
+    await db.influencer_stats.create_index("user_id")
+    await db.brand_stats.create_index("user_id", unique=True)
+    await db.activity_logs.create_index([("timestamp", -1), ("log_id", -1)])
+    await db.activity_logs.create_index([("user_id", 1), ("timestamp", -1)])
+    await ensure_audit_log_ttl_index()
+
+async def ensure_audit_log_ttl_index():
+    """Keep the activity_logs TTL index in line with AUDIT_LOG_RETENTION_DAYS"""
+    existing = (await db.activity_logs.index_information()).get(AUDIT_LOG_TTL_INDEX)
+    if AUDIT_LOG_RETENTION_DAYS <= 0:
+        # Retention turned off: stop expiring entries
+        if existing and "expireAfterSeconds" in existing:
+            await db.activity_logs.drop_index(AUDIT_LOG_TTL_INDEX)
+            logger.info("Audit log TTL index dropped, entries are kept indefinitely")
+        return
+    
+    seconds = AUDIT_LOG_RETENTION_DAYS * 86400
+    if existing is None:
+        await db.activity_logs.create_index("timestamp", name=AUDIT_LOG_TTL_INDEX, expireAfterSeconds=seconds)
+    elif "expireAfterSeconds" not in existing:
+        # A plain index of the same name; recreating it is the only way to add a TTL everywhere
+        await db.activity_logs.drop_index(AUDIT_LOG_TTL_INDEX)
+        await db.activity_logs.create_index("timestamp", name=AUDIT_LOG_TTL_INDEX, expireAfterSeconds=seconds)
+    elif existing["expireAfterSeconds"] != seconds:
+        # create_index with new options would fail with IndexOptionsConflict
+        await db.command("collMod", "activity_logs", index={"name": AUDIT_LOG_TTL_INDEX, "expireAfterSeconds": seconds})
+        logger.info(f"Audit log retention changed to {AUDIT_LOG_RETENTION_DAYS} days")
+
+upload_gc_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_upload_gc():
+    global upload_gc_task
+    if UPLOAD_GC_INTERVAL_SECONDS > 0:
+        upload_gc_task = asyncio.create_task(upload_gc_loop())
+
+audit_log_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_audit_log_writer():
+    global audit_log_task
+    audit_log_task = asyncio.create_task(audit_log_writer())
+
+contract_signature_migration_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_contract_signature_migration():
+    global contract_signature_migration_task
+    contract_signature_migration_task = asyncio.create_task(migrate_contract_signatures())
+
+cache_listener_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_cache_invalidation_listener():
+    global cache_listener_task
+    if cache_shared_tier is not None:
+        cache_listener_task = asyncio.create_task(cache_invalidation_listener())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if upload_gc_task is not None:
+        upload_gc_task.cancel()
+    if upload_gc_report_task is not None:
+        upload_gc_report_task.cancel()
+    if cache_listener_task is not None:
+        cache_listener_task.cancel()
+    if contract_signature_migration_task is not None:
+        contract_signature_migration_task.cancel()
+    # Stop the writer and flush what is still queued before the client goes away
+    audit_log_stopping.set()
+    if audit_log_task is not None:
+        await audit_log_task
+    await flush_audit_log()
+    if image_pool is not None:
+        image_pool.shutdown(wait=False, cancel_futures=True)
+    if cache_shared_tier is not None:
+        await cache_shared_tier.redis.aclose()
     client.close()
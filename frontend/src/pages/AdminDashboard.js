@@ -1,11 +1,13 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import { Users, Briefcase, TrendingUp, DollarSign, LogOut, Trash2, Settings, Bell, Edit, Plus, Star, Award, Check, X, Eye, Clock, Zap, RefreshCw, AlertTriangle, FileText, BarChart3, Shield, MessageCircle, Instagram } from 'lucide-react';
+import { Users, Briefcase, TrendingUp, DollarSign, LogOut, Trash2, Settings, Bell, Edit, Plus, Star, Award, Check, X, Eye, Clock, Zap, RefreshCw, AlertTriangle, FileText, BarChart3, Shield, MessageCircle, Instagram, ChevronLeft, ChevronRight } from 'lucide-react';
 import Navbar from '../components/Navbar';
 import AdminContentManager from '../components/AdminContentManager';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
+// Rows per page in the admin lists (the API's default page size)
+const ADMIN_PAGE_SIZE = 100;
 
 const AdminDashboard = () => {
   const navigate = useNavigate();
@@ -15,6 +17,9 @@ const AdminDashboard = () => {
   const [users, setUsers] = useState([]);
   const [jobs, setJobs] = useState([]);
   const [matches, setMatches] = useState([]);
+  // Admin lists are paginated; X-Total-Count carries the full size
+  const [listTotals, setListTotals] = useState({ users: 0, jobs: 0, matches: 0 });
+  const [listPages, setListPages] = useState({ users: 0, jobs: 0, matches: 0 });
   const [announcements, setAnnouncements] = useState([]);
   const [badges, setBadges] = useState([]);
   const [commission, setCommission] = useState(null);
@@ -71,7 +76,7 @@ const AdminDashboard = () => {
       }
       // 'content' tab uses its own component with internal state
     }
-  }, [user, activeTab, jobFilter, disputeFilter]);
+  }, [user, activeTab, jobFilter, disputeFilter, listPages]);
 
   const fetchUser = async () => {
     try {
@@ -113,13 +118,67 @@ const AdminDashboard = () => {
     }
   };
 
+  const updateListTotal = (list, response) => {
+    const total = Number(response.headers['x-total-count'] ?? response.data.length);
+    setListTotals((prev) => ({ ...prev, [list]: total }));
+    // e.g. the last row of the last page was deleted
+    const lastPage = Math.max(0, Math.ceil(total / ADMIN_PAGE_SIZE) - 1);
+    if (listPages[list] > lastPage) {
+      setListPage(list, lastPage);
+    }
+  };
+
+  const setListPage = (list, page) => {
+    setListPages((prev) => ({ ...prev, [list]: page }));
+  };
+
+  const listPageParams = (list) => ({
+    limit: ADMIN_PAGE_SIZE,
+    skip: listPages[list] * ADMIN_PAGE_SIZE
+  });
+
+  const renderListPager = (list) => {
+    const pageCount = Math.ceil(listTotals[list] / ADMIN_PAGE_SIZE);
+    const page = listPages[list];
+    if (pageCount <= 1) {
+      return null;
+    }
+    return (
+      <div className="flex items-center justify-center gap-4 mt-6" data-testid={`${list}-pager`}>
+        <button
+          onClick={() => setListPage(list, page - 1)}
+          disabled={page === 0}
+          className="px-4 py-2 bg-gray-800 hover:bg-gray-700 rounded-lg transition-colors flex items-center gap-1 disabled:opacity-40 disabled:cursor-not-allowed"
+          data-testid={`${list}-prev-page`}
+        >
+          <ChevronLeft className="w-4 h-4" />
+          Önceki
+        </button>
+        <span className="text-sm text-gray-400">
+          Sayfa {page + 1} / {pageCount}
+        </span>
+        <button
+          onClick={() => setListPage(list, page + 1)}
+          disabled={page >= pageCount - 1}
+          className="px-4 py-2 bg-gray-800 hover:bg-gray-700 rounded-lg transition-colors flex items-center gap-1 disabled:opacity-40 disabled:cursor-not-allowed"
+          data-testid={`${list}-next-page`}
+        >
+          Sonraki
+          <ChevronRight className="w-4 h-4" />
+        </button>
+      </div>
+    );
+  };
+
   const fetchUsers = async () => {
     setLoading(true);
     try {
       const response = await axios.get(`${API_URL}/api/admin/users`, {
+        params: listPageParams('users'),
         withCredentials: true
       });
       setUsers(response.data);
+      updateListTotal('users', response);
     } catch (error) {
       console.error('Error fetching users:', error);
     } finally {
@@ -130,11 +189,14 @@ const AdminDashboard = () => {
   const fetchJobs = async () => {
     setLoading(true);
     try {
-      const params = jobFilter !== 'all' ? `?approval_status=${jobFilter}` : '';
-      const response = await axios.get(`${API_URL}/api/admin/jobs${params}`, {
+      const params = listPageParams('jobs');
+      if (jobFilter !== 'all') params.approval_status = jobFilter;
+      const response = await axios.get(`${API_URL}/api/admin/jobs`, {
+        params,
         withCredentials: true
       });
       setJobs(response.data);
+      updateListTotal('jobs', response);
     } catch (error) {
       console.error('Error fetching jobs:', error);
     } finally {
@@ -146,9 +208,11 @@ const AdminDashboard = () => {
     setLoading(true);
     try {
       const response = await axios.get(`${API_URL}/api/admin/matches`, {
+        params: listPageParams('matches'),
         withCredentials: true
       });
       setMatches(response.data);
+      updateListTotal('matches', response);
     } catch (error) {
       console.error('Error fetching matches:', error);
     } finally {
@@ -696,7 +760,7 @@ const AdminDashboard = () => {
         {/* Users Tab */}
         {activeTab === 'users' && (
           <div>
-            <h2 className="text-3xl font-bold mb-6">Kullanıcılar ({users.length})</h2>
+            <h2 className="text-3xl font-bold mb-6">Kullanıcılar ({listTotals.users})</h2>
             
             {loading ? (
               <div className="text-center py-12">
@@ -750,6 +814,7 @@ const AdminDashboard = () => {
                 </div>
               </div>
             )}
+            {renderListPager('users')}
           </div>
         )}
 
@@ -757,7 +822,7 @@ const AdminDashboard = () => {
         {activeTab === 'jobs' && (
           <div>
             <div className="flex items-center justify-between mb-6">
-              <h2 className="text-3xl font-bold">İlan Yönetimi ({jobs.length})</h2>
+              <h2 className="text-3xl font-bold">İlan Yönetimi ({listTotals.jobs})</h2>
               
               {/* Filter Tabs */}
               <div className="flex gap-2">
@@ -769,7 +834,10 @@ const AdminDashboard = () => {
                 ].map((filter) => (
                   <button
                     key={filter.key}
-                    onClick={() => setJobFilter(filter.key)}
+                    onClick={() => {
+                      setJobFilter(filter.key);
+                      setListPage('jobs', 0);
+                    }}
                     className={`px-4 py-2 rounded-lg text-sm font-medium transition-colors ${
                       jobFilter === filter.key
                         ? `bg-${filter.color}-500/30 text-${filter.color}-400 border border-${filter.color}-500/50`
@@ -912,6 +980,7 @@ const AdminDashboard = () => {
                 ))}
               </div>
             )}
+            {renderListPager('jobs')}
           </div>
         )}
 
@@ -974,7 +1043,7 @@ const AdminDashboard = () => {
         {/* Matches Tab */}
         {activeTab === 'matches' && (
           <div>
-            <h2 className="text-3xl font-bold mb-6">Eşleşmeler ({matches.length})</h2>
+            <h2 className="text-3xl font-bold mb-6">Eşleşmeler ({listTotals.matches})</h2>
             
             {loading ? (
               <div className="text-center py-12">
@@ -1011,6 +1080,7 @@ const AdminDashboard = () => {
                 ))}
               </div>
             )}
+            {renderListPager('matches')}
           </div>
         )}
 
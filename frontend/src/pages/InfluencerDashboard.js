@@ -912,7 +912,7 @@ const InfluencerDashboard = () => {
                   </div>
                   <div className="flex-1 space-y-2">
                     {[5, 4, 3, 2, 1].map((rating) => {
-                      const count = reviews.filter(r => r.rating === rating).length;
+                      const count = stats.rating_histogram?.[rating] ?? reviews.filter(r => r.rating === rating).length;
                       const percentage = stats.total_reviews > 0 ? (count / stats.total_reviews) * 100 : 0;
                       return (
                         <div key={rating} className="flex items-center gap-2">
@@ -322,6 +322,103 @@ class TestAdminApprovalSystem:
         return job_id
 
 
+class TestBulkModeration:
+    """Test bulk admin moderation endpoints"""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as admin and brand"""
+        self.admin_session = requests.Session()
+        self.brand_session = requests.Session()
+        response = self.admin_session.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        assert response.status_code == 200
+        response = self.brand_session.post(f"{BASE_URL}/api/auth/login", json={
+            "email": BRAND_EMAIL,
+            "password": BRAND_PASSWORD
+        })
+        assert response.status_code == 200
+    
+    def create_job(self, suffix):
+        response = self.brand_session.post(f"{BASE_URL}/api/jobs", json={
+            "title": f"TEST_Bulk_Job_{suffix}_{int(time.time())}",
+            "description": "Test job for bulk approval",
+            "category": "Ürün Tanıtımı",
+            "budget": 1000,
+            "platforms": ["instagram"]
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["job_id"]
+    
+    def test_bulk_approve_jobs(self):
+        """Bulk approval should approve every found job and report missing ids"""
+        job_ids = [self.create_job(1), self.create_job(2)]
+        
+        response = self.admin_session.post(f"{BASE_URL}/api/admin/jobs/bulk-approval", json={
+            "job_ids": job_ids + ["job_does_not_exist"],
+            "approval_status": "approved"
+        })
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["updated"] == 2
+        assert data["not_found"] == 1
+        assert [r["status"] for r in data["results"]] == ["updated", "updated", "not_found"]
+        
+        for job_id in job_ids:
+            job = self.admin_session.get(f"{BASE_URL}/api/jobs/{job_id}").json()
+            assert job["approval_status"] == "approved"
+    
+    def test_bulk_reject_jobs_with_reason(self):
+        """Bulk rejection should store the rejection reason"""
+        job_id = self.create_job(3)
+        
+        response = self.admin_session.post(f"{BASE_URL}/api/admin/jobs/bulk-approval", json={
+            "job_ids": [job_id],
+            "approval_status": "rejected",
+            "rejection_reason": "Test red sebebi"
+        })
+        assert response.status_code == 200
+        assert response.json()["updated"] == 1
+        
+        job = self.admin_session.get(f"{BASE_URL}/api/jobs/{job_id}").json()
+        assert job["approval_status"] == "rejected"
+        assert job["rejection_reason"] == "Test red sebebi"
+    
+    def test_bulk_approval_validation(self):
+        """Invalid decisions and empty id lists should return 400"""
+        response = self.admin_session.post(f"{BASE_URL}/api/admin/jobs/bulk-approval", json={
+            "job_ids": ["job_x"],
+            "approval_status": "maybe"
+        })
+        assert response.status_code == 400
+        
+        response = self.admin_session.post(f"{BASE_URL}/api/admin/jobs/bulk-approval", json={
+            "job_ids": [],
+            "approval_status": "approved"
+        })
+        assert response.status_code == 400
+    
+    def test_bulk_approval_requires_admin(self):
+        """Brands cannot use bulk moderation"""
+        response = self.brand_session.post(f"{BASE_URL}/api/admin/jobs/bulk-approval", json={
+            "job_ids": ["job_x"],
+            "approval_status": "approved"
+        })
+        assert response.status_code == 403
+    
+    def test_bulk_dispute_update_reports_missing(self):
+        """Unknown dispute ids should be reported per item"""
+        response = self.admin_session.post(f"{BASE_URL}/api/admin/disputes/bulk-update", json={
+            "dispute_ids": ["dispute_does_not_exist"],
+            "status": "resolved"
+        })
+        assert response.status_code == 200
+        assert response.json()["results"] == [{"id": "dispute_does_not_exist", "status": "not_found"}]
+
+
 class TestJobRenewalSystem:
     """Test Job Renewal System"""
     
@@ -535,7 +632,7 @@ def cleanup_test_jobs():
         return
     
     # Get all jobs
-    response = session.get(f"{BASE_URL}/api/admin/jobs")
+    response = session.get(f"{BASE_URL}/api/admin/jobs", params={"q": "TEST_", "limit": 500})
     if response.status_code != 200:
         print("⚠️ Could not get jobs for cleanup")
         return
@@ -0,0 +1,135 @@
+"""
+Test paginated admin lists and CSV/NDJSON exports for FLULANCE Platform
+
+Features to test:
+1. Admin listeleri sayfalanır, toplam sayı X-Total-Count başlığında döner
+2. Sıralama ve filtre parametreleri
+3. CSV ve NDJSON dışa aktarma
+"""
+
+import pytest
+import requests
+import os
+import json
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://influencer-hub-110.preview.emergentagent.com')
+
+ADMIN_EMAIL = "admin@flulance.com"
+ADMIN_PASSWORD = "admin123"
+
+
+class TestAdminLists:
+    """Test pagination, sorting and filtering on admin lists"""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as admin"""
+        self.session = requests.Session()
+        response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        assert response.status_code == 200, f"Admin login failed: {response.text}"
+    
+    def test_users_are_paginated(self):
+        """limit should cap the page and X-Total-Count should report all users"""
+        response = self.session.get(f"{BASE_URL}/api/admin/users", params={"limit": 2})
+        assert response.status_code == 200
+        
+        total = int(response.headers["X-Total-Count"])
+        assert len(response.json()) == min(2, total)
+        assert total >= 3  # seeded admin, brand and influencer
+    
+    def test_pages_do_not_overlap(self):
+        """Consecutive pages should return different users"""
+        first = self.session.get(f"{BASE_URL}/api/admin/users", params={"limit": 1, "skip": 0}).json()
+        second = self.session.get(f"{BASE_URL}/api/admin/users", params={"limit": 1, "skip": 1}).json()
+        assert first[0]["user_id"] != second[0]["user_id"]
+    
+    def test_filter_by_user_type(self):
+        """user_type filter should only return that type"""
+        response = self.session.get(f"{BASE_URL}/api/admin/users", params={"user_type": "influencer"})
+        assert response.status_code == 200
+        assert all(u["user_type"] == "influencer" for u in response.json())
+    
+    def test_sort_ascending(self):
+        """sort=name should order users by name"""
+        response = self.session.get(f"{BASE_URL}/api/admin/users", params={"sort": "name"})
+        assert response.status_code == 200
+        names = [u["name"] for u in response.json()]
+        assert names == sorted(names)
+    
+    def test_unknown_sort_field_rejected(self):
+        """Sorting on a field outside the whitelist should return 400"""
+        response = self.session.get(f"{BASE_URL}/api/admin/users", params={"sort": "password_hash"})
+        assert response.status_code == 400
+    
+    def test_users_sparse_fieldset(self):
+        """fields= should return only the requested user fields plus user_id"""
+        response = self.session.get(f"{BASE_URL}/api/admin/users", params={"fields": "email,name", "limit": 5})
+        assert response.status_code == 200
+        assert "X-Total-Count" in response.headers
+        assert all(set(u) == {"user_id", "email", "name"} for u in response.json())
+    
+    def test_unknown_field_rejected(self):
+        """Fields outside the whitelist should return 400"""
+        response = self.session.get(f"{BASE_URL}/api/admin/users", params={"fields": "password_hash"})
+        assert response.status_code == 400
+    
+    def test_disputes_default_to_open(self):
+        """Disputes list should still default to open disputes"""
+        response = self.session.get(f"{BASE_URL}/api/admin/disputes")
+        assert response.status_code == 200
+        assert all(d["status"] == "open" for d in response.json())
+
+
+class TestAdminExports:
+    """Test streaming admin exports"""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as admin"""
+        self.session = requests.Session()
+        response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        assert response.status_code == 200
+    
+    def test_users_csv_export(self):
+        """CSV export should have a header row and one row per user"""
+        total = int(self.session.get(f"{BASE_URL}/api/admin/users", params={"limit": 1}).headers["X-Total-Count"])
+        
+        response = self.session.get(f"{BASE_URL}/api/admin/export/users")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        
+        lines = response.content.decode("utf-8-sig").splitlines()
+        assert lines[0].startswith("user_id,email,name,user_type")
+        assert len(lines) - 1 >= total
+        assert "password_hash" not in response.text
+    
+    def test_users_ndjson_export(self):
+        """NDJSON export should contain one JSON document per line"""
+        response = self.session.get(f"{BASE_URL}/api/admin/export/users", params={"format": "ndjson", "user_type": "admin"})
+        assert response.status_code == 200
+        
+        users = [json.loads(line) for line in response.text.splitlines() if line]
+        assert len(users) >= 1
+        assert all(u["user_type"] == "admin" for u in users)
+        assert all("password_hash" not in u for u in users)
+    
+    def test_unknown_export_rejected(self):
+        """Only whitelisted collections can be exported"""
+        response = self.session.get(f"{BASE_URL}/api/admin/export/user_sessions")
+        assert response.status_code == 404
+    
+    def test_export_requires_admin(self):
+        """Exports should require admin authentication"""
+        response = requests.get(f"{BASE_URL}/api/admin/export/users")
+        assert response.status_code == 401
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,196 @@
+"""
+Test the two-tier response cache for FLULANCE Platform
+
+Features to test:
+1. Aynı anahtardaki eşzamanlı ıskalamalar tek bir yüklemeyi paylaşır
+2. Yükleme sürerken yapılan geçersizleştirmeden sonra eski değer saklanmaz
+3. Başka bir worker'ın geçersizleştirmesi pub/sub ile yerel katmana ulaşır
+4. Paylaşılan katmandaki hatalar ıskalama sayılır, istek başarısız olmaz
+5. Etiketle geçersizleştirme yalnızca o etiketi taşıyan kayıtları siler
+
+These tests run in-process against the backend module with an in-memory
+Redis (fakeredis) as the shared tier.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# The Mongo client is created at import time but never connects in these tests
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "flulance_test")
+
+import server  # noqa: E402
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """A fresh in-memory Redis and empty cache registry for each test"""
+    monkeypatch.setattr(server, "caches", {})
+    monkeypatch.setattr(server, "cache_generation", 0)
+    monkeypatch.setattr(server, "cache_shared_tier", None)
+    return fakeredis.FakeServer()
+
+
+def use_shared_tier(redis_server) -> server.SharedCacheTier:
+    """Point the backend at the fake Redis; call from inside the running loop"""
+    tier = server.SharedCacheTier(fakeredis.FakeAsyncRedis(server=redis_server))
+    server.cache_shared_tier = tier
+    return tier
+
+
+class Loader:
+    """A load function that counts its calls and can be held until released"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        else:
+            await asyncio.sleep(0)
+        return self.value
+
+
+class TestCoalescing:
+    """Concurrent misses on one key"""
+
+    def test_concurrent_misses_share_one_load(self, redis_server):
+        """Misses arriving while a load is running should wait for it"""
+        loader = Loader({"total": 3})
+
+        async def run():
+            tier = use_shared_tier(redis_server)
+            cache = server.get_cache("stats")
+            results = await asyncio.gather(*(cache.get_or_load("k", loader, ["stats"]) for _ in range(5)))
+            stored, _ = await tier.get("stats", "k")
+            return cache, results, stored
+
+        cache, results, stored = asyncio.run(run())
+        assert results == [{"total": 3}] * 5
+        assert loader.calls == 1
+        assert cache.summary()["coalesced"] == 4
+        assert stored == {"v": {"total": 3}}
+
+    def test_shared_hit_skips_the_load(self, redis_server):
+        """A value another worker stored should be served without loading"""
+        loader = Loader(["fresh"])
+
+        async def run():
+            tier = use_shared_tier(redis_server)
+            await tier.set("stats", "k", ["shared"], 60, ["stats"], 0)
+            return await server.get_cache("stats").get_or_load("k", loader, ["stats"])
+
+        assert asyncio.run(run()) == ["shared"]
+        assert loader.calls == 0
+
+
+class TestInvalidation:
+    """Invalidation by tag, here and in other workers"""
+
+    def test_no_stale_store_after_concurrent_invalidation(self, redis_server):
+        """A value loaded before an invalidation must not be cached after it"""
+        loader = Loader({"name": "old"})
+
+        async def run():
+            tier = use_shared_tier(redis_server)
+            loader.release = asyncio.Event()
+            cache = server.get_cache("profiles")
+            pending = asyncio.ensure_future(cache.get_or_load("p1", loader, ["profile:p1"]))
+            await asyncio.sleep(0.01)
+            await server.invalidate_cache("profile:p1")
+            loader.release.set()
+            value = await pending
+            stored, _ = await tier.get("profiles", "p1")
+
+            loader.value = {"name": "new"}
+            loader.release = None
+            reloaded = await cache.get_or_load("p1", loader, ["profile:p1"])
+            return cache, value, stored, reloaded
+
+        cache, value, stored, reloaded = asyncio.run(run())
+        assert value == {"name": "old"}
+        assert stored is None
+        assert reloaded == {"name": "new"}
+        assert loader.calls == 2
+
+    def test_tag_invalidation_drops_only_tagged_entries(self, redis_server):
+        """Entries without the tag should stay in both tiers"""
+        async def run():
+            tier = use_shared_tier(redis_server)
+
+            @server.cached("profiles", tags=["profile:{profile_id}"])
+            async def get_profile(profile_id: str):
+                return {"profile_id": profile_id}
+
+            await get_profile("p1")
+            await get_profile("p2")
+            await server.invalidate_cache("profile:p1")
+            cache = server.caches["profiles"]
+            local_keys = list(cache.local.keys())
+            shared = [(await tier.get("profiles", key))[0] for key in ('[["profile_id", "p1"]]', '[["profile_id", "p2"]]')]
+            return cache, local_keys, shared
+
+        cache, local_keys, shared = asyncio.run(run())
+        assert local_keys == ['[["profile_id", "p2"]]']
+        assert shared == [None, {"v": {"profile_id": "p2"}}]
+        assert cache.summary()["invalidated"] == 1
+
+    def test_other_worker_invalidation_reaches_local_tier(self, redis_server):
+        """An invalidation published by another worker should drop local entries"""
+        async def run():
+            use_shared_tier(redis_server)
+            cache = server.get_cache("profiles")
+            await cache.get_or_load("p1", Loader({"name": "old"}), ["profile:p1"])
+            listener = asyncio.ensure_future(server.cache_invalidation_listener())
+            await asyncio.sleep(0.05)
+
+            # The other worker has its own connection and its own local tier
+            other = server.SharedCacheTier(fakeredis.FakeAsyncRedis(server=redis_server))
+            await other.invalidate(["profile:p1"])
+            for _ in range(100):
+                if "p1" not in cache.local:
+                    break
+                await asyncio.sleep(0.01)
+
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            return cache
+
+        cache = asyncio.run(run())
+        assert "p1" not in cache.local
+        assert cache.summary()["invalidated"] == 1
+
+
+class TestSharedTierErrors:
+    """An unreachable Redis only costs the cache"""
+
+    def test_errors_are_misses(self, redis_server):
+        """Reads, writes and invalidations should not fail the request"""
+        loader = Loader({"total": 1})
+
+        async def run():
+            use_shared_tier(redis_server)
+            redis_server.connected = False
+            cache = server.get_cache("stats")
+            first = await cache.get_or_load("k", loader, ["stats"])
+            await server.invalidate_cache("stats")
+            second = await cache.get_or_load("k", loader, ["stats"])
+            return cache, first, second
+
+        cache, first, second = asyncio.run(run())
+        assert first == second == {"total": 1}
+        assert loader.calls == 2
+        assert cache.summary()["shared_errors"] == 2
+        assert cache.summary()["shared_hits"] == 0
@@ -0,0 +1,186 @@
+"""
+Test request-scoped DataLoader batching for FLULANCE Platform
+
+Features to test:
+1. Aynı döngü turundaki yüklemeler tek bir toplu sorguda birleşir
+2. Tekrarlanan anahtarlar bir kez sorgulanır, sonuçlar kopyalanarak döner
+3. Her istek kendi önbelleğini kullanır; istek dışında önbellek tutulmaz
+
+These tests run in-process against the backend module; no server is needed.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# The Mongo client is created at import time but never connects in these tests
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "flulance_test")
+
+import server  # noqa: E402
+
+NAME = ("test", "users")
+
+
+class Source:
+    """A batch function that records every batch it is asked for"""
+
+    def __init__(self, docs=None, error=None):
+        self.docs = docs if docs is not None else {}
+        self.error = error
+        self.batches = []
+
+    async def __call__(self, keys):
+        self.batches.append(sorted(keys))
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return {key: self.docs[key] for key in keys if key in self.docs}
+
+
+def users(*keys):
+    return {key: {"user_id": key, "name": key.upper()} for key in keys}
+
+
+class TestBatching:
+    """Loads within one loop turn"""
+
+    def test_loads_are_batched(self):
+        """Concurrent loads should become a single batch call"""
+        source = Source(users("a", "b", "c"))
+
+        async def run():
+            loader = server.DataLoader(source)
+            return await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("c"))
+
+        results = asyncio.run(run())
+        assert [r["name"] for r in results] == ["A", "B", "C"]
+        assert source.batches == [["a", "b", "c"]]
+
+    def test_duplicate_keys_fetched_once(self):
+        """Repeated keys should share one fetch, also across later turns"""
+        source = Source(users("a", "b"))
+
+        async def run():
+            loader = server.DataLoader(source)
+            first = await loader.load_many(["a", "b", "a"])
+            second = await loader.load("a")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert [r["user_id"] for r in first] == ["a", "b", "a"]
+        assert second["user_id"] == "a"
+        assert source.batches == [["a", "b"]]
+
+    def test_results_are_copies(self):
+        """Decorating a result must not change what other callers get"""
+        source = Source(users("a"))
+
+        async def run():
+            loader = server.DataLoader(source)
+            first = await loader.load("a")
+            first["name"] = "changed"
+            return await loader.load("a")
+
+        assert asyncio.run(run())["name"] == "A"
+
+    def test_missing_key_gets_default(self):
+        """Keys the batch does not return should resolve to the default"""
+        async def run():
+            loader = server.DataLoader(Source(), default=0)
+            return await loader.load("missing")
+
+        assert asyncio.run(run()) == 0
+
+    def test_batch_error_reaches_every_caller(self):
+        """A failed batch should fail all waiters and not be cached"""
+        source = Source(users("a", "b"), error=RuntimeError("db down"))
+
+        async def run():
+            loader = server.DataLoader(source)
+            results = await asyncio.gather(loader.load("a"), loader.load("b"), return_exceptions=True)
+            source.error = None
+            retry = await loader.load("a")
+            return loader, results, retry
+
+        loader, results, retry = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert retry["user_id"] == "a"
+        assert len(source.batches) == 2
+        assert not loader.dispatches
+
+    def test_bad_batch_result_does_not_hang(self):
+        """A batch function returning the wrong type should still fail the callers"""
+        async def bad_batch(keys):
+            return None
+
+        async def run():
+            loader = server.DataLoader(bad_batch)
+            return await asyncio.wait_for(loader.load("a"), timeout=1)
+
+        with pytest.raises(AttributeError):
+            asyncio.run(run())
+
+    def test_dispatch_task_is_kept(self):
+        """The dispatch task should be referenced until it finishes"""
+        started = []
+
+        async def slow_batch(keys):
+            started.append(keys)
+            await asyncio.sleep(0.01)
+            return {}
+
+        async def run():
+            loader = server.DataLoader(slow_batch)
+            waiter = asyncio.ensure_future(loader.load("a"))
+            while not started:
+                await asyncio.sleep(0)
+            running = len(loader.dispatches)
+            await waiter
+            await asyncio.sleep(0)
+            return running, len(loader.dispatches)
+
+        assert asyncio.run(run()) == (1, 0)
+
+
+class TestRequestScope:
+    """request_loader and the per-request ContextVar"""
+
+    def request(self, source, keys):
+        """One request: fresh loaders, the way RequestLoadersMiddleware sets them"""
+        async def run():
+            token = server.request_loaders.set({})
+            try:
+                loader = server.request_loader(NAME, source)
+                assert server.request_loader(NAME, source) is loader
+                await loader.load_many(keys)
+                await loader.load_many(keys)
+            finally:
+                server.request_loaders.reset(token)
+        return run()
+
+    def test_requests_do_not_share_cache(self):
+        """Each request should fetch its own data, even concurrently"""
+        source = Source(users("a", "b"))
+
+        async def run():
+            await asyncio.gather(self.request(source, ["a"]), self.request(source, ["a", "b"]))
+
+        asyncio.run(run())
+        assert sorted(source.batches) == [["a"], ["a", "b"]]
+
+    def test_outside_request_is_not_cached(self):
+        """Without a request scope every loader is new"""
+        source = Source(users("a"))
+
+        async def run():
+            await server.request_loader(NAME, source).load("a")
+            await server.request_loader(NAME, source).load("a")
+
+        asyncio.run(run())
+        assert source.batches == [["a"], ["a"]]
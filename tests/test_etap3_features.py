@@ -9,6 +9,7 @@ Test Etap 3 Features - Admin Panel Enhancements
 import pytest
 import requests
 import os
+import time
 import uuid
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://influencer-hub-110.preview.emergentagent.com')
@@ -88,12 +89,109 @@ class TestAdminDashboardStats:
             assert "name" in data["categories"][0]
             assert "count" in data["categories"][0]
     
+    def test_dashboard_stats_growth_covers_last_30_days(self):
+        """User growth should have one entry per day, ending today"""
+        response = requests.get(f"{BASE_URL}/api/admin/dashboard-stats", headers=self.headers)
+        assert response.status_code == 200
+        
+        growth = response.json()["users"]["growth"]
+        assert len(growth) == 30
+        dates = [day["date"] for day in growth]
+        assert dates == sorted(dates)
+        assert sum(day["count"] for day in growth) <= response.json()["users"]["total"]
+    
     def test_dashboard_stats_requires_admin(self):
         """Dashboard stats should require admin authentication"""
         response = requests.get(f"{BASE_URL}/api/admin/dashboard-stats")
         assert response.status_code == 401
 
 
+class TestAdminMetrics:
+    """Test /api/admin/metrics rollup queries"""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as admin and get session token"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": "admin@flulance.com",
+            "password": "admin123"
+        })
+        assert response.status_code == 200
+        self.session_token = response.cookies.get('session_token')
+        self.headers = {"Authorization": f"Bearer {self.session_token}"}
+    
+    def test_daily_metrics_are_zero_filled(self):
+        """Every day in the range should be present with all counters"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/metrics",
+            params={"start": "2024-01-01", "end": "2024-01-31"},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        
+        series = response.json()["series"]
+        assert len(series) == 31
+        assert series[0]["period"] == "2024-01-01"
+        assert "created" in series[0]["jobs"]
+        assert "sent" in series[0]["messages"]
+    
+    def test_monthly_metrics(self):
+        """Month granularity should return one period per month"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/metrics",
+            params={"start": "2024-01-01", "end": "2024-06-30", "granularity": "month"},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        assert [p["period"] for p in response.json()["series"]] == [
+            "2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01", "2024-05-01", "2024-06-01"
+        ]
+    
+    def test_invalid_granularity_rejected(self):
+        """Unknown granularity should return 400"""
+        response = requests.get(f"{BASE_URL}/api/admin/metrics", params={"granularity": "year"}, headers=self.headers)
+        assert response.status_code == 400
+    
+    def test_long_range_rejected(self):
+        """A span too long for the granularity should return 400 instead of a huge series"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/metrics",
+            params={"start": "1900-01-01", "end": "2024-01-01"},
+            headers=self.headers
+        )
+        assert response.status_code == 400
+        
+        response = requests.get(
+            f"{BASE_URL}/api/admin/metrics",
+            params={"start": "2020-01-01", "end": "2024-12-31", "granularity": "month"},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        assert len(response.json()["series"]) == 60
+    
+    def test_metrics_requires_admin(self):
+        """Metrics should require admin authentication"""
+        response = requests.get(f"{BASE_URL}/api/admin/metrics")
+        assert response.status_code == 401
+    
+    def test_cache_stats(self):
+        """Cache stats should list every cache with its counters"""
+        requests.get(f"{BASE_URL}/api/announcements/pinned")
+        response = requests.get(f"{BASE_URL}/api/admin/cache/stats", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        stats = data["caches"]["pinned_announcements"]
+        for key in ["local_hits", "shared_hits", "misses", "coalesced", "loads", "invalidated", "size"]:
+            assert key in stats
+        
+        for flight in data["single_flight"].values():
+            assert flight["calls"] == flight["executed"] + flight["suppressed"]
+        
+        response = requests.get(f"{BASE_URL}/api/admin/cache/stats")
+        assert response.status_code == 401
+
+
 class TestPopupSettings:
     """Test popup notification management endpoints"""
     
@@ -185,6 +283,34 @@ class TestPopupSettings:
         
         data = response.json()
         assert data.get("enabled") == False
+    
+    def test_public_popup_settings_conditional_get(self):
+        """Repeat requests with the ETag should get an empty 304"""
+        response = requests.get(f"{BASE_URL}/api/popup-settings")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert "stale-while-revalidate" in response.headers["Cache-Control"]
+        assert response.headers.get("Last-Modified")
+        
+        response = requests.get(f"{BASE_URL}/api/popup-settings", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert "Accept-Encoding" in response.headers.get("Vary", "")
+    
+    def test_public_popup_settings_head(self):
+        """HEAD should report the same validators as GET without a body"""
+        response = requests.get(f"{BASE_URL}/api/popup-settings")
+        assert response.status_code == 200
+        
+        head = requests.head(f"{BASE_URL}/api/popup-settings")
+        assert head.status_code == 200
+        assert head.content == b""
+        assert head.headers["ETag"] == response.headers["ETag"]
+        assert head.headers["Last-Modified"] == response.headers["Last-Modified"]
+        
+        head = requests.head(f"{BASE_URL}/api/popup-settings", headers={"If-None-Match": response.headers["ETag"]})
+        assert head.status_code == 304
 
 
 class TestActivityLogs:
@@ -213,6 +339,48 @@ class TestActivityLogs:
         """Activity logs should require admin authentication"""
         response = requests.get(f"{BASE_URL}/api/admin/activity-logs")
         assert response.status_code == 401
+    
+    def test_admin_actions_are_logged(self):
+        """Admin mutations should show up in the activity log shortly after"""
+        response = requests.put(f"{BASE_URL}/api/admin/popup-settings", json={"enabled": False}, headers=self.headers)
+        assert response.status_code == 200
+        
+        time.sleep(2)  # entries are written in batches
+        response = requests.get(f"{BASE_URL}/api/admin/activity-logs", params={"action": "popup.update"}, headers=self.headers)
+        assert response.status_code == 200
+        assert len(response.json()) >= 1
+    
+    def test_anonymous_requests_not_logged(self):
+        """Login, register and contact posts have no user and should not be logged"""
+        requests.post(f"{BASE_URL}/api/auth/login", json={"email": "nobody@flulance.com", "password": "wrong"})
+        response = requests.post(f"{BASE_URL}/api/contact", json={
+            "name": "TEST Ziyaretçi",
+            "email": "test_visitor@example.com",
+            "message": "Bu mesaj denetim kaydına düşmemeli"
+        })
+        assert response.status_code == 200
+        
+        time.sleep(2)  # entries are written in batches
+        response = requests.get(f"{BASE_URL}/api/admin/activity-logs", params={"action": "POST /api/contact"}, headers=self.headers)
+        assert response.status_code == 200
+        assert all(entry.get("user_id") for entry in response.json())
+    
+    def test_activity_logs_keyset_pagination(self):
+        """Following X-Next-Cursor should never repeat an entry"""
+        response = requests.get(f"{BASE_URL}/api/admin/activity-logs", params={"limit": 1}, headers=self.headers)
+        assert response.status_code == 200
+        first = response.json()
+        
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor:
+            response = requests.get(f"{BASE_URL}/api/admin/activity-logs", params={"limit": 1, "cursor": cursor}, headers=self.headers)
+            assert response.status_code == 200
+            assert response.json()[0]["log_id"] != first[0]["log_id"]
+    
+    def test_activity_logs_cannot_be_forged(self):
+        """There is no public endpoint for writing log entries"""
+        response = requests.post(f"{BASE_URL}/api/admin/activity-logs", params={"user_id": "x", "action": "fake"})
+        assert response.status_code == 405
 
 
 class TestContentManagement:
@@ -409,6 +577,45 @@ class TestContentManagement:
         
         data = response.json()
         assert isinstance(data, list)
+        
+        # Publishing more content must not be hidden by the cache
+        title = f"TEST_Public_{uuid.uuid4().hex[:8]}"
+        create_response = requests.post(f"{BASE_URL}/api/admin/content",
+            headers=self.headers,
+            json={"content_type": "blog", "title": title, "content": "Public content", "is_published": True}
+        )
+        self.created_content_ids.append(create_response.json()["content_id"])
+        
+        response = requests.get(f"{BASE_URL}/api/content/blog")
+        assert title in [c["title"] for c in response.json()]
+    
+    def test_public_content_is_compressed(self):
+        """Large JSON responses should be compressed for clients that accept it"""
+        for _ in range(5):
+            create_response = requests.post(f"{BASE_URL}/api/admin/content",
+                headers=self.headers,
+                json={
+                    "content_type": "blog",
+                    "title": f"TEST_Compressed_{uuid.uuid4().hex[:8]}",
+                    "content": "Sıkıştırılabilir içerik " * 50,
+                    "is_published": True
+                }
+            )
+            self.created_content_ids.append(create_response.json()["content_id"])
+        
+        response = requests.get(f"{BASE_URL}/api/content/blog", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers.get("Content-Encoding") == "gzip"
+        assert "Accept-Encoding" in response.headers.get("Vary", "")
+        assert response.headers["ETag"].endswith('-gzip"')
+        assert isinstance(response.json(), list)
+        
+        response = requests.get(
+            f"{BASE_URL}/api/content/blog",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+        assert "Accept-Encoding" in response.headers.get("Vary", "")
     
     def test_content_requires_admin(self):
         """Content management should require admin authentication"""
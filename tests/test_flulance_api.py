@@ -220,6 +220,16 @@ class TestJobEndpoints:
         for job in data:
             assert job["status"] == "open"
         print(f"Found {len(data)} open jobs")
+    
+    def test_get_jobs_sparse_fieldset(self):
+        """fields= should trim each job to the requested fields plus job_id"""
+        response = requests.get(f"{BASE_URL}/api/jobs", params={"fields": "title,budget"})
+        assert response.status_code == 200
+        for job in response.json():
+            assert set(job) == {"job_id", "title", "budget"}
+        
+        response = requests.get(f"{BASE_URL}/api/jobs", params={"fields": "title,password"})
+        assert response.status_code == 400
 
 
 class TestNotificationEndpoints:
@@ -151,6 +151,28 @@ class TestReviewEndpoints:
         assert isinstance(data, list)
         print(f"Found {len(data)} public reviews for user")
 
+    def test_rating_counters_are_consistent(self):
+        """Stats rating counters should agree with each other"""
+        user_id = self.user_data.get("user_id")
+
+        stats = requests.get(f"{BASE_URL}/api/influencer-stats/{user_id}").json()
+        if not stats:
+            pytest.skip("No stats for this influencer")
+
+        assert stats["total_reviews"] == stats["rating_count"]
+        if stats["rating_count"]:
+            assert sum(stats["rating_histogram"].values()) == stats["rating_count"]
+            assert stats["average_rating"] == round(stats["rating_sum"] / stats["rating_count"], 1)
+            assert 1 <= stats["rating_score"] <= 5
+
+    def test_brand_stats_default(self):
+        """Brands without reviews get an empty rating summary"""
+        response = requests.get(f"{BASE_URL}/api/brand-stats/user_doesnotexist")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rating_count"] == 0
+        assert data["average_rating"] == 0
+
 
 class TestReviewCreation:
     """Test review creation with match (FAZ 2)"""
@@ -237,6 +237,28 @@ class TestContractEndpoints:
         assert isinstance(data, list)
         print(f"Found {len(data)} contracts")
     
+    def test_my_contracts_pagination_and_status_filter(self):
+        """Contracts list should page with limit/skip and filter by status"""
+        response = requests.get(
+            f"{BASE_URL}/api/contracts/my-contracts",
+            headers=self.headers,
+            params={"limit": 1}
+        )
+        assert response.status_code == 200
+        total = int(response.headers["X-Total-Count"])
+        assert len(response.json()) == min(1, total)
+        
+        response = requests.get(
+            f"{BASE_URL}/api/contracts/my-contracts",
+            headers=self.headers,
+            params={"status": "draft,pending"}
+        )
+        assert response.status_code == 200
+        for contract in response.json():
+            assert contract["status"] in ["draft", "pending"]
+            assert isinstance(contract["brand_signed"], bool)
+            assert isinstance(contract["influencer_signed"], bool)
+    
     def test_create_contract_requires_match(self):
         """Test that contract creation requires a valid match"""
         contract_data = {
@@ -303,6 +325,31 @@ class TestContractEndpoints:
         assert data["total_amount"] == 5000
         print(f"Contract created: {data['contract_id']}")
 
+    def test_sign_contract_once(self):
+        """Signing moves the contract forward once; a second signature is rejected"""
+        response = requests.post(
+            f"{BASE_URL}/api/contracts/contract_doesnotexist/sign",
+            headers=self.headers
+        )
+        assert response.status_code == 404
+
+        contracts = requests.get(
+            f"{BASE_URL}/api/contracts/my-contracts",
+            headers=self.headers,
+            params={"status": "draft,pending"}
+        ).json()
+        unsigned = [c for c in contracts if not c["brand_signed"]]
+        if len(unsigned) == 0:
+            pytest.skip("No unsigned contracts available for signing test")
+
+        contract_id = unsigned[0]["contract_id"]
+        response = requests.post(f"{BASE_URL}/api/contracts/{contract_id}/sign", headers=self.headers)
+        assert response.status_code == 200, f"Signing failed: {response.text}"
+        assert response.json()["contract_status"] in ["pending", "active"]
+
+        response = requests.post(f"{BASE_URL}/api/contracts/{contract_id}/sign", headers=self.headers)
+        assert response.status_code == 400
+
 
 class TestChatWithAttachments:
     """Chat with attachments endpoint tests (FAZ 3)"""
@@ -0,0 +1,106 @@
+"""
+FLULANCE API Backend Tests - Inbox & Messaging
+Tests for the inbox summary endpoint (last message, unread counts, pagination)
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://influencer-hub-110.preview.emergentagent.com')
+
+# Test credentials
+INFLUENCER_USER = {"email": "ayse@influencer.com", "password": "test123"}
+BRAND_USER = {"email": "marka@test.com", "password": "test123"}
+ADMIN_USER = {"email": "admin@flulance.com", "password": "admin123"}
+
+
+def login(credentials):
+    response = requests.post(f"{BASE_URL}/api/auth/login", json=credentials)
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.cookies.get('session_token')}"}
+
+
+class TestInboxEndpoint:
+    """Inbox summary endpoint tests"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as brand and influencer"""
+        self.brand_headers = login(BRAND_USER)
+        self.influencer_headers = login(INFLUENCER_USER)
+
+    def test_inbox_requires_auth(self):
+        """Test that inbox requires authentication"""
+        response = requests.get(f"{BASE_URL}/api/inbox")
+        assert response.status_code == 401
+
+    def test_inbox_rejects_admin(self):
+        """Test that admins have no inbox"""
+        response = requests.get(f"{BASE_URL}/api/inbox", headers=login(ADMIN_USER))
+        assert response.status_code == 403
+
+    def test_inbox_structure(self):
+        """Test inbox response structure"""
+        response = requests.get(f"{BASE_URL}/api/inbox", headers=self.brand_headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert "results" in data
+        assert "total" in data
+        assert isinstance(data["results"], list)
+
+        for entry in data["results"]:
+            assert "match_id" in entry
+            assert "other_user_name" in entry
+            assert "last_message" in entry
+            assert "last_activity_at" in entry
+            assert "unread_count" in entry
+        print(f"Inbox has {data['total']} conversations")
+
+    def test_inbox_pagination(self):
+        """Test limit/skip pagination"""
+        response = requests.get(f"{BASE_URL}/api/inbox?limit=1", headers=self.brand_headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert len(data["results"]) <= 1
+
+    def test_send_message_updates_inbox(self):
+        """Test that sending a message updates preview, order and unread count"""
+        matches = requests.get(f"{BASE_URL}/api/matches/my-matches", headers=self.brand_headers).json()
+        if not matches:
+            pytest.skip("No matches available for brand user")
+
+        match = next((m for m in matches if m["influencer_name"]), matches[0])
+        text = f"TEST_inbox {uuid.uuid4().hex[:8]}"
+
+        response = requests.post(
+            f"{BASE_URL}/api/matches/{match['match_id']}/messages",
+            headers=self.brand_headers,
+            json={"message": text}
+        )
+        assert response.status_code == 200
+
+        # Brand sees the conversation first with its own message as preview
+        inbox = requests.get(f"{BASE_URL}/api/inbox", headers=self.brand_headers).json()
+        top = inbox["results"][0]
+        assert top["match_id"] == match["match_id"]
+        assert top["last_message"]["preview"] == text
+
+        # Reading the conversation clears the influencer's unread counter
+        influencer_inbox = requests.get(f"{BASE_URL}/api/inbox?limit=100", headers=self.influencer_headers).json()
+        entry = next((e for e in influencer_inbox["results"] if e["match_id"] == match["match_id"]), None)
+        if entry is None:
+            pytest.skip("Match does not belong to the test influencer")
+        assert entry["unread_count"] >= 1
+
+        requests.get(f"{BASE_URL}/api/matches/{match['match_id']}/messages", headers=self.influencer_headers)
+        influencer_inbox = requests.get(f"{BASE_URL}/api/inbox?limit=100", headers=self.influencer_headers).json()
+        entry = next(e for e in influencer_inbox["results"] if e["match_id"] == match["match_id"])
+        assert entry["unread_count"] == 0
+        print(f"Inbox updated for match {match['match_id']}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,113 @@
+"""
+Test bucketed chat message storage for FLULANCE Platform
+
+Features to test:
+1. Yeni mesajlar her zaman eşleşmenin en yeni bucket'ına yazılır
+2. Geçmiş kronolojik sırada ve sınırlı sayıda döner
+3. Belge ve bucket düzenleri aynı sonucu verir
+
+These tests run in-process against the backend module with an in-memory
+Mongo (mongomock-motor); no server is needed.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "flulance_test")
+
+import server  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def message(i: int, match_id: str = "match_test") -> dict:
+    return {
+        "message_id": f"msg_{i:04d}",
+        "match_id": match_id,
+        "sender_user_id": "user_a" if i % 2 else "user_b",
+        "sender_name": "A" if i % 2 else "B",
+        "message": f"mesaj {i}",
+        "timestamp": START + timedelta(seconds=i)
+    }
+
+
+@pytest.fixture(params=["documents", "buckets"])
+def storage(request, monkeypatch):
+    """An in-memory database, in each message layout"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["flulance_test"])
+    monkeypatch.setattr(server, "MESSAGE_STORAGE", request.param)
+    monkeypatch.setattr(server, "MESSAGE_BUCKET_SIZE", 3)
+    return request.param
+
+
+def store_all(messages):
+    async def run():
+        for msg in messages:
+            await server.store_message(dict(msg))
+    asyncio.run(run())
+
+
+def history(match_id: str = "match_test", limit: int = server.MESSAGE_HISTORY_LIMIT) -> list:
+    return [m["message_id"] for m in asyncio.run(server.load_messages(match_id, limit))]
+
+
+class TestMessageStorage:
+    """Storing and loading a conversation"""
+
+    def test_history_in_order(self, storage):
+        """Messages come back oldest first"""
+        store_all(message(i) for i in range(8))
+        assert history() == [f"msg_{i:04d}" for i in range(8)]
+
+    def test_history_is_bounded(self, storage):
+        """Only the latest messages up to the limit are returned"""
+        store_all(message(i) for i in range(8))
+        assert history(limit=4) == [f"msg_{i:04d}" for i in range(4, 8)]
+
+    def test_matches_are_separate(self, storage):
+        """A match only sees its own messages"""
+        store_all([message(1, "match_a"), message(2, "match_b"), message(3, "match_a")])
+        assert history("match_a") == ["msg_0001", "msg_0003"]
+
+
+class TestMessageBuckets:
+    """Bucket layout details"""
+
+    @pytest.fixture(autouse=True)
+    def buckets_only(self, storage):
+        if storage != "buckets":
+            pytest.skip("Bucket layout only")
+
+    def buckets(self) -> list:
+        async def run():
+            return await server.db.message_buckets.find({}, {"_id": 0}).sort("first_timestamp", 1).to_list(None)
+        return asyncio.run(run())
+
+    def test_buckets_fill_up(self, storage):
+        """A new bucket starts once the newest one is full"""
+        store_all(message(i) for i in range(7))
+        assert [b["count"] for b in self.buckets()] == [3, 3, 1]
+
+    def test_new_messages_go_to_newest_bucket(self, storage):
+        """An older bucket with room left is not written to"""
+        async def seed():
+            # As left behind by re-bucketing with a smaller size
+            await server.db.message_buckets.insert_one(server.new_message_bucket("match_test", [message(0)]))
+            await server.db.message_buckets.insert_one(server.new_message_bucket("match_test", [message(1)]))
+        asyncio.run(seed())
+
+        store_all([message(2), message(3)])
+
+        assert [[m["message_id"] for m in b["messages"]] for b in self.buckets()] == [
+            ["msg_0000"], ["msg_0001", "msg_0002", "msg_0003"]
+        ]
+        assert history() == ["msg_0000", "msg_0001", "msg_0002", "msg_0003"]
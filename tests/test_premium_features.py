@@ -196,6 +196,20 @@ class TestPremiumFeatures:
         
         print(f"✓ Single job {job_id} has correct premium flags")
     
+    def test_07_get_single_job_counts_views(self):
+        """Each GET /api/jobs/{job_id} should bump view_count, including sparse reads"""
+        if not self.created_job_ids:
+            pytest.skip("No test jobs created")
+        
+        job_id = self.created_job_ids[0]
+        first = self.session.get(f"{BASE_URL}/api/jobs/{job_id}")
+        assert first.status_code == 200
+        
+        second = self.session.get(f"{BASE_URL}/api/jobs/{job_id}", params={"fields": "view_count"})
+        assert second.status_code == 200
+        assert set(second.json()) == {"job_id", "view_count"}
+        assert second.json()["view_count"] > first.json()["view_count"]
+    
     def test_08_recommendations_returns_premium_flags(self):
         """Test that GET /api/recommendations returns jobs with premium flags"""
         # Login as influencer to get recommendations
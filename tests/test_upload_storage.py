@@ -0,0 +1,382 @@
+"""
+FLULANCE API Backend Tests - Upload Storage
+Tests for content-addressed, deduplicated uploads
+"""
+import pytest
+import requests
+import os
+import io
+import hashlib
+import uuid
+import time
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://influencer-hub-110.preview.emergentagent.com')
+
+# Test credentials
+INFLUENCER_USER = {"email": "ayse@influencer.com", "password": "test123"}
+ADMIN_USER = {"email": "admin@flulance.com", "password": "admin123"}
+
+
+class TestContentAddressedUploads:
+    """Deduplicated upload storage tests"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as influencer and get session token"""
+        login_response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json=INFLUENCER_USER
+        )
+        assert login_response.status_code == 200, f"Influencer login failed: {login_response.text}"
+
+        self.session_token = login_response.cookies.get("session_token")
+        self.headers = {"Authorization": f"Bearer {self.session_token}"}
+
+    def test_same_content_shares_one_file(self):
+        """Test that uploading identical bytes twice returns the same URL"""
+        content = f"%PDF-1.4 TEST_dedup {uuid.uuid4().hex}".encode()
+
+        urls = []
+        for name in ("first.pdf", "second.pdf"):
+            response = requests.post(
+                f"{BASE_URL}/api/upload",
+                headers=self.headers,
+                files={'file': (name, io.BytesIO(content), 'application/pdf')}
+            )
+            assert response.status_code == 200, f"Upload failed: {response.text}"
+            data = response.json()
+            assert data["sha256"] == hashlib.sha256(content).hexdigest()
+            urls.append(data["url"])
+
+        assert urls[0] == urls[1]
+        print(f"Both uploads stored as {urls[0]}")
+
+    def test_upload_check_known_content(self):
+        """Test instant upload for content the server already has"""
+        content = f"%PDF-1.4 TEST_check {uuid.uuid4().hex}".encode()
+        upload = requests.post(
+            f"{BASE_URL}/api/upload",
+            headers=self.headers,
+            files={'file': ('check.pdf', io.BytesIO(content), 'application/pdf')}
+        )
+        assert upload.status_code == 200
+
+        response = requests.post(
+            f"{BASE_URL}/api/upload/check",
+            headers=self.headers,
+            json={"sha256": hashlib.sha256(content).hexdigest(), "filename": "again.pdf"}
+        )
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["exists"] is True
+        assert data["url"] == upload.json()["url"]
+        assert data["original_filename"] == "again.pdf"
+
+    def test_upload_check_other_users_content(self):
+        """Test that a hash of another user's upload is treated as unknown"""
+        content = f"%PDF-1.4 TEST_private {uuid.uuid4().hex}".encode()
+        upload = requests.post(
+            f"{BASE_URL}/api/upload",
+            headers=self.headers,
+            files={'file': ('private.pdf', io.BytesIO(content), 'application/pdf')}
+        )
+        assert upload.status_code == 200
+
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=ADMIN_USER)
+        other_headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+        response = requests.post(
+            f"{BASE_URL}/api/upload/check",
+            headers=other_headers,
+            json={"sha256": hashlib.sha256(content).hexdigest()}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"exists": False}
+
+    def test_upload_check_unknown_content(self):
+        """Test that unknown content must be uploaded"""
+        response = requests.post(
+            f"{BASE_URL}/api/upload/check",
+            headers=self.headers,
+            json={"sha256": hashlib.sha256(uuid.uuid4().bytes).hexdigest()}
+        )
+        assert response.status_code == 200
+        assert response.json()["exists"] is False
+
+    def test_upload_check_requires_auth(self):
+        """Test that upload check requires authentication"""
+        response = requests.post(f"{BASE_URL}/api/upload/check", json={"sha256": "0" * 64})
+        assert response.status_code == 401
+
+
+class TestImageDerivatives:
+    """Background thumbnail generation tests"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as influencer and get session token"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=INFLUENCER_USER)
+        assert login_response.status_code == 200, f"Influencer login failed: {login_response.text}"
+        self.headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+
+    def test_media_library_image_gets_thumbnail(self):
+        """Test that an uploaded image gets WebP derivatives shortly after upload"""
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1600, 900), (uuid.uuid4().int % 256, 80, 160)).save(buffer, "JPEG")
+
+        response = requests.post(
+            f"{BASE_URL}/api/media-library",
+            headers=self.headers,
+            files={'file': ('TEST_thumb.jpg', io.BytesIO(buffer.getvalue()), 'image/jpeg')}
+        )
+        assert response.status_code == 200
+        media_id = response.json()["media_id"]
+
+        # Derivatives are produced off the request path; poll for them
+        media = None
+        for _ in range(30):
+            library = requests.get(f"{BASE_URL}/api/media-library", headers=self.headers).json()
+            media = next(m for m in library if m["media_id"] == media_id)
+            if media.get("thumbnail_url"):
+                break
+            time.sleep(1)
+
+        assert media["thumbnail_url"].endswith("_w320.webp")
+        assert [d["width"] for d in media["derivatives"]] == [320, 640, 1280]
+
+        requests.delete(f"{BASE_URL}/api/media-library/{media_id}", headers=self.headers)
+
+
+class TestResumableUploads:
+    """tus-style resumable upload tests"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as influencer and get session token"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=INFLUENCER_USER)
+        assert login_response.status_code == 200, f"Influencer login failed: {login_response.text}"
+        self.headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+
+    def patch_chunk(self, upload_id, offset, chunk):
+        return requests.patch(
+            f"{BASE_URL}/api/uploads/resumable/{upload_id}",
+            headers={**self.headers, "Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"},
+            data=chunk
+        )
+
+    def test_resumable_upload_flow(self):
+        """Test create, chunked PATCH, offset query, finalize and reuse by upload_id"""
+        content = os.urandom(256 * 1024)
+
+        create = requests.post(
+            f"{BASE_URL}/api/uploads/resumable",
+            headers=self.headers,
+            json={"filename": "TEST_video.mp4", "content_type": "video/mp4", "file_size": len(content)}
+        )
+        assert create.status_code == 201
+        upload_id = create.json()["upload_id"]
+        assert create.headers["Upload-Offset"] == "0"
+
+        first = self.patch_chunk(upload_id, 0, content[:100_000])
+        assert first.status_code == 204
+        assert first.headers["Upload-Offset"] == "100000"
+
+        # A stale offset is rejected instead of corrupting the file
+        assert self.patch_chunk(upload_id, 0, content[:10]).status_code == 409
+
+        # Resume from the offset the server reports
+        head = requests.head(f"{BASE_URL}/api/uploads/resumable/{upload_id}", headers=self.headers)
+        offset = int(head.headers["Upload-Offset"])
+        assert offset == 100_000
+
+        rest = self.patch_chunk(upload_id, offset, content[offset:])
+        assert rest.status_code == 204
+
+        finalize = requests.post(f"{BASE_URL}/api/uploads/resumable/{upload_id}/finalize", headers=self.headers)
+        assert finalize.status_code == 200
+        assert finalize.json()["sha256"] == hashlib.sha256(content).hexdigest()
+
+        media = requests.post(f"{BASE_URL}/api/media-library", headers=self.headers, data={"upload_id": upload_id})
+        assert media.status_code == 200
+        assert media.json()["url"] == finalize.json()["url"]
+        assert media.json()["file_type"] == "video"
+
+        requests.delete(f"{BASE_URL}/api/media-library/{media.json()['media_id']}", headers=self.headers)
+
+    def test_finalize_incomplete_upload(self):
+        """Test that an upload cannot be finalized before all bytes arrived"""
+        create = requests.post(
+            f"{BASE_URL}/api/uploads/resumable",
+            headers=self.headers,
+            json={"filename": "TEST_partial.mp4", "content_type": "video/mp4", "file_size": 1000}
+        )
+        upload_id = create.json()["upload_id"]
+        self.patch_chunk(upload_id, 0, b"x" * 10)
+
+        response = requests.post(f"{BASE_URL}/api/uploads/resumable/{upload_id}/finalize", headers=self.headers)
+        assert response.status_code == 400
+
+
+class TestUploadServing:
+    """Caching headers and byte ranges on /uploads"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Upload a file to serve"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=INFLUENCER_USER)
+        assert login_response.status_code == 200, f"Influencer login failed: {login_response.text}"
+        headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+
+        self.content = f"%PDF-1.4 TEST_serve {uuid.uuid4().hex}".encode() * 100
+        response = requests.post(
+            f"{BASE_URL}/api/upload",
+            headers=headers,
+            files={'file': ('serve.pdf', io.BytesIO(self.content), 'application/pdf')}
+        )
+        assert response.status_code == 200
+        self.url = f"{BASE_URL}{response.json()['url']}"
+
+    def test_blob_file_is_immutable(self):
+        """Test long-lived cache headers and strong ETag"""
+        response = requests.get(self.url)
+        assert response.status_code == 200
+        assert response.content == self.content
+        assert "immutable" in response.headers["Cache-Control"]
+        stem = self.url.rsplit("/", 1)[1].split(".")[0]
+        assert response.headers["ETag"] == f'"{stem}"'
+
+    def test_public_name_does_not_reveal_content_hash(self):
+        """Test that the served URL cannot be derived from the file contents"""
+        assert hashlib.sha256(self.content).hexdigest() not in self.url
+
+        revalidate = requests.get(self.url, headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidate.status_code == 304
+
+    def test_byte_range(self):
+        """Test partial content for seeking"""
+        response = requests.get(self.url, headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == self.content[100:200]
+        assert response.headers["Content-Range"] == f"bytes 100-199/{len(self.content)}"
+
+        response = requests.get(self.url, headers={"Range": f"bytes={len(self.content)}-"})
+        assert response.status_code == 416
+
+
+class TestStorageQuota:
+    """Per-user storage usage accounting"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login as influencer and get session token"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=INFLUENCER_USER)
+        assert login_response.status_code == 200, f"Influencer login failed: {login_response.text}"
+        self.headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+
+    def storage(self):
+        response = requests.get(f"{BASE_URL}/api/settings", headers=self.headers)
+        assert response.status_code == 200
+        return response.json()["storage"]
+
+    def test_settings_reports_storage(self):
+        """Test that /settings reports usage and quota"""
+        storage = self.storage()
+        assert storage["used"] >= 0
+        assert storage["quota"] > 0
+        assert storage["remaining"] == max(0, storage["quota"] - storage["used"])
+
+    def test_usage_follows_upload_and_delete(self):
+        """Test that media uploads are charged and deletes credited"""
+        before = self.storage()["used"]
+        content = f"%PDF-1.4 TEST_quota {uuid.uuid4().hex}".encode()
+
+        response = requests.post(
+            f"{BASE_URL}/api/media-library",
+            headers=self.headers,
+            files={'file': ('quota.pdf', io.BytesIO(content), 'application/pdf')}
+        )
+        assert response.status_code == 200
+        assert self.storage()["used"] == before + len(content)
+
+        requests.delete(f"{BASE_URL}/api/media-library/{response.json()['media_id']}", headers=self.headers)
+        assert self.storage()["used"] == before
+
+    def test_usage_follows_portfolio_item(self):
+        """Test that an /upload URL stored in a portfolio item is credited when the item goes"""
+        before = self.storage()["used"]
+        content = f"%PDF-1.4 TEST_portfolio {uuid.uuid4().hex}".encode()
+
+        upload = requests.post(
+            f"{BASE_URL}/api/upload",
+            headers=self.headers,
+            files={'file': ('portfolio.pdf', io.BytesIO(content), 'application/pdf')}
+        )
+        assert upload.status_code == 200
+        item = requests.post(
+            f"{BASE_URL}/api/portfolio",
+            headers=self.headers,
+            json={"title": "TEST_portfolio", "image_url": upload.json()["url"]}
+        )
+        assert item.status_code == 200
+        assert self.storage()["used"] == before + len(content)
+
+        response = requests.delete(f"{BASE_URL}/api/portfolio/{item.json()['item_id']}", headers=self.headers)
+        assert response.status_code == 200
+        assert self.storage()["used"] == before
+
+    def test_resumable_upload_over_quota(self):
+        """Test that an upload larger than the remaining quota is refused up front"""
+        storage = self.storage()
+        if storage["remaining"] >= 50 * 1024 * 1024:
+            pytest.skip("Quota larger than the maximum upload size")
+
+        response = requests.post(
+            f"{BASE_URL}/api/uploads/resumable",
+            headers=self.headers,
+            json={"filename": "TEST_big.mp4", "content_type": "video/mp4", "file_size": storage["remaining"] + 1}
+        )
+        assert response.status_code == 413
+
+
+class TestUploadGarbageCollection:
+    """Upload GC dry-run report tests"""
+
+    def test_gc_report_requires_admin(self):
+        """Test that only admins can see the GC report"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=INFLUENCER_USER)
+        headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+
+        response = requests.get(f"{BASE_URL}/api/admin/uploads/gc-report", headers=headers)
+        assert response.status_code == 403
+
+    def test_gc_report_structure(self):
+        """Test that the dry run runs in the background and reports without deleting"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=ADMIN_USER)
+        assert login_response.status_code == 200
+        headers = {"Authorization": f"Bearer {login_response.cookies.get('session_token')}"}
+
+        response = requests.post(f"{BASE_URL}/api/admin/uploads/gc-report", headers=headers)
+        assert response.status_code == 202
+
+        for _ in range(60):
+            response = requests.get(f"{BASE_URL}/api/admin/uploads/gc-report", headers=headers)
+            assert response.status_code == 200
+            if response.json()["status"] != "running":
+                break
+            time.sleep(2)
+
+        stored = response.json()
+        if stored["status"] == "running" or not stored.get("dry_run"):
+            pytest.skip("Dry run did not finish in time or a real GC run finished after it")
+        data = stored["report"]
+        assert data["expired_uploads"] == 0
+        assert data["unreferenced_blobs"]["deleted"] == 0
+        assert data["orphaned_files"]["deleted"] == 0
+        assert data["orphaned_files"]["scanned"] >= data["orphaned_files"]["orphaned"]
+        print(f"Reclaimable: {data['orphaned_files']['bytes']} bytes in orphaned files")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])